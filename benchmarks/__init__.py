@@ -0,0 +1,202 @@
+# coding: utf-8
+
+# Copyright (C) 2018 Orange
+#
+# This software is distributed under the terms and conditions of the 'Apache-2.0'
+# license which can be found in the 'LICENSE.md' file
+# or at 'http://www.apache.org/licenses/LICENSE-2.0'.
+
+"""
+Benchmarks of the client hot path, run with python -m benchmarks.
+
+A benchmark is a generator function registered with the benchmark decorator,
+it prepares its objects, yields a callable running the measured operations
+and returning their number, then cleans up. Nothing but a local
+rtpy.testing.StandInServer is contacted.
+"""
+
+from __future__ import unicode_literals
+import fnmatch
+import json
+import platform
+import sys
+import time
+from collections import OrderedDict
+
+# Registered benchmarks {name: (function, unit, note)}
+BENCHMARKS = OrderedDict()
+
+# Version of the format of the results
+RESULTS_VERSION = 1
+
+# Monotonic clock when available (Python 3)
+_clock = getattr(time, "perf_counter", time.time)
+
+
+def benchmark(name, unit="call", note=None):
+    """
+    Register a benchmark.
+
+    Parameters
+    ----------
+    name: str
+        Name of the benchmark in the results
+    unit: str, optional
+        What an operation is ("call", "byte"...), "call" by default
+    note: str, optional
+        Limit of the measure to keep in mind, added to the result
+
+    """
+
+    def register(function):
+        BENCHMARKS[name] = (function, unit, note)
+        return function
+
+    return register
+
+
+def run_benchmarks(names=None, repeat=5, scale=1.0, progress=None):
+    """
+    Run benchmarks and return their results.
+
+    Each benchmark is run once to warm up, then repeat times.
+
+    Parameters
+    ----------
+    names: list, optional
+        Names of the benchmarks to run (shell-style wildcards accepted),
+        all by default
+    repeat: int, optional
+        Number of measured runs, 5 by default
+    scale: float, optional
+        Factor applied to the number of operations of each run, 1.0 by default
+    progress: callable, optional
+        Called with the name and the result of each benchmark when it is done
+
+    Returns
+    -------
+    results: dict
+        {"version", "rtpy", "python", "platform", "timestamp", "benchmarks":
+        {name: {"unit", "operations", "times", "best", "median",
+        "per_operation", "operations_per_second", "note" (if any)}}}
+
+    """
+    # Imported for the registration of the benchmarks
+    from . import hot_path, transfers  # noqa: F401
+
+    results = OrderedDict(
+        [
+            ("version", RESULTS_VERSION),
+            ("rtpy", _rtpy_version()),
+            ("python", platform.python_version()),
+            ("platform", platform.platform()),
+            ("timestamp", time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())),
+            ("benchmarks", OrderedDict()),
+        ]
+    )
+    for name, (function, unit, note) in BENCHMARKS.items():
+        if names and not any(fnmatch.fnmatchcase(name, pattern) for pattern in names):
+            continue
+        result = _run_benchmark(function, unit, repeat, scale)
+        if note:
+            result["note"] = note
+        results["benchmarks"][name] = result
+        if progress is not None:
+            progress(name, result)
+    return results
+
+
+def _run_benchmark(function, unit, repeat, scale):
+    """Run a benchmark, return its result."""
+    generator = function(scale)
+    try:
+        run = next(generator)
+        run()
+        times = []
+        for _ in range(repeat):
+            start = _clock()
+            operations = run()
+            times.append(_clock() - start)
+    finally:
+        generator.close()
+    best = min(times)
+    return OrderedDict(
+        [
+            ("unit", unit),
+            ("operations", operations),
+            ("times", times),
+            ("best", best),
+            ("median", sorted(times)[len(times) // 2]),
+            ("per_operation", best / operations),
+            ("operations_per_second", operations / best if best else None),
+        ]
+    )
+
+
+def compare(results, baseline, threshold=0.1):
+    """
+    Compare results with the results of a baseline (another rtpy version).
+
+    Parameters
+    ----------
+    results: dict
+        Results given by run_benchmarks
+    baseline: dict
+        Results given by run_benchmarks (read from a JSON file)
+    threshold: float, optional
+        Slowdown ratio of the time per operation above which a benchmark
+        is a regression, 0.1 (10%) by default
+
+    Returns
+    -------
+    comparisons: list
+        [(name, baseline per_operation, per_operation, ratio, regression)]
+        for the benchmarks in both results
+
+    """
+    comparisons = []
+    for name, result in results["benchmarks"].items():
+        previous = baseline.get("benchmarks", {}).get(name)
+        if previous is None:
+            continue
+        ratio = result["per_operation"] / previous["per_operation"]
+        comparisons.append(
+            (
+                name,
+                previous["per_operation"],
+                result["per_operation"],
+                ratio,
+                ratio > 1 + threshold,
+            )
+        )
+    return comparisons
+
+
+def write_results(results, path):
+    """Write results as JSON to a file ("-" for the standard output)."""
+    text = json.dumps(results, indent=2)
+    if path == "-":
+        sys.stdout.write(text + "\n")
+        return
+    with open(path, "w") as results_file:
+        results_file.write(text + "\n")
+
+
+def read_results(path):
+    """Read results written by write_results."""
+    with open(path) as results_file:
+        return json.load(results_file)
+
+
+def _rtpy_version():
+    """Return the installed version of rtpy ("unknown" when not installed)."""
+    try:
+        try:
+            from importlib.metadata import version
+        except ImportError:
+            import pkg_resources
+
+            return pkg_resources.get_distribution("rtpy").version
+        return version("rtpy")
+    except Exception:
+        return "unknown"
@@ -0,0 +1,86 @@
+# coding: utf-8
+
+# Copyright (C) 2018 Orange
+#
+# This software is distributed under the terms and conditions of the 'Apache-2.0'
+# license which can be found in the 'LICENSE.md' file
+# or at 'http://www.apache.org/licenses/LICENSE-2.0'.
+
+"""Command line of the benchmarks : python -m benchmarks --help."""
+
+from __future__ import unicode_literals
+import argparse
+import sys
+
+from . import compare, read_results, run_benchmarks, write_results
+
+
+def main(arguments=None):
+    """Run the benchmarks, write the results and compare them to a baseline."""
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks", description="Benchmarks of the rtpy hot path."
+    )
+    parser.add_argument(
+        "names",
+        nargs="*",
+        help="benchmarks to run (wildcards accepted), all by default",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        default="benchmarks.json",
+        help='JSON results file ("-" for the standard output)',
+    )
+    parser.add_argument("-r", "--repeat", type=int, default=5)
+    parser.add_argument(
+        "-s", "--scale", type=float, default=1.0, help="factor of the operations"
+    )
+    parser.add_argument(
+        "-c", "--compare", metavar="BASELINE", help="JSON results to compare with"
+    )
+    parser.add_argument(
+        "-t",
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="slowdown ratio of a regression, 0.1 by default",
+    )
+    arguments = parser.parse_args(arguments)
+
+    notes = []
+
+    def progress(name, result):
+        sys.stderr.write(
+            "{:<32} {:>14.6g} {}/s\n".format(
+                name, result["operations_per_second"] or 0, result["unit"]
+            )
+        )
+        note = result.get("note")
+        if note and note not in notes:
+            notes.append(note)
+            sys.stderr.write("  Note : " + note + "\n")
+
+    results = run_benchmarks(
+        arguments.names, arguments.repeat, arguments.scale, progress
+    )
+    write_results(results, arguments.output)
+    if not arguments.compare:
+        return 0
+
+    baseline = read_results(arguments.compare)
+    sys.stderr.write("\nCompared with rtpy " + baseline["rtpy"] + " :\n")
+    regressions = 0
+    for name, previous, current, ratio, regression in compare(
+        results, baseline, arguments.threshold
+    ):
+        regressions += regression
+        sys.stderr.write(
+            "{:<32} {:>+8.1%}{}\n".format(
+                name, ratio - 1, "  REGRESSION" if regression else ""
+            )
+        )
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,270 @@
+# coding: utf-8
+
+# Copyright (C) 2018 Orange
+#
+# This software is distributed under the terms and conditions of the 'Apache-2.0'
+# license which can be found in the 'LICENSE.md' file
+# or at 'http://www.apache.org/licenses/LICENSE-2.0'.
+
+"""Benchmarks of the processing of an API call by rtpy, without network."""
+
+from __future__ import unicode_literals
+import io
+import json
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+import rtpy
+from . import benchmark
+
+# Settings of the Rtpy objects, no request reaches the URL
+SETTINGS = {"af_url": "http://artifactory.invalid/artifactory", "api_key": "key"}
+
+# Number of results of the large JSON bodies (about 3 MB)
+LARGE_RESULTS = 15000
+
+
+class _StubSession(object):
+    """Session returning the same response without any HTTP processing."""
+
+    def __init__(self, response):
+        """Object instantiation."""
+        self.response = response
+
+    def request(self, method, url, **kwargs):
+        """Return the response."""
+        return self.response
+
+
+class _CannedAdapter(BaseAdapter):
+    """requests transport adapter answering every request with the same body."""
+
+    def __init__(self, body, content_type="application/json"):
+        """Object instantiation."""
+        super(_CannedAdapter, self).__init__()
+        self.body = body
+        self.content_type = content_type
+
+    def send(self, request, **kwargs):
+        """Build the response of a request."""
+        return _response(self.body, self.content_type, request)
+
+    def close(self):
+        """Nothing to release."""
+        pass
+
+
+def _response(body, content_type="application/json", request=None):
+    """Build a requests.Response with a body."""
+    response = requests.Response()
+    response.status_code = 200
+    response.headers = CaseInsensitiveDict(
+        {"Content-Type": content_type, "Content-Length": str(len(body))}
+    )
+    response.raw = io.BytesIO(body)
+    response.encoding = "utf-8"
+    response.request = request
+    response.url = request.url if request is not None else SETTINGS["af_url"]
+    return response
+
+
+def _file_info_body():
+    """Return the JSON body of a File Info call."""
+    return json.dumps(
+        {
+            "repo": "libs-release-local",
+            "path": "/org/acme/lib/1.0/lib-1.0.jar",
+            "created": "2020-07-06T12:00:00.000Z",
+            "createdBy": "admin",
+            "lastModified": "2020-07-06T12:00:00.000Z",
+            "modifiedBy": "admin",
+            "lastUpdated": "2020-07-06T12:00:00.000Z",
+            "downloadUri": "http://artifactory.invalid/artifactory/"
+            "libs-release-local/org/acme/lib/1.0/lib-1.0.jar",
+            "mimeType": "application/java-archive",
+            "size": "1024",
+            "checksums": {"sha1": "0" * 40, "md5": "0" * 32, "sha256": "0" * 64},
+            "uri": "http://artifactory.invalid/artifactory/api/storage/"
+            "libs-release-local/org/acme/lib/1.0/lib-1.0.jar",
+        }
+    ).encode("utf-8")
+
+
+def _aql_body(count):
+    """Return the JSON body of an AQL call with count results."""
+    results = [
+        {
+            "repo": "libs-release-local",
+            "path": "org/acme/lib/" + str(index),
+            "name": "lib-" + str(index) + ".jar",
+            "type": "file",
+            "size": index,
+            "created": "2020-07-06T12:00:00.000Z",
+            "created_by": "admin",
+            "modified": "2020-07-06T12:00:00.000Z",
+            "modified_by": "admin",
+            "updated": "2020-07-06T12:00:00.000Z",
+        }
+        for index in range(count)
+    ]
+    return json.dumps(
+        {
+            "results": results,
+            "range": {"start_pos": 0, "end_pos": count, "total": count},
+        }
+    ).encode("utf-8")
+
+
+@benchmark("request_overhead")
+def request_overhead(scale):
+    """rtpy processing of an API call (the session returns at once)."""
+    af = rtpy.Rtpy(dict(SETTINGS, session=_StubSession(_response(b"OK", "text/plain"))))
+    calls = max(1, int(20000 * scale))
+
+    def run():
+        for _ in range(calls):
+            af.system_and_configuration.system_health_ping()
+        return calls
+
+    yield run
+
+
+@benchmark("request_overhead_with_metrics")
+def request_overhead_with_metrics(scale):
+    """rtpy processing of an API call recorded by a rtpy.Metrics."""
+    session = _StubSession(_response(b"OK", "text/plain"))
+    af = rtpy.Rtpy(dict(SETTINGS, session=session, metrics=rtpy.Metrics()))
+    calls = max(1, int(20000 * scale))
+
+    def run():
+        for _ in range(calls):
+            af.system_and_configuration.system_health_ping()
+        return calls
+
+    yield run
+
+
+@benchmark("request_overhead_with_tracer")
+def request_overhead_with_tracer(scale):
+    """rtpy processing of an API call traced by a rtpy.Tracer (in memory)."""
+    session = _StubSession(_response(b"OK", "text/plain"))
+    exporter = rtpy.MemorySpanExporter()
+    af = rtpy.Rtpy(dict(SETTINGS, session=session, tracer=rtpy.Tracer(exporter)))
+    calls = max(1, int(20000 * scale))
+
+    def run():
+        exporter.clear()
+        for _ in range(calls):
+            af.system_and_configuration.system_health_ping()
+        return calls
+
+    yield run
+
+
+@benchmark("request_overhead_with_requests")
+def request_overhead_with_requests(scale):
+    """rtpy and requests processing of an API call (canned transport)."""
+    session = requests.Session()
+    session.mount("http://", _CannedAdapter(b"OK", "text/plain"))
+    af = rtpy.Rtpy(dict(SETTINGS, session=session))
+    calls = max(1, int(3000 * scale))
+
+    def run():
+        for _ in range(calls):
+            af.system_and_configuration.system_health_ping()
+        return calls
+
+    try:
+        yield run
+    finally:
+        session.close()
+
+
+@benchmark("url_construction")
+def url_construction(scale):
+    """Category methods building their URL, headers and query string."""
+    response = _response(b"", "text/plain")
+    af = rtpy.Rtpy(dict(SETTINGS, session=_StubSession(response), raw_response=True))
+    storage = af.artifacts_and_storage
+    calls = max(1, int(5000 * scale))
+
+    def run():
+        for index in range(calls):
+            path = "org/acme/lib/" + str(index) + "/lib.jar"
+            storage.file_info("libs-release-local", path)
+            storage.file_list("libs-release-local", path, "&deep=1&listFolders=1")
+            storage.item_properties("libs-release-local", path, "a,b")
+            storage.set_item_properties("libs-release-local", path, "a=1;b=2")
+        return 4 * calls
+
+    yield run
+
+
+def _convert_response_benchmark(body, scale, calls):
+    """Yield a run converting responses with a JSON body."""
+    af = rtpy.Rtpy(SETTINGS)
+    storage = af.artifacts_and_storage
+    calls = max(1, int(calls * scale))
+
+    def run():
+        for _ in range(calls):
+            storage._convert_response(
+                "[SEARCHES] : Artifactory Query Language",
+                "search/aql",
+                "POST",
+                _response(body),
+                False,
+                False,
+            )
+        return calls
+
+    try:
+        yield run
+    finally:
+        af.session.close()
+
+
+@benchmark("convert_response_small")
+def convert_response_small(scale):
+    """_convert_response decoding a File Info JSON (500 bytes)."""
+    for run in _convert_response_benchmark(_file_info_body(), scale, 20000):
+        yield run
+
+
+@benchmark("convert_response_large")
+def convert_response_large(scale):
+    """_convert_response decoding AQL results (3 MB)."""
+    body = _aql_body(LARGE_RESULTS)
+    for run in _convert_response_benchmark(body, scale, 10):
+        yield run
+
+
+@benchmark("stream_json_large", unit="item")
+def stream_json_large(scale):
+    """Iteration over the AQL results parsed incrementally (stream_json)."""
+    body = _aql_body(LARGE_RESULTS)
+    af = rtpy.Rtpy(SETTINGS)
+    storage = af.artifacts_and_storage
+    calls = max(1, int(10 * scale))
+
+    def run():
+        items = 0
+        for _ in range(calls):
+            for _ in storage._convert_response(
+                "[SEARCHES] : Artifactory Query Language",
+                "search/aql",
+                "POST",
+                _response(body),
+                False,
+                False,
+                stream_json="results",
+            ):
+                items += 1
+        return items
+
+    try:
+        yield run
+    finally:
+        af.session.close()
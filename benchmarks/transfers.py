@@ -0,0 +1,119 @@
+# coding: utf-8
+
+# Copyright (C) 2018 Orange
+#
+# This software is distributed under the terms and conditions of the 'Apache-2.0'
+# license which can be found in the 'LICENSE.md' file
+# or at 'http://www.apache.org/licenses/LICENSE-2.0'.
+
+"""Benchmarks of the transfers and concurrent calls against a StandInServer."""
+
+from __future__ import unicode_literals
+import io
+
+import rtpy
+from rtpy.bulk import run_concurrently
+from rtpy.testing import StandInServer
+from . import benchmark
+
+# Key of the repository created on the stand-in server
+REPO_KEY = "benchmarks-local"
+
+# Size of the transferred artifact
+ARTIFACT_SIZE = 16 * 1024 * 1024
+
+# Latency of the stand-in server for the concurrent calls (seconds)
+CONCURRENT_LATENCY = 0.005
+
+# Numbers of threads of the concurrent calls benchmarks
+CONCURRENT_WORKERS = [1, 4, 16]
+
+# Limit of the stand-in server recorded with the results
+STAND_IN_NOTE = (
+    "The StandInServer handles the requests one at a time while they access "
+    "its content (a single lock), only the latency, the transfers and the "
+    "hashing of the uploads overlap between concurrent calls"
+)
+
+
+def _stand_in(latency=0.0, **settings):
+    """Start a StandInServer with a repository, return it and a Rtpy object."""
+    server = StandInServer(latency=latency).start()
+    af = rtpy.Rtpy(dict(server.settings(), **settings))
+    af.repositories.create_repository(
+        {"key": REPO_KEY, "rclass": "local", "packageType": "generic"}
+    )
+    return server, af
+
+
+@benchmark("upload_throughput", unit="byte", note=STAND_IN_NOTE)
+def upload_throughput(scale):
+    """deploy_artifact streaming a buffer in chunks."""
+    server, af = _stand_in()
+    content = bytearray(b"u" * ARTIFACT_SIZE)
+    uploads = max(1, int(4 * scale))
+
+    def run():
+        for index in range(uploads):
+            af.artifacts_and_storage.deploy_artifact(
+                REPO_KEY, content, "upload/" + str(index) + ".bin"
+            )
+        return uploads * len(content)
+
+    try:
+        yield run
+    finally:
+        af.session.close()
+        server.stop()
+
+
+@benchmark("download_throughput", unit="byte", note=STAND_IN_NOTE)
+def download_throughput(scale):
+    """download_artifact streaming to a file object with checksums."""
+    server, af = _stand_in()
+    content = b"d" * ARTIFACT_SIZE
+    af.artifacts_and_storage.deploy_artifact(REPO_KEY, content, "download.bin")
+    downloads = max(1, int(4 * scale))
+
+    def run():
+        for _ in range(downloads):
+            af.artifacts_and_storage.download_artifact(
+                REPO_KEY, "download.bin", io.BytesIO()
+            )
+        return downloads * len(content)
+
+    try:
+        yield run
+    finally:
+        af.session.close()
+        server.stop()
+
+
+def _concurrent_calls(workers):
+    """Register a benchmark of File Info calls in a pool of threads."""
+
+    @benchmark("concurrent_calls_" + str(workers), note=STAND_IN_NOTE)
+    def concurrent_calls(scale):
+        server, af = _stand_in(CONCURRENT_LATENCY, pool_maxsize=max(workers, 10))
+        af.artifacts_and_storage.deploy_artifact(REPO_KEY, b"file", "file.txt")
+        calls = max(workers, int(40 * workers * scale))
+
+        def file_info(_):
+            return af.artifacts_and_storage.file_info(REPO_KEY, "file.txt")
+
+        def run():
+            for _ in run_concurrently(file_info, range(calls), workers):
+                pass
+            return calls
+
+        try:
+            yield run
+        finally:
+            af.session.close()
+            server.stop()
+
+    return concurrent_calls
+
+
+for _workers in CONCURRENT_WORKERS:
+    _concurrent_calls(_workers)
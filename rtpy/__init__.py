@@ -8,7 +8,31 @@
 
 """Exposed objects/functions to end user."""
 
+import sys
+
 from .rtpy import Rtpy
+from .artifact_cache import ArtifactCache
+from .cache import ResponseCache
+from .metrics import Metrics
+from .throttle import Throttle
 from .tools import json_to_dict, UserSettingsError
+from .tracing import FileSpanExporter, MemorySpanExporter, Tracer
+
+__all__ = [
+    "Rtpy",
+    "ArtifactCache",
+    "ResponseCache",
+    "Metrics",
+    "Throttle",
+    "Tracer",
+    "FileSpanExporter",
+    "MemorySpanExporter",
+    "json_to_dict",
+    "UserSettingsError",
+]
+
+# rtpy.aio uses asynchronous generators, available with Python 3.6+
+if sys.version_info >= (3, 6):
+    from .aio import AsyncRtpy
 
-__all__ = ["Rtpy", "json_to_dict", "UserSettingsError"]
+    __all__.append("AsyncRtpy")
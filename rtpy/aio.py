@@ -0,0 +1,868 @@
+# coding: utf-8
+
+# Copyright (C) 2018 Orange
+#
+# This software is distributed under the terms and conditions of the 'Apache-2.0'
+# license which can be found in the 'LICENSE.md' file
+# or at 'http://www.apache.org/licenses/LICENSE-2.0'.
+
+"""AsyncRtpy class definition, asyncio counterpart of the rtpy.Rtpy class."""
+
+import asyncio
+import collections
+import os
+import sys
+
+from requests import Response
+from requests.adapters import DEFAULT_POOLSIZE
+from requests.structures import CaseInsensitiveDict
+
+from .tools import (
+    MUTATING_VERBS,
+    DownloadWriter,
+    RtpyBase,
+    UploadBuffer,
+    UserSettingsError,
+    _clock,
+    _log_retry,
+    _request_size,
+    _response_size,
+    _retryable,
+    retry_delay,
+)
+from .artifact_cache import artifact_key, cached_response
+from .artifacts_and_storage import (
+    RtpyArtifactsAndStorage,
+    _child_path,
+    _copy_cached_artifact,
+    _folder_infos,
+)
+from .builds import RtpyBuilds
+from .repositories import RtpyRepositories
+from .searches import RtpySearches, _aql_page, _aql_window
+from .streaming import JSON_CHUNK_SIZE, JsonItemsParser, is_json_response
+from .security import RtpySecurity
+from .system_and_configuration import RtpySystemAndConfiguration
+from .tracing import url_template
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+class AsyncTransport(object):
+    """
+    Non-blocking HTTP transport shared by all the categories of an AsyncRtpy object.
+
+    The aiohttp.ClientSession is created on first use,
+    inside the running event loop.
+
+    Parameters
+    ----------
+    settings: dict
+        User settings, the "pool_connections", "pool_maxsize", "keep_alive"
+        and "tracer" keys are used when present
+    session: aiohttp.ClientSession, optional
+        Session to use instead of creating one
+
+    """
+
+    def __init__(self, settings, session=None):
+        """Object instantiation."""
+        self._settings = settings
+        self._session = session
+        self._owns_session = session is None
+
+    @property
+    def session(self):
+        """Return the aiohttp.ClientSession, create it if necessary."""
+        if self._session is None:
+            pool_connections = self._settings.get("pool_connections", DEFAULT_POOLSIZE)
+            pool_maxsize = self._settings.get("pool_maxsize", DEFAULT_POOLSIZE)
+            connector = aiohttp.TCPConnector(
+                limit=pool_connections * pool_maxsize,
+                limit_per_host=pool_maxsize,
+                force_close=not self._settings.get("keep_alive", True),
+            )
+            trace_configs = []
+            if self._settings.get("tracer") is not None:
+                # Phases of the traced calls
+                trace_configs.append(_phases_trace_config())
+            self._session = aiohttp.ClientSession(
+                connector=connector, trace_configs=trace_configs
+            )
+        return self._session
+
+    async def close(self):
+        """Close the aiohttp.ClientSession if it was created by the transport."""
+        if self._session is not None and self._owns_session:
+            await self._session.close()
+            self._session = None
+
+
+class AsyncRtpyBase(RtpyBase):
+    """
+    Replace the blocking API call of RtpyBase by a coroutine.
+
+    Used as the first parent class of the async categories,
+    the category methods are inherited untouched and return awaitables.
+
+    """
+
+    def _request(
+        self,
+        verb,
+        target,
+        api_method,
+        kwargs,
+        byte_output=False,
+        no_api=False,
+        data=None,
+        params=None,
+        stream=False,
+    ):
+        """
+        Prepare the API call and return a coroutine performing it.
+
+        The URL, headers and settings are resolved immediately,
+        see RtpyBase._request for the parameters.
+
+        Returns
+        -------
+        coroutine
+            Awaitable returning the result of the _convert_response method
+
+        """
+        config = self._request_settings(kwargs)
+        request_url, headers, params = self._prepare_request(
+            verb, target, api_method, no_api, params, config
+        )
+
+        if isinstance(config.session, aiohttp.ClientSession):
+            config = config.replace(
+                session=AsyncTransport(self._user_settings, config.session)
+            )
+        if not isinstance(config.session, AsyncTransport):
+            raise UserSettingsError("session must be an aiohttp.ClientSession!")
+
+        # A json body is only sent without data (even an empty upload)
+        if data is not None:
+            params = None
+
+        # Files are closed when the calling method returns, they are reopened
+        # by name to stream them during the call
+        data_path = None
+        if hasattr(data, "read") and hasattr(data, "name"):
+            data_path = data.name
+            data = None
+        if isinstance(data, UploadBuffer):
+            headers["Content-Length"] = str(len(data))
+
+        return self._async_request(
+            verb,
+            request_url,
+            api_method,
+            config,
+            headers,
+            params,
+            data,
+            data_path,
+            byte_output,
+            stream,
+            url_template(target, no_api),
+        )
+
+    async def _async_request(
+        self,
+        verb,
+        request_url,
+        api_method,
+        config,
+        headers,
+        params,
+        data,
+        data_path,
+        byte_output,
+        stream,
+        template,
+    ):
+        """
+        Call the remote API with aiohttp, process the response and return it.
+
+        The aiohttp response is converted to a requests.Response()
+        so errors and outputs are the same as with rtpy.Rtpy.
+        When streaming a successful response, the content is not read
+        and the aiohttp response is left open as the raw attribute.
+        With the "stream_json" setting, an asynchronous iterator over the items
+        of the JSON list is returned instead.
+
+        """
+        # Streamed responses are never cached, their content is not loaded
+        cache = config.cache
+        cacheable = (
+            cache is not None
+            and verb == "GET"
+            and not stream
+            and not config.stream_json
+        )
+        request_headers = headers
+        if cacheable:
+            cache_path = config.relative_path(request_url)
+            identity = config.identity
+            response = cache.get(cache_path, identity)
+            if response is not None:
+                return self._convert_response(
+                    api_method,
+                    request_url,
+                    verb,
+                    response,
+                    config.raw_response,
+                    byte_output,
+                )
+            request_headers = dict(
+                headers, **cache.conditional_headers(cache_path, identity)
+            )
+
+        if config.authorization:
+            request_headers["Authorization"] = config.authorization
+
+        # The body is rebuilt for each attempt
+        opened_files = []
+        position = data.tell() if hasattr(data, "seek") else None
+
+        throttle = config.throttle
+        metrics = config.metrics
+        tracer = config.tracer
+        attempts = [0]
+        # Phases of the last attempt recorded by the trace configuration
+        phases = []
+
+        async def send():
+            attempts[0] += 1
+            del phases[:]
+            body = data
+            if data_path is not None:
+                body = open(data_path, "rb")
+                opened_files.append(body)
+                # Avoid a chunked upload, the size is known
+                size = os.fstat(body.fileno()).st_size
+                request_headers["Content-Length"] = str(size)
+            elif isinstance(data, UploadBuffer):
+                body = _iterate_upload(data)
+            elif position is not None:
+                data.seek(position)
+            acquired = await _acquire_throttle(throttle, api_method)
+            try:
+                return await config.session.session.request(
+                    verb,
+                    request_url,
+                    headers=request_headers,
+                    json=params,
+                    data=body,
+                    trace_request_ctx=phases if tracer is not None else None,
+                )
+            finally:
+                if acquired:
+                    throttle.release(acquired)
+
+        start = _clock()
+        span = None
+        if tracer is not None:
+            span = tracer.start_request(api_method, verb, request_url, template)
+        response = None
+        streamed = True
+        try:
+            async_response = await _send_with_retries(
+                send,
+                config.retry,
+                verb,
+                data,
+                config.verbose_level,
+            )
+            response = Response()
+            response.status_code = async_response.status
+            response.reason = async_response.reason
+            response.url = str(async_response.url)
+            response.headers = CaseInsensitiveDict(async_response.headers)
+            response.encoding = async_response.charset
+
+            if config.verbose_level >= 1:
+                message = "\nStatus Code : " + str(response.status_code) + "\n"
+                sys.stdout.write(message)
+
+            stream_json = config.stream_json
+            # Content already read looking for the list to stream
+            content = None
+            if (
+                stream_json
+                and not byte_output
+                and not config.raw_response
+                and async_response.status < 400
+                and is_json_response(response.headers)
+            ):
+                items, content = await _stream_json_items(async_response, stream_json)
+                if items is not None:
+                    return items
+            if stream and content is None and async_response.status < 400:
+                response.raw = async_response
+            else:
+                try:
+                    headers_received = _clock()
+                    response._content = (content or b"") + await async_response.read()
+                    phases.append(("transfer", headers_received, _clock()))
+                    streamed = False
+                finally:
+                    async_response.release()
+        except Exception as error:
+            if span is not None:
+                span.record_exception(error)
+            raise
+        finally:
+            for files in opened_files:
+                files.close()
+            duration = _clock() - start
+            if metrics is not None or span is not None:
+                status = response.status_code if response is not None else None
+                if data_path is not None:
+                    request_bytes = os.path.getsize(data_path)
+                else:
+                    request_bytes = _request_size(data, params)
+                response_bytes = _response_size(response, verb, streamed)
+                retries = max(attempts[0] - 1, 0)
+            if metrics is not None:
+                metrics.record(
+                    api_method,
+                    verb,
+                    status,
+                    duration,
+                    request_bytes,
+                    response_bytes,
+                    retries,
+                )
+            if span is not None:
+                tracer.end_request(
+                    span, status, request_bytes, response_bytes, retries, phases
+                )
+
+        if cacheable and response.status_code == 304:
+            cached_response = cache.refresh(cache_path, identity, response)
+            if cached_response is None:
+                # Evicted in the meantime, requested again without conditions
+                return await self._async_request(
+                    verb,
+                    request_url,
+                    api_method,
+                    config.replace(cache=None),
+                    headers,
+                    params,
+                    data,
+                    data_path,
+                    byte_output,
+                    stream,
+                    template,
+                )
+            response = cached_response
+        elif cacheable:
+            cache.put(cache_path, identity, response)
+        elif cache is not None and verb in MUTATING_VERBS:
+            cache.invalidate(config.relative_path(request_url))
+
+        return self._convert_response(
+            api_method,
+            request_url,
+            verb,
+            response,
+            config.raw_response,
+            byte_output,
+        )
+
+    async def _download(
+        self,
+        target,
+        api_method,
+        kwargs,
+        destination,
+        chunk_size,
+        no_api=False,
+        checksums=None,
+    ):
+        """
+        Stream the content of a GET API call to a file.
+
+        See RtpyBase._download, the file writes are blocking.
+
+        """
+        response = await self._request(
+            "GET",
+            target,
+            api_method,
+            kwargs,
+            byte_output=True,
+            no_api=no_api,
+            stream=True,
+        )
+        if response.status_code >= 400:
+            return response
+
+        writer = DownloadWriter(destination)
+        try:
+            async for chunk in response.raw.content.iter_chunked(chunk_size):
+                writer.write(chunk)
+            return writer.close(response.headers, checksums)
+        except BaseException:
+            writer.abort()
+            raise
+        finally:
+            response.raw.release()
+
+
+async def _acquire_throttle(throttle, api_method):
+    """
+    Wait for a free slot and a token of a rtpy.Throttle without blocking the loop.
+
+    See rtpy.Throttle.acquire, the slots are polled as they can be released
+    by other threads.
+
+    """
+    if throttle is None:
+        return []
+    limits = throttle.limits_for(api_method)
+    acquired = []
+    try:
+        for limit in limits:
+            if limit.slots is not None:
+                delay = 0.001
+                while not limit.slots.acquire(False):
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, 0.05)
+                acquired.append(limit)
+        for limit in limits:
+            delay = limit.reserve()
+            if delay > 0:
+                await asyncio.sleep(delay)
+    except BaseException:
+        throttle.release(acquired)
+        raise
+    return acquired
+
+
+async def _send_with_retries(send, policy, verb, data, verbose_level):
+    """
+    Await send until it succeeds or the attempts of the retry policy are spent.
+
+    See rtpy.tools._send_with_retries, send is a coroutine function
+    performing one attempt.
+
+    """
+    if not _retryable(policy, verb, data):
+        return await send()
+
+    attempt = 1
+    while True:
+        async_response = None
+        try:
+            async_response = await send()
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+            if attempt >= policy["max_attempts"]:
+                raise
+            reason = "connection error"
+        else:
+            if (
+                async_response.status not in policy["status_codes"]
+                or attempt >= policy["max_attempts"]
+            ):
+                return async_response
+            reason = "status code " + str(async_response.status)
+            async_response.release()
+
+        delay = retry_delay(policy, attempt, async_response)
+        _log_retry(reason, delay, verbose_level)
+        await asyncio.sleep(delay)
+        attempt += 1
+
+
+def _phases_trace_config():
+    """
+    Return an aiohttp.TraceConfig recording the phases of the traced calls.
+
+    The (name, start, end) phases are appended to the list given as
+    trace_request_ctx of a request : "dns", "connect" (DNS resolution,
+    TCP connection and TLS handshake) and "server" until the response
+    headers are received.
+
+    """
+
+    def started(name):
+        async def on_start(session, context, params):
+            if context.trace_request_ctx is not None:
+                setattr(context, name, _clock())
+
+        return on_start
+
+    def ended(name):
+        async def on_end(session, context, params):
+            start = getattr(context, name, None)
+            if context.trace_request_ctx is not None and start is not None:
+                context.trace_request_ctx.append((name, start, _clock()))
+
+        return on_end
+
+    async def on_request_end(session, context, params):
+        if context.trace_request_ctx is not None:
+            connected = max(
+                [end for _, _, end in context.trace_request_ctx] or [context.request]
+            )
+            context.trace_request_ctx.append(("server", connected, _clock()))
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_dns_resolvehost_start.append(started("dns"))
+    trace_config.on_dns_resolvehost_end.append(ended("dns"))
+    trace_config.on_connection_create_start.append(started("connect"))
+    trace_config.on_connection_create_end.append(ended("connect"))
+    trace_config.on_request_start.append(started("request"))
+    trace_config.on_request_end.append(on_request_end)
+    return trace_config
+
+
+async def _stream_json_items(async_response, key):
+    """
+    Read a JSON response until the list to stream is found.
+
+    See rtpy.streaming.stream_json_items, the content read is returned
+    (instead of loaded) if the response holds no list to stream.
+
+    Returns
+    -------
+    items: asynchronous iterator or None
+        Items of the list, None if the response holds no list to stream
+    content: bytes
+        Content read if the response holds no list to stream
+
+    """
+    parser = JsonItemsParser(key)
+    chunks = async_response.content.iter_chunked(JSON_CHUNK_SIZE)
+    read = []
+    try:
+        async for chunk in chunks:
+            read.append(chunk)
+            items = parser.feed(chunk)
+            if parser.streaming:
+                return _iterate_json_items(async_response, parser, items, chunks), b""
+            if parser.streaming is not None:
+                break
+    except ValueError:
+        # Not valid JSON, loaded as is
+        pass
+    except Exception:
+        async_response.release()
+        raise
+    return None, b"".join(read)
+
+
+async def _iterate_json_items(async_response, parser, items, chunks):
+    """Iterate asynchronously over the items of a JSON list in a response."""
+    try:
+        for item in items:
+            yield item
+        async for chunk in chunks:
+            for item in parser.feed(chunk):
+                yield item
+        for item in parser.close():
+            yield item
+    finally:
+        async_response.release()
+
+
+async def _iterate_upload(upload):
+    """Iterate asynchronously over the chunks of a rtpy.tools.UploadBuffer."""
+    for chunk in upload:
+        yield chunk
+
+
+class AsyncRtpyArtifactsAndStorage(AsyncRtpyBase, RtpyArtifactsAndStorage):
+    """
+    ARTIFACTS AND STORAGE methods category (awaitable methods).
+
+    The reads and writes of the "artifact_cache" setting are blocking.
+
+    """
+
+    async def _lookup_cached_artifact(
+        self, artifact_cache, repo_key, artifact_path, kwargs
+    ):
+        """See RtpyArtifactsAndStorage._lookup_cached_artifact."""
+        key = artifact_key(self._setting(kwargs, "af_url"), repo_key, artifact_path)
+        if not artifact_cache.validate:
+            return key, None, artifact_cache.lookup(key)
+
+        settings = self._settings_if_settings_in_kwargs(kwargs) or {}
+        settings = dict(settings, raw_response=False, stream_json=False)
+        try:
+            r = await self.file_info(repo_key, artifact_path, settings=settings)
+        except self.AfApiError:
+            return key, None, None
+        sha256 = r.get("checksums", {}).get("sha256")
+        if not sha256:
+            return key, None, None
+        return key, sha256, artifact_cache.lookup(key, sha256)
+
+    async def _retrieve_cached_artifact(
+        self, artifact_cache, repo_key, artifact_path, target, api_method, kwargs
+    ):
+        """See RtpyArtifactsAndStorage._retrieve_cached_artifact."""
+        key, sha256, path = await self._lookup_cached_artifact(
+            artifact_cache, repo_key, artifact_path, kwargs
+        )
+        if path is not None:
+            return cached_response(path, self._setting(kwargs, "af_url") + target)
+
+        response = await self._request(
+            "GET", target, api_method, kwargs, byte_output=True, no_api=True
+        )
+        if response.status_code == 200:
+            sha256 = sha256 or response.headers.get("X-Checksum-Sha256")
+            artifact_cache.store(key, memoryview(response.content), sha256)
+        return response
+
+    async def _download_cached_artifact(
+        self,
+        artifact_cache,
+        repo_key,
+        artifact_path,
+        target,
+        api_method,
+        kwargs,
+        destination,
+        chunk_size,
+        checksums,
+    ):
+        """See RtpyArtifactsAndStorage._download_cached_artifact."""
+        key, sha256, path = await self._lookup_cached_artifact(
+            artifact_cache, repo_key, artifact_path, kwargs
+        )
+        if path is not None:
+            return _copy_cached_artifact(path, destination, chunk_size, checksums)
+
+        r = await self._download(
+            target,
+            api_method,
+            kwargs,
+            destination,
+            chunk_size,
+            no_api=True,
+            checksums=checksums,
+        )
+        if isinstance(r, dict) and not hasattr(destination, "write"):
+            artifact_cache.store(key, destination, r["sha256"], verified=True)
+        return r
+
+    async def walk_folder(
+        self, repo_key, folder_path="", max_workers=8, deep_list_threshold=500, **kwargs
+    ):
+        """
+        Walk a folder tree breadth-first, yielding the info of each folder.
+
+        Asynchronous generator (async for), see
+        rtpy.artifacts_and_storage.RtpyArtifactsAndStorage.walk_folder,
+        the folder_info calls run in tasks.
+
+        """
+        kwargs = self._decoded_kwargs(kwargs)
+        folder_path = folder_path.strip("/")
+        queue = collections.deque([folder_path])
+        discovered = 1
+        walked = set()
+        deep_list = False
+        pending = {}
+        try:
+            while queue or pending:
+                if deep_list_threshold is not None and discovered > deep_list_threshold:
+                    deep_list = True
+                    break
+                while queue and len(pending) < max_workers:
+                    path = queue.popleft()
+                    task = asyncio.ensure_future(
+                        self.folder_info(repo_key, path, **kwargs)
+                    )
+                    pending[task] = path
+                done, _ = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    path = pending.pop(task)
+                    info = task.result()
+                    for child in info.get("children", []):
+                        if child["folder"]:
+                            queue.append(_child_path(path, child["uri"]))
+                            discovered += 1
+                    walked.add(path)
+                    yield path, info
+        finally:
+            for task in pending:
+                task.cancel()
+
+        if not deep_list:
+            return
+        r = await self.file_list(
+            repo_key, folder_path, "&deep=1&listFolders=1", **kwargs
+        )
+        for path, info in _folder_infos(repo_key, folder_path, r["files"]):
+            if path not in walked:
+                yield path, info
+
+
+class AsyncRtpyBuilds(AsyncRtpyBase, RtpyBuilds):
+    """BUILDS methods category (awaitable methods)."""
+
+    pass
+
+
+class AsyncRtpyRepositories(AsyncRtpyBase, RtpyRepositories):
+    """REPOSITORIES methods category (awaitable methods)."""
+
+    pass
+
+
+class AsyncRtpySearches(AsyncRtpyBase, RtpySearches):
+    """SEARCHES methods category (awaitable methods)."""
+
+    async def iter_artifactory_query_language(
+        self, query, page_size=1000, prefetch=True, **kwargs
+    ):
+        """
+        Iterate lazily over the results of an AQL query, page by page.
+
+        Asynchronous generator (async for), see
+        rtpy.searches.RtpySearches.iter_artifactory_query_language,
+        the next page is prefetched in a task.
+
+        """
+        kwargs = self._decoded_kwargs(kwargs)
+        query, offset, end = _aql_window(query, page_size)
+
+        async def fetch(page_offset):
+            page_query, size = _aql_page(query, page_offset, end, page_size)
+            r = await self.artifactory_query_language(page_query, **kwargs)
+            return size, r["results"]
+
+        next_page = None
+        try:
+            while end is None or offset < end:
+                if next_page is None:
+                    size, results = await fetch(offset)
+                else:
+                    size, results = await next_page
+                    next_page = None
+                offset += len(results)
+                last_page = len(results) < size or (end is not None and offset >= end)
+                if prefetch and not last_page:
+                    next_page = asyncio.ensure_future(fetch(offset))
+                for item in results:
+                    yield item
+                if last_page:
+                    return
+        finally:
+            if next_page is not None:
+                next_page.cancel()
+
+
+class AsyncRtpySecurity(AsyncRtpyBase, RtpySecurity):
+    """SECURITY methods category (awaitable methods)."""
+
+    pass
+
+
+class AsyncRtpySystemAndConfiguration(AsyncRtpyBase, RtpySystemAndConfiguration):
+    """SYSTEM AND CONFIGURATION methods category (awaitable methods)."""
+
+    pass
+
+
+class AsyncRtpy(RtpyBase):
+    """
+    Main parent class for asyncio, every method of the categories is awaitable.
+
+    Requires Python 3.6+ and the aiohttp package (pip install rtpy[async]).
+
+    Parameters
+    ---------
+    settings: dict
+        The user settings, same keys as for rtpy.Rtpy,
+        "session" can be an aiohttp.ClientSession.
+        "pool_block" is ignored (aiohttp always waits for a free connection).
+
+    Attributes
+    ----------
+    artifacts_and_storage: rtpy.aio.AsyncRtpyArtifactsAndStorage
+        Category for multiple API methods
+    builds: rtpy.aio.AsyncRtpyBuilds
+        Category for multiple API methods
+    repositories: rtpy.aio.AsyncRtpyRepositories
+        Category for multiple API methods
+    searches: rtpy.aio.AsyncRtpySearches
+        Category for multiple API methods
+    security: rtpy.aio.AsyncRtpySecurity
+        Category for multiple API methods
+    system_and_configuration: rtpy.aio.AsyncRtpySystemAndConfiguration
+        Category for multiple API methods
+    settings: dict
+        Previously supplied settings at class instantiation
+    transport: rtpy.aio.AsyncTransport
+        HTTP transport shared by all the categories
+
+    Examples
+    --------
+    >>> async with rtpy.AsyncRtpy(settings) as af:
+    ...     r = await af.artifacts_and_storage.file_info("repo_key", "file_path")
+
+    """
+
+    def __init__(self, settings):
+        """Object Instantiation."""
+        if aiohttp is None:
+            raise ImportError(
+                "The aiohttp package is required to use AsyncRtpy, "
+                "install it with : pip install rtpy[async]"
+            )
+        settings = dict(settings)
+        session = settings.get("session")
+        if session is not None and not isinstance(session, aiohttp.ClientSession):
+            raise UserSettingsError("session must be an aiohttp.ClientSession!")
+        categories_settings = dict(settings)
+        categories_settings["session"] = AsyncTransport(settings, session)
+
+        self.artifacts_and_storage = AsyncRtpyArtifactsAndStorage(
+            categories_settings, "storage/", "[ARTIFACTS & STORAGE] : "
+        )
+        self.builds = AsyncRtpyBuilds(categories_settings, "build/", "[BUILDS] : ")
+        self.repositories = AsyncRtpyRepositories(
+            categories_settings, "repositories/", "[REPOSITORIES] : "
+        )
+        self.searches = AsyncRtpySearches(
+            categories_settings, "search/", "[SEARCHES] : "
+        )
+        self.security = AsyncRtpySecurity(
+            categories_settings, "security/", "[SECURITY] : "
+        )
+        self.system_and_configuration = AsyncRtpySystemAndConfiguration(
+            categories_settings, "system/", "[SYSTEM & CONFIGURATION] : "
+        )
+        self.settings = settings
+        self.transport = categories_settings["session"]
+
+    def __call__(self):
+        """Shortcut to all the system health ping method to verify connectivity."""
+        return self.system_and_configuration.system_health_ping()
+
+    async def close(self):
+        """Close the underlying HTTP session."""
+        await self.transport.close()
+
+    async def __aenter__(self):
+        """Enter the async context manager."""
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        """Close the HTTP session when leaving the async context manager."""
+        await self.close()
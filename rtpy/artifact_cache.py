@@ -0,0 +1,283 @@
+# coding: utf-8
+
+# Copyright (C) 2018 Orange
+#
+# This software is distributed under the terms and conditions of the 'Apache-2.0'
+# license which can be found in the 'LICENSE.md' file
+# or at 'http://www.apache.org/licenses/LICENSE-2.0'.
+
+"""ArtifactCache class definition, persistent content-addressed artifact store."""
+
+from __future__ import unicode_literals
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+
+from requests import Response
+from requests.structures import CaseInsensitiveDict
+
+from .checksums import _is_path, file_checksums
+
+
+class ArtifactCache(object):
+    """
+    Local store of artifacts keyed by their SHA-256 checksum, with a path index.
+
+    Given as the "artifact_cache" setting of a rtpy.Rtpy object,
+    retrieve_artifact and download_artifact serve the artifacts from the
+    store when their SHA-256 checksum (given by file_info) matches.
+    Identical artifacts are stored once. The directory can be shared by
+    several processes, all the files are written atomically.
+    The least recently used artifacts are evicted when the store
+    exceeds its size budget.
+
+    Layout of the directory : objects/<sha256[:2]>/<sha256> for the artifacts,
+    index/<key hash[:2]>/<key hash> holding the SHA-256 checksum of an
+    artifact path (the key is the Artifactory URL, the repository and the path).
+
+    Parameters
+    ----------
+    directory: str
+        Local directory of the store, created if needed
+    max_size: int, optional
+        Size budget in bytes, 10 GiB by default
+    validate: bool, optional
+        True to verify with a file_info call that the cached artifact is still
+        the current one (the permissions are checked too), False to trust the
+        index without calling Artifactory, True by default
+
+    Attributes
+    ----------
+    hits: int
+        Number of artifacts served from the store
+    misses: int
+        Number of artifacts not found in the store
+
+    Examples
+    --------
+    >>> artifact_cache = rtpy.ArtifactCache("/var/cache/rtpy", max_size=50 * 1024 ** 3)
+    >>> af = rtpy.Rtpy(dict(settings, artifact_cache=artifact_cache))
+
+    """
+
+    def __init__(self, directory, max_size=10 * 1024**3, validate=True):
+        """Object instantiation."""
+        self.directory = os.path.abspath(directory)
+        self.max_size = max_size
+        self.validate = validate
+        self.hits = 0
+        self.misses = 0
+        self._size = None
+        self._lock = threading.Lock()
+        for name in ["objects", "index"]:
+            _makedirs(os.path.join(self.directory, name))
+
+    def lookup(self, key, sha256=None):
+        """
+        Return the local path of a cached artifact.
+
+        Parameters
+        ----------
+        key: str
+            Key of the artifact (see the artifact_key function)
+        sha256: str, optional
+            Current SHA-256 checksum of the artifact, the one of the index
+            is used if not provided
+
+        Returns
+        -------
+        path: str or None
+            Path of the artifact in the store, None if not cached
+
+        """
+        indexed_sha256 = self._read_index(key)
+        sha256 = (sha256 or indexed_sha256 or "").lower()
+        path = self._object_path(sha256) if sha256 else None
+        if path is None or not os.path.isfile(path):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        if sha256 != indexed_sha256:
+            self._write_index(key, sha256)
+        try:
+            # The modification time tracks the last use for the LRU eviction
+            os.utime(path, None)
+        except OSError:
+            # Evicted by another process in the meantime
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return path
+
+    def store(self, key, source, sha256=None, verified=False):
+        """
+        Add an artifact to the store and index it.
+
+        Parameters
+        ----------
+        key: str
+            Key of the artifact (see the artifact_key function)
+        source: str or buffer
+            Local path or content of the artifact (bytes, memoryview...)
+        sha256: str, optional
+            Expected SHA-256 checksum, the artifact is not stored if it differs
+        verified: bool, optional
+            True if sha256 was computed from the source (while downloading it),
+            the source isn't hashed again, False by default
+
+        Returns
+        -------
+        sha256: str or None
+            SHA-256 checksum of the artifact, None if it was not stored
+
+        """
+        if verified and sha256:
+            actual_sha256 = sha256.lower()
+        else:
+            actual_sha256 = file_checksums(source, ["sha256"])["sha256"]
+            if sha256 and sha256.lower() != actual_sha256:
+                return None
+
+        path = self._object_path(actual_sha256)
+        if not os.path.isfile(path):
+            _makedirs(os.path.dirname(path))
+            file_descriptor, temporary_path = tempfile.mkstemp(
+                dir=os.path.dirname(path), suffix=".part"
+            )
+            try:
+                with os.fdopen(file_descriptor, "wb") as files:
+                    if _is_path(source):
+                        with open(source, "rb") as source_file:
+                            shutil.copyfileobj(source_file, files)
+                    else:
+                        files.write(source)
+                _replace_file(temporary_path, path)
+            except BaseException:
+                os.remove(temporary_path)
+                raise
+            with self._lock:
+                if self._size is not None:
+                    self._size += os.path.getsize(path)
+        self._write_index(key, actual_sha256)
+        self.evict()
+        return actual_sha256
+
+    def evict(self):
+        """Remove the least recently used artifacts exceeding the size budget."""
+        with self._lock:
+            if self._size is not None and self._size <= self.max_size:
+                return
+            objects = []
+            for root, _, files in os.walk(os.path.join(self.directory, "objects")):
+                for name in files:
+                    if name.endswith(".part"):
+                        # Being written by another process
+                        continue
+                    path = os.path.join(root, name)
+                    try:
+                        status = os.stat(path)
+                    except OSError:
+                        continue
+                    objects.append((status.st_mtime, status.st_size, path))
+            self._size = sum(size for _, size, _ in objects)
+            for _, size, path in sorted(objects):
+                if self._size <= self.max_size:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                self._size -= size
+
+    def clear(self):
+        """Remove all the artifacts and the index."""
+        with self._lock:
+            for name in ["objects", "index"]:
+                shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+                _makedirs(os.path.join(self.directory, name))
+            self._size = 0
+
+    def _object_path(self, sha256):
+        """Return the path of an artifact in the store."""
+        return os.path.join(self.directory, "objects", sha256[:2], sha256)
+
+    def _index_path(self, key):
+        """Return the path of the index entry of a key."""
+        key_hash = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, "index", key_hash[:2], key_hash)
+
+    def _read_index(self, key):
+        """Return the SHA-256 checksum indexed for a key (None if missing)."""
+        try:
+            with open(self._index_path(key), "rb") as files:
+                return files.read().decode("ascii").strip() or None
+        except (IOError, OSError):
+            return None
+
+    def _write_index(self, key, sha256):
+        """Index the SHA-256 checksum of a key."""
+        path = self._index_path(key)
+        _makedirs(os.path.dirname(path))
+        file_descriptor, temporary_path = tempfile.mkstemp(
+            dir=os.path.dirname(path), suffix=".part"
+        )
+        with os.fdopen(file_descriptor, "wb") as files:
+            files.write(sha256.encode("ascii"))
+        _replace_file(temporary_path, path)
+
+
+def artifact_key(af_url, repo_key, artifact_path):
+    """Return the key of an artifact in an ArtifactCache."""
+    return af_url.rstrip("/") + "/" + repo_key + "/" + artifact_path.lstrip("/")
+
+
+def cached_response(path, url):
+    """
+    Build a requests.Response serving an artifact from an ArtifactCache.
+
+    Parameters
+    ----------
+    path: str
+        Path of the artifact in the store
+    url: str
+        URL of the artifact
+
+    """
+    response = Response()
+    response.status_code = 200
+    response.reason = "OK"
+    response.url = url
+    with open(path, "rb") as files:
+        response._content = files.read()
+    response.headers = CaseInsensitiveDict(
+        {
+            "Content-Length": str(len(response._content)),
+            "X-Checksum-Sha256": os.path.basename(path),
+        }
+    )
+    return response
+
+
+def _makedirs(path):
+    """Create a directory and its parents if they don't exist."""
+    try:
+        os.makedirs(path)
+    except OSError:
+        if not os.path.isdir(path):
+            raise
+
+
+def _replace_file(source, destination):
+    """Rename source to destination, overwriting destination if it exists."""
+    try:
+        os.replace(source, destination)
+    except AttributeError:
+        # Python 2, rename overwrites on POSIX systems only
+        if os.path.exists(destination):
+            os.remove(destination)
+        os.rename(source, destination)
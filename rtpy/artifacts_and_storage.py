@@ -8,7 +8,13 @@
 
 """Functions for the ARTIFACTS AND STORAGE REST API Methods category."""
 
-from .tools import RtpyBase
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from .artifact_cache import artifact_key, cached_response
+from .checksums import iter_chunks
+from .tools import DEFAULT_CHUNK_SIZE, DownloadWriter, RtpyBase, UploadBuffer, _is_path
+from .tracing import propagate
 
 
 class RtpyArtifactsAndStorage(RtpyBase):
@@ -231,6 +237,9 @@ class RtpyArtifactsAndStorage(RtpyBase):
         """
         Retrieve an artifact from the specified destination.
 
+        With the "artifact_cache" setting, the artifact is served from the
+        local store when its SHA-256 checksum matches.
+
         Parameters
         ----------
         repo_key: str
@@ -246,10 +255,168 @@ class RtpyArtifactsAndStorage(RtpyBase):
             message = "artifact path can't be empty !"
             raise self.RtpyError(message)
         target = "/" + repo_key + "/" + artifact_path
+        artifact_cache = self._setting(kwargs, "artifact_cache")
+        if artifact_cache is not None:
+            return self._retrieve_cached_artifact(
+                artifact_cache, repo_key, artifact_path, target, api_method, kwargs
+            )
         return self._request(
             "GET", target, api_method, kwargs, byte_output=True, no_api=True
         )
 
+    def download_artifact(
+        self,
+        repo_key,
+        artifact_path,
+        destination,
+        chunk_size=DEFAULT_CHUNK_SIZE,
+        checksums=None,
+        **kwargs
+    ):
+        """
+        Download an artifact to a local file without loading it in memory.
+
+        The content is streamed in chunks while its SHA-1 and SHA-256 checksums
+        are computed, they are verified against the checksums sent by Artifactory
+        and the expected checksums if provided.
+        With the "artifact_cache" setting, the artifact is copied from the
+        local store when its SHA-256 checksum matches.
+
+        Parameters
+        ----------
+        repo_key: str
+            Key of the repository
+        artifact_path: str
+            Path of the artifact in the repository
+        destination: str or file object
+            Local path or file object opened in binary mode
+        chunk_size: int, optional
+            Size of the chunks read from the network (1 MiB by default)
+        checksums: dict, optional
+            Expected {"sha1": str, "sha256": str} checksums (both optional)
+        **kwargs
+            Keyword arguments
+
+        Raises
+        ------
+        ChecksumError
+            If the downloaded content doesn't match the expected checksums
+
+        Returns
+        -------
+        checksums: dict
+            {"sha1": str, "sha256": str, "size": int}
+
+        """
+        api_method = self._category + "Download Artifact"
+        if artifact_path == "":
+            message = "artifact path can't be empty !"
+            raise self.RtpyError(message)
+        target = "/" + repo_key + "/" + artifact_path
+        artifact_cache = self._setting(kwargs, "artifact_cache")
+        if artifact_cache is not None:
+            return self._download_cached_artifact(
+                artifact_cache,
+                repo_key,
+                artifact_path,
+                target,
+                api_method,
+                kwargs,
+                destination,
+                chunk_size,
+                checksums,
+            )
+        return self._download(
+            target,
+            api_method,
+            kwargs,
+            destination,
+            chunk_size,
+            no_api=True,
+            checksums=checksums,
+        )
+
+    def _lookup_cached_artifact(self, artifact_cache, repo_key, artifact_path, kwargs):
+        """
+        Look for an artifact in a rtpy.ArtifactCache.
+
+        When the cache validates its entries, the current SHA-256 checksum
+        is given by file_info.
+
+        Returns
+        -------
+        tuple
+            (key, sha256, path), path is None if the artifact is not cached,
+            sha256 is None if unknown
+
+        """
+        key = artifact_key(self._setting(kwargs, "af_url"), repo_key, artifact_path)
+        if not artifact_cache.validate:
+            return key, None, artifact_cache.lookup(key)
+
+        settings = self._settings_if_settings_in_kwargs(kwargs) or {}
+        settings = dict(settings, raw_response=False, stream_json=False)
+        try:
+            r = self.file_info(repo_key, artifact_path, settings=settings)
+        except self.AfApiError:
+            # The error is raised (or returned) by the artifact request
+            return key, None, None
+        sha256 = r.get("checksums", {}).get("sha256")
+        if not sha256:
+            return key, None, None
+        return key, sha256, artifact_cache.lookup(key, sha256)
+
+    def _retrieve_cached_artifact(
+        self, artifact_cache, repo_key, artifact_path, target, api_method, kwargs
+    ):
+        """Retrieve an artifact from a rtpy.ArtifactCache, store it if missing."""
+        key, sha256, path = self._lookup_cached_artifact(
+            artifact_cache, repo_key, artifact_path, kwargs
+        )
+        if path is not None:
+            return cached_response(path, self._setting(kwargs, "af_url") + target)
+
+        response = self._request(
+            "GET", target, api_method, kwargs, byte_output=True, no_api=True
+        )
+        if response.status_code == 200:
+            sha256 = sha256 or response.headers.get("X-Checksum-Sha256")
+            artifact_cache.store(key, memoryview(response.content), sha256)
+        return response
+
+    def _download_cached_artifact(
+        self,
+        artifact_cache,
+        repo_key,
+        artifact_path,
+        target,
+        api_method,
+        kwargs,
+        destination,
+        chunk_size,
+        checksums,
+    ):
+        """Download an artifact from a rtpy.ArtifactCache, store it if missing."""
+        key, sha256, path = self._lookup_cached_artifact(
+            artifact_cache, repo_key, artifact_path, kwargs
+        )
+        if path is not None:
+            return _copy_cached_artifact(path, destination, chunk_size, checksums)
+
+        r = self._download(
+            target,
+            api_method,
+            kwargs,
+            destination,
+            chunk_size,
+            no_api=True,
+            checksums=checksums,
+        )
+        # A file object destination can't be read back
+        if isinstance(r, dict) and _is_path(destination):
+            artifact_cache.store(key, destination, r["sha256"], verified=True)
+        return r
+
     # Unsupported methods
     # def retrieve_latest_artifact():
     # def retrieve_build_artifacts_archive():
@@ -278,6 +445,62 @@ class RtpyArtifactsAndStorage(RtpyBase):
 
         """
         api_method = self._category + "Retrieve Folder or Repository Archive"
+        target = self._archive_target(repo_key, path, archive_type, include_checksums)
+        return self._request("GET", target, api_method, kwargs, byte_output=True)
+
+    def download_folder_or_repository_archive(
+        self,
+        repo_key,
+        path,
+        archive_type,
+        destination,
+        include_checksums=False,
+        chunk_size=DEFAULT_CHUNK_SIZE,
+        **kwargs
+    ):
+        """
+        Download an archive file (supports zip/tar/tar.gz/tgz) to a local file.
+
+        Same as retrieve_folder_or_repository_archive but the archive is streamed
+        in chunks without being loaded in memory.
+
+        Parameters
+        ----------
+        repo_key: str
+            Key of the repository
+        path: str
+            Path of the folder in the repository
+        archive_type: str
+            Type of archive
+        destination: str or file object
+            Local path or file object opened in binary mode
+        include_checksums: bool, optional
+            True to include checksums, False by default
+        chunk_size: int, optional
+            Size of the chunks read from the network (1 MiB by default)
+        **kwargs
+            Keyword arguments
+
+        Returns
+        -------
+        checksums: dict
+            {"sha1": str, "sha256": str, "size": int} of the archive
+
+        """
+        api_method = self._category + "Download Folder or Repository Archive"
+        target = self._archive_target(repo_key, path, archive_type, include_checksums)
+        return self._download(target, api_method, kwargs, destination, chunk_size)
+
+    def _archive_target(self, repo_key, path, archive_type, include_checksums):
+        """
+        Build the target of the folder or repository archive download.
+
+        Raises
+        ------
+        RtpyError
+            If the archive type is not supported
+
+        """
         if archive_type not in ["zip", "tar", "tar.gz", "tgz"]:
             message = "archive_type must be zip, tar, tar.gz or tgz !"
             raise self.RtpyError(message)
@@ -289,7 +512,7 @@ class RtpyArtifactsAndStorage(RtpyBase):
             target = target + "&includeChecksumFiles=true"
         if not include_checksums:
             target = target + "&includeChecksumFiles=false"
-        return self._request("GET", target, api_method, kwargs, byte_output=True)
+        return target
 
     def trace_artifact_retrieval(self, repo_key, item_path, **kwargs):
         """
@@ -332,29 +555,78 @@ class RtpyArtifactsAndStorage(RtpyBase):
         return self._request("PUT", target, api_method, kwargs, no_api=True)
 
     def deploy_artifact(
-        self, repo_key, local_artifact_path, target_artifact_path, **kwargs
+        self,
+        repo_key,
+        local_artifact_path,
+        target_artifact_path,
+        chunk_size=None,
+        progress=None,
+        checksums=None,
+        byte_range=None,
+        **kwargs
     ):
         """
         Deploy an artifact to the specified destination.
 
+        When one of chunk_size, progress, checksums or byte_range is provided
+        or when local_artifact_path is a buffer, the content is memory-mapped
+        (for a file) and streamed in fixed-size chunks without copies.
+
         Parameters
         ----------
         repo_key: str
             Key of the repository
-        local_artifact_path: str
-            Local path of the artifact to upload
+        local_artifact_path: str or buffer
+            Local path of the artifact to upload, or object supporting the
+            buffer protocol (bytes, bytearray, memoryview, mmap...)
         target_artifact_path: str
             Target path of the artifact in the repository
+        chunk_size: int, optional
+            Size of the uploaded chunks (1 MiB by default)
+        progress: callable, optional
+            Called after each chunk with the number of bytes sent,
+            the total number of bytes and the throughput in bytes per second
+        checksums: dict or bool, optional
+            {"sha1": str, "sha256": str} checksums (both optional) sent as
+            X-Checksum-Sha1/X-Checksum-Sha256 headers for the server to verify
+            the upload, True to compute them before uploading
+        byte_range: tuple, optional
+            (start, stop) offsets of the part of the content to upload
+            (stop excluded)
         **kwargs
             Keyword arguments
 
         """
         api_method = self._category + "Deploy Artifact"
         target = "/" + repo_key + "/" + target_artifact_path
-        with open(local_artifact_path, "rb") as files:
-            return self._request(
-                "PUT", target, api_method, kwargs, data=files, no_api=True
-            )
+        buffer_mode = not _is_path(local_artifact_path) or any(
+            option is not None
+            for option in [chunk_size, progress, checksums, byte_range]
+        )
+        if not buffer_mode:
+            with open(local_artifact_path, "rb") as files:
+                return self._request(
+                    "PUT", target, api_method, kwargs, data=files, no_api=True
+                )
+
+        upload = UploadBuffer(
+            local_artifact_path,
+            chunk_size=chunk_size or DEFAULT_CHUNK_SIZE,
+            progress=progress,
+            byte_range=byte_range,
+        )
+        if checksums is True:
+            checksums = upload.checksums()
+        params = None
+        if checksums:
+            params = {}
+            if checksums.get("sha1"):
+                params["X-Checksum-Sha1"] = checksums["sha1"]
+            if checksums.get("sha256"):
+                params["X-Checksum-Sha256"] = checksums["sha256"]
+        return self._request(
+            "PUT", target, api_method, kwargs, data=upload, no_api=True, params=params
+        )
 
     def deploy_artifact_by_checksum(
         self, repo_key, target_artifact_path, sha_type, sha_value, **kwargs
@@ -588,6 +860,83 @@ class RtpyArtifactsAndStorage(RtpyBase):
         target = self._append_to_string(target, options)
         return self._request("GET", target, api_method, kwargs)
 
+    def walk_folder(
+        self, repo_key, folder_path="", max_workers=8, deep_list_threshold=500, **kwargs
+    ):
+        """
+        Walk a folder tree breadth-first, yielding the info of each folder.
+
+        The folder_info calls of the subfolders run concurrently and the
+        folders are yielded as their info arrives. Once more than
+        deep_list_threshold folders are discovered, the rest of the tree
+        is retrieved with a single deep file_list call (listFolders=1),
+        cheaper than one call per folder on deep layouts (Maven...).
+        The info of these folders is built from the file list : "repo",
+        "path" and the "children" with the file list fields of each child
+        ("size", "lastModified", "sha1"...).
+
+        Parameters
+        ----------
+        repo_key: str
+            Key of the repository
+        folder_path: str, optional
+            Path of the folder to walk, the root of the repository by default
+        max_workers: int, optional
+            Number of concurrent folder_info calls, 8 by default
+        deep_list_threshold: int, optional
+            Number of folders discovered above which the rest of the tree is
+            retrieved with a deep file list, 500 by default, None to only use
+            folder_info calls, 0 to only use the deep file list
+        **kwargs
+            Keyword arguments
+
+        Returns
+        -------
+        folders: iterator
+            (path, info) tuples, path being relative to the repository root
+
+        """
+        kwargs = self._decoded_kwargs(kwargs)
+        folder_path = folder_path.strip("/")
+        queue = deque([folder_path])
+        discovered = 1
+        walked = set()
+        deep_list = False
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        pending = {}
+        try:
+            while queue or pending:
+                if deep_list_threshold is not None and discovered > deep_list_threshold:
+                    deep_list = True
+                    break
+                while queue and len(pending) < max_workers:
+                    path = queue.popleft()
+                    future = executor.submit(
+                        propagate(self.folder_info), repo_key, path, **kwargs
+                    )
+                    pending[future] = path
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    path = pending.pop(future)
+                    info = future.result()
+                    for child in info.get("children", []):
+                        if child["folder"]:
+                            queue.append(_child_path(path, child["uri"]))
+                            discovered += 1
+                    walked.add(path)
+                    yield path, info
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+        if not deep_list:
+            return
+        r = self.file_list(repo_key, folder_path, "&deep=1&listFolders=1", **kwargs)
+        for path, info in _folder_infos(repo_key, folder_path, r["files"]):
+            if path not in walked:
+                yield path, info
+
     def get_background_tasks(self, **kwargs):
         """
         Retrieve list of background tasks currently scheduled.
@@ -668,3 +1017,64 @@ class RtpyArtifactsAndStorage(RtpyBase):
     # def get_puppet_module()
     # def get_puppet_releases()
     # def get_puppet_release()
+
+
+def _child_path(path, uri):
+    """Return the path of a child (uri "/name") of a folder."""
+    return (path + "/" + uri.strip("/")).strip("/")
+
+
+def _folder_infos(repo_key, folder_path, files):
+    """
+    Build the info of the folders of a deep file list (listFolders=1).
+
+    Parameters
+    ----------
+    repo_key: str
+        Key of the repository
+    folder_path: str
+        Path of the listed folder
+    files: list
+        "files" of the file list, the uris being relative to the listed folder
+
+    Returns
+    -------
+    folders: list
+        (path, info) tuples of the listed folder and its subfolders,
+        parents first
+
+    """
+    children = OrderedDict([(folder_path, [])])
+    for item in sorted(files, key=lambda item: item["uri"]):
+        path = _child_path(folder_path, item["uri"])
+        if item.get("folder"):
+            children.setdefault(path, [])
+        parent, _, name = path.rpartition("/")
+        child = dict(item, uri="/" + name)
+        children.setdefault(parent, []).append(child)
+
+    folders = []
+    for path in sorted(children, key=lambda path: (path.count("/"), path)):
+        info = {"repo": repo_key, "path": "/" + path, "children": children[path]}
+        folders.append((path, info))
+    return folders
+
+
+def _copy_cached_artifact(path, destination, chunk_size, checksums):
+    """
+    Copy an artifact of a rtpy.ArtifactCache to a destination.
+
+    Returns
+    -------
+    checksums: dict
+        {"sha1": str, "sha256": str, "size": int}
+
+    """
+    writer = DownloadWriter(destination)
+    try:
+        for chunk in iter_chunks(path, chunk_size):
+            writer.write(chunk)
+        return writer.close({}, checksums)
+    except BaseException:
+        writer.abort()
+        raise
@@ -0,0 +1,1572 @@
+# coding: utf-8
+
+# Copyright (C) 2018 Orange
+#
+# This software is distributed under the terms and conditions of the 'Apache-2.0'
+# license which can be found in the 'LICENSE.md' file
+# or at 'http://www.apache.org/licenses/LICENSE-2.0'.
+
+"""Bulk operations running many API calls concurrently."""
+
+from __future__ import unicode_literals
+import functools
+import json
+import os
+import tempfile
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+try:
+    from urllib.parse import quote
+except ImportError:
+    from urllib import quote
+
+from .artifact_cache import _makedirs, _replace_file
+from .checksums import file_checksums, map_file_checksums
+from .tools import DEFAULT_CHUNK_SIZE, RtpyBase
+from .tracing import propagate
+
+# Fields requested when the AQL query of a bulk download has no include clause
+AQL_DOWNLOAD_FIELDS = ["repo", "path", "name", "type", "size", "actual_sha1", "sha256"]
+
+# Checksums sent with the files of a bulk deploy
+DEPLOY_ALGORITHMS = ("sha1", "sha256")
+
+# Characters escaped with a backslash in the property values
+PROPERTY_SPECIAL_CHARACTERS = "\\,|=;"
+
+# Directions of a sync
+SYNC_DIRECTIONS = ("upload", "download", "both")
+
+# Version of the format of the sync state files
+SYNC_STATE_VERSION = 1
+
+
+def _traced(operation):
+    """
+    Run a bulk operation in a span of the "tracer" setting.
+
+    The span is the parent of the spans of the API calls of the operation,
+    its attributes count the results and the failed ones.
+
+    """
+
+    def decorator(method):
+        @functools.wraps(method)
+        def traced(self, *args, **kwargs):
+            tracer = self._artifacts_and_storage._config.tracer
+            if tracer is None:
+                return method(self, *args, **kwargs)
+            with tracer.span(
+                "[BULK] : " + operation, attributes={"rtpy.bulk.operation": operation}
+            ) as span:
+                results = method(self, *args, **kwargs)
+                span.set_attribute("rtpy.bulk.results", len(results))
+                span.set_attribute(
+                    "rtpy.bulk.failed",
+                    sum(1 for result in results if result["status"] == "failed"),
+                )
+                return results
+
+        return traced
+
+    return decorator
+
+
+class RtpyBulk(object):
+    """
+    Bulk operations on top of the methods categories.
+
+    Each operation takes many items and runs the API calls in a bounded pool
+    of worker threads sharing the pooled session of the rtpy.Rtpy object.
+    Failures are reported per item instead of stopping the whole operation.
+
+    Parameters
+    ----------
+    artifacts_and_storage: rtpy.artifacts_and_storage.RtpyArtifactsAndStorage
+        Category used for the storage operations
+    searches: rtpy.searches.RtpySearches
+        Category used for the AQL queries
+    max_workers: int
+        Default number of concurrent API calls
+
+    """
+
+    def __init__(self, artifacts_and_storage, searches, max_workers):
+        """Object instantiation."""
+        self._artifacts_and_storage = artifacts_and_storage
+        self._searches = searches
+        self._max_workers = max_workers
+
+    @_traced("Download")
+    def download(
+        self,
+        source,
+        local_directory,
+        include_repo_key=False,
+        skip_existing=True,
+        max_workers=None,
+        chunk_size=DEFAULT_CHUNK_SIZE,
+    ):
+        """
+        Download many artifacts to a local directory.
+
+        Each artifact is streamed to disk and verified against the checksums
+        reported by AQL (actual_sha1 and sha256 when present)
+        and by Artifactory when downloading.
+
+        Parameters
+        ----------
+        source: str or list
+            AQL query (items.find(...)) or list of (repo_key, artifact_path) tuples,
+            the "repo", "path", "name", "type", "size", "actual_sha1" and "sha256"
+            fields are included if the query has no include clause
+        local_directory: str
+            Local directory, the artifacts are written under their repository path
+        include_repo_key: bool, optional
+            True to write the artifacts under a directory named after their
+            repository, False by default
+        skip_existing: bool, optional
+            True to skip the local files matching the checksum reported by AQL,
+            True by default
+        max_workers: int, optional
+            Number of concurrent downloads,
+            the "pool_maxsize" setting of the rtpy.Rtpy object by default
+        chunk_size: int, optional
+            Size of the chunks read from the network (1 MiB by default)
+
+        Returns
+        -------
+        results: list
+            One dictionary per artifact :
+            {"repo": str, "path": str, "local_path": str,
+            "status": "downloaded"/"skipped"/"failed",
+            "checksums": dict or None, "error": Exception or None}
+
+        """
+        items = self._download_items(source)
+
+        def download_item(item):
+            repo_key, artifact_path, checksums = item
+            result = {
+                "repo": repo_key,
+                "path": artifact_path,
+                "local_path": None,
+                "status": "failed",
+                "checksums": None,
+                "error": None,
+            }
+            try:
+                local_path = _local_path(
+                    local_directory, repo_key, artifact_path, include_repo_key
+                )
+                result["local_path"] = local_path
+                if skip_existing and _matches_checksums(local_path, checksums):
+                    result["status"] = "skipped"
+                    result["checksums"] = checksums
+                    return result
+
+                _makedirs(os.path.dirname(local_path))
+                result["checksums"] = self._artifacts_and_storage.download_artifact(
+                    repo_key,
+                    artifact_path,
+                    local_path,
+                    chunk_size=chunk_size,
+                    checksums=checksums,
+                )
+                result["status"] = "downloaded"
+            except Exception as error:
+                result["error"] = error
+            return result
+
+        return list(
+            run_concurrently(download_item, items, max_workers or self._max_workers)
+        )
+
+    @_traced("Deploy")
+    def deploy(
+        self,
+        local_directory,
+        repo_key,
+        target_path="",
+        sha_type="sha1",
+        max_workers=None,
+        hash_workers=None,
+    ):
+        """
+        Deploy all the files of a local directory tree.
+
+        Each file is first deployed by checksum, its content is uploaded
+        only if Artifactory doesn't already store it (404 answer),
+        with its checksums for the server to verify it.
+        The checksums are computed in a pool of processes while the uploads
+        run in a pool of threads. With the process pool the calling script must
+        be protected by a if __name__ == "__main__" block on Windows and macOS.
+
+        Parameters
+        ----------
+        local_directory: str
+            Local directory to deploy
+        repo_key: str
+            Key of the target repository
+        target_path: str, optional
+            Path of the target folder in the repository, root by default
+        sha_type: str, optional
+            Type of secure hash used to deploy by checksum ("sha1" or "sha256"),
+            "sha1" by default
+        max_workers: int, optional
+            Number of concurrent uploads,
+            the "pool_maxsize" setting of the rtpy.Rtpy object by default
+        hash_workers: int, optional
+            Number of processes computing the checksums, the number of CPUs
+            by default, 0 to compute them in the upload threads
+
+        Returns
+        -------
+        results: list
+            One dictionary per file :
+            {"local_path": str, "repo": str, "path": str,
+            "status": "deployed_by_checksum"/"deployed"/"failed",
+            "checksums": dict or None, "error": Exception or None}
+
+        """
+        _check_sha_type(sha_type)
+
+        local_paths = []
+        for root, directories, files in os.walk(local_directory):
+            directories.sort()
+            for name in sorted(files):
+                local_paths.append(os.path.join(root, name))
+
+        def deploy_file(item):
+            local_path, checksums = item
+            relative_path = os.path.relpath(local_path, local_directory)
+            artifact_path = "/".join(relative_path.split(os.sep))
+            if target_path.strip("/"):
+                artifact_path = target_path.strip("/") + "/" + artifact_path
+            result = {
+                "local_path": local_path,
+                "repo": repo_key,
+                "path": artifact_path,
+                "status": "failed",
+                "checksums": checksums,
+                "error": None,
+            }
+            try:
+                if isinstance(checksums, Exception):
+                    raise checksums
+                if checksums is None:
+                    checksums = file_checksums(local_path, DEPLOY_ALGORITHMS)
+                    result["checksums"] = checksums
+                result["status"] = self._deploy_file(
+                    repo_key, local_path, artifact_path, sha_type, checksums
+                )
+            except Exception as error:
+                result["checksums"] = None
+                result["error"] = error
+            return result
+
+        max_workers = max_workers or self._max_workers
+        if hash_workers == 0:
+            items = ((local_path, None) for local_path in local_paths)
+            return list(run_concurrently(deploy_file, items, max_workers))
+
+        items = map_file_checksums(
+            local_paths, DEPLOY_ALGORITHMS, max_workers=hash_workers, processes=True
+        )
+        return list(run_concurrently(deploy_file, items, max_workers))
+
+    @_traced("Set Properties")
+    def set_properties(self, items, collapse_folders=False, max_workers=None):
+        """
+        Attach properties to many items.
+
+        Parameters
+        ----------
+        items: iterable
+            (repo_key, item_path, properties) tuples, properties being a dict
+            ({"name": "value"} or {"name": ["value1", "value2"]}, the special
+            characters are escaped) or a string of properties ("a=1;b=2")
+        collapse_folders: bool, optional
+            True to replace the calls on the files of a folder by one recursive
+            call on the folder when the batch holds all its files with the same
+            properties (the folder and its subfolders get the properties too),
+            one deep file list per group of items sharing a top-level folder,
+            False by default
+        max_workers: int, optional
+            Number of concurrent API calls,
+            the "pool_maxsize" setting of the rtpy.Rtpy object by default
+
+        Returns
+        -------
+        results: list
+            One dictionary per item :
+            {"repo": str, "path": str, "properties": str,
+            "folder": str or None (folder of the recursive call),
+            "status": "set"/"failed", "error": Exception or None}
+
+        """
+        return self._apply_properties(
+            self._artifacts_and_storage.set_item_properties,
+            items,
+            _properties_string,
+            "set",
+            collapse_folders,
+            max_workers,
+        )
+
+    @_traced("Delete Properties")
+    def delete_properties(self, items, collapse_folders=False, max_workers=None):
+        """
+        Delete properties from many items.
+
+        Parameters
+        ----------
+        items: iterable
+            (repo_key, item_path, properties) tuples, properties being a list
+            of names or a string of names ("a,b")
+        collapse_folders: bool, optional
+            True to replace the calls on the files of a folder by one recursive
+            call on the folder when the batch holds all its files with the same
+            properties, see set_properties, False by default
+        max_workers: int, optional
+            Number of concurrent API calls,
+            the "pool_maxsize" setting of the rtpy.Rtpy object by default
+
+        Returns
+        -------
+        results: list
+            One dictionary per item :
+            {"repo": str, "path": str, "properties": str,
+            "folder": str or None (folder of the recursive call),
+            "status": "deleted"/"failed", "error": Exception or None}
+
+        """
+        return self._apply_properties(
+            self._artifacts_and_storage.delete_item_properties,
+            items,
+            _property_names,
+            "deleted",
+            collapse_folders,
+            max_workers,
+        )
+
+    @_traced("Item Properties")
+    def item_properties(self, items, max_workers=None):
+        """
+        Retrieve the properties of many items.
+
+        Parameters
+        ----------
+        items: iterable
+            (repo_key, item_path) tuples or (repo_key, item_path, properties)
+            tuples to retrieve only some properties (list or string of names)
+        max_workers: int, optional
+            Number of concurrent API calls,
+            the "pool_maxsize" setting of the rtpy.Rtpy object by default
+
+        Returns
+        -------
+        results: list
+            One dictionary per item :
+            {"repo": str, "path": str, "properties": dict or None,
+            "status": "retrieved"/"missing" (no properties)/"failed",
+            "error": Exception or None}
+
+        """
+
+        def retrieve_properties(item):
+            repo_key, item_path = item[:2]
+            names = _property_names(item[2]) if len(item) > 2 else None
+            result = {
+                "repo": repo_key,
+                "path": item_path,
+                "properties": None,
+                "status": "failed",
+                "error": None,
+            }
+            try:
+                r = self._artifacts_and_storage.item_properties(
+                    repo_key, item_path, names
+                )
+                result["properties"] = r["properties"]
+                result["status"] = "retrieved"
+            except RtpyBase.AfApiError as error:
+                if error.status_code == 404:
+                    result["properties"] = {}
+                    result["status"] = "missing"
+                else:
+                    result["error"] = error
+            except Exception as error:
+                result["error"] = error
+            return result
+
+        return list(
+            run_concurrently(
+                retrieve_properties, items, max_workers or self._max_workers
+            )
+        )
+
+    @_traced("Copy")
+    def copy(
+        self,
+        source,
+        destination,
+        dry_run=False,
+        preview=True,
+        collapse_folders=True,
+        max_workers=None,
+    ):
+        """
+        Copy many artifacts with as few API calls as possible.
+
+        The artifacts are planned into copy calls, the files of a folder
+        holding only artifacts of the batch (mapped to the same target folder)
+        are copied with one call on the folder (see plan_transfer).
+        The calls are previewed with the dry run option of Artifactory,
+        only the calls without conflicts are performed (the artifacts of
+        a folder call in conflict are previewed again one by one).
+
+        Parameters
+        ----------
+        source: str or list
+            AQL query (items.find(...)) or list of (repo_key, artifact_path) tuples
+        destination: str or callable
+            Key of the target repository (the paths are kept) or function
+            called with (repo_key, artifact_path) returning the
+            (target_repo_key, target_path) tuple of an artifact
+        dry_run: bool, optional
+            True to only preview the calls, False by default
+        preview: bool, optional
+            True to preview the calls before performing them, True by default
+        collapse_folders: bool, optional
+            True to copy the folders holding only artifacts of the batch with one
+            call, True by default
+        max_workers: int, optional
+            Number of concurrent API calls,
+            the "pool_maxsize" setting of the rtpy.Rtpy object by default
+
+        Returns
+        -------
+        results: list
+            One dictionary per artifact :
+            {"repo": str, "path": str, "target_repo": str, "target_path": str,
+            "folder": str or None (source folder of the call),
+            "status": "copied"/"planned"/"conflict"/"failed",
+            "messages": list (messages of Artifactory),
+            "error": Exception or None}
+
+        """
+        return self._transfer(
+            self._artifacts_and_storage.copy_item,
+            "copied",
+            source,
+            destination,
+            dry_run,
+            preview,
+            collapse_folders,
+            max_workers,
+        )
+
+    @_traced("Move")
+    def move(
+        self,
+        source,
+        destination,
+        dry_run=False,
+        preview=True,
+        collapse_folders=True,
+        max_workers=None,
+    ):
+        """
+        Move many artifacts with as few API calls as possible.
+
+        See the copy method, the status of the moved artifacts is "moved".
+
+        """
+        return self._transfer(
+            self._artifacts_and_storage.move_item,
+            "moved",
+            source,
+            destination,
+            dry_run,
+            preview,
+            collapse_folders,
+            max_workers,
+        )
+
+    @_traced("Delete")
+    def delete(self, source, collapse_folders=True, trash_can=None, max_workers=None):
+        """
+        Delete many artifacts with as few API calls as possible.
+
+        The files of a folder holding only artifacts of the batch are deleted
+        with one call on the folder (which is deleted too), the other artifacts
+        are deleted one by one, concurrently.
+
+        Parameters
+        ----------
+        source: str or list
+            AQL query (items.find(...)) or list of (repo_key, artifact_path) tuples
+        collapse_folders: bool, optional
+            True to delete the folders holding only artifacts of the batch with
+            one call (one deep file list per group of artifacts sharing
+            a repository and a top-level folder), True by default
+        trash_can: str, optional
+            "clean" to permanently delete the deleted items from the trash can
+            (concurrently), "empty" to empty the whole trash can once the
+            artifacts are deleted, None (default) to keep them in the trash can
+        max_workers: int, optional
+            Number of concurrent API calls,
+            the "pool_maxsize" setting of the rtpy.Rtpy object by default
+
+        Returns
+        -------
+        results: list
+            One dictionary per artifact :
+            {"repo": str, "path": str,
+            "folder": str or None (folder of the call),
+            "status": "deleted"/"missing"/"failed",
+            "trash_can": None/"cleaned"/"emptied"/"failed",
+            "error": Exception or None}
+
+        """
+        if trash_can not in [None, "clean", "empty"]:
+            message = (
+                'trash_can must be None, "clean" or "empty", '
+                + 'value given was "'
+                + str(trash_can)
+                + '"'
+            )
+            raise RtpyBase.RtpyError(message)
+
+        groups = OrderedDict()
+        for repo_key, artifact_path, _ in self._download_items(source):
+            groups.setdefault(repo_key, []).append(artifact_path.strip("/"))
+        calls = []
+        for repo_key, artifact_paths in groups.items():
+            if collapse_folders:
+                paths = self._collapse_folders(repo_key, artifact_paths)
+            else:
+                paths = [(path, [path]) for path in artifact_paths]
+            calls.extend(
+                (repo_key, path, covered_paths) for path, covered_paths in paths
+            )
+
+        def delete_call(call):
+            repo_key, path, covered_paths = call
+            status, trash_can_status, error = "failed", None, None
+            try:
+                self._artifacts_and_storage.delete_item(repo_key, path)
+                status = "deleted"
+                if trash_can == "clean":
+                    trash_can_status = "failed"
+                    self._artifacts_and_storage.delete_item_from_trash_can(
+                        repo_key + "/" + path
+                    )
+                    trash_can_status = "cleaned"
+            except RtpyBase.AfApiError as exception:
+                if status == "failed" and exception.status_code == 404:
+                    status = "missing"
+                else:
+                    error = exception
+            except Exception as exception:
+                error = exception
+            return [
+                {
+                    "repo": repo_key,
+                    "path": covered_path,
+                    "folder": path if covered_paths != [path] else None,
+                    "status": status,
+                    "trash_can": trash_can_status,
+                    "error": error,
+                }
+                for covered_path in covered_paths
+            ]
+
+        results = []
+        for call_results in run_concurrently(
+            delete_call, calls, max_workers or self._max_workers
+        ):
+            results.extend(call_results)
+
+        if trash_can == "empty" and any(
+            result["status"] == "deleted" for result in results
+        ):
+            trash_can_status = "emptied"
+            error = None
+            try:
+                self._artifacts_and_storage.empty_trash_can()
+            except Exception as exception:
+                trash_can_status = "failed"
+                error = exception
+            for result in results:
+                if result["status"] == "deleted":
+                    result["trash_can"] = trash_can_status
+                    result["error"] = error
+        return results
+
+    def plan_transfer(self, source, destination, collapse_folders=True):
+        """
+        Plan the copy or move calls of many artifacts.
+
+        The artifacts are grouped by repository and top-level folder, the
+        deepest folder common to a group is listed (deep file list) to find
+        its subfolders holding only artifacts of the batch. Such a subfolder
+        is transferred with one call when the destination maps all its files
+        to the same target folder. Artifactory puts a folder inside an existing
+        target folder, such a call targets the parent of the existing folder
+        instead (same name as the subfolder), or the files are transferred one
+        by one.
+
+        Parameters
+        ----------
+        source: str or list
+            AQL query (items.find(...)) or list of (repo_key, artifact_path) tuples
+        destination: str or callable
+            Key of the target repository or function returning the
+            (target_repo_key, target_path) tuple of an artifact, see copy
+        collapse_folders: bool, optional
+            True to transfer the folders holding only artifacts of the batch with
+            one call, True by default
+
+        Returns
+        -------
+        calls: list
+            One dictionary per call :
+            {"repo": str, "path": str, "target_repo": str, "target_path": str,
+            "items": list of (artifact_path, target_repo_key, target_path)}
+
+        """
+        if _is_string(destination):
+            target_repo_key = destination
+
+            def destination(repo_key, artifact_path):
+                return target_repo_key, artifact_path
+
+        groups = OrderedDict()
+        for repo_key, artifact_path, _ in self._download_items(source):
+            groups.setdefault(repo_key, []).append(artifact_path.strip("/"))
+
+        calls = []
+        for repo_key, artifact_paths in groups.items():
+            if collapse_folders:
+                paths = self._collapse_folders(repo_key, artifact_paths)
+            else:
+                paths = [(path, [path]) for path in artifact_paths]
+            for path, covered_paths in paths:
+                items = [
+                    (covered_path,) + tuple(destination(repo_key, covered_path))
+                    for covered_path in covered_paths
+                ]
+                target = _target_folder(path, items)
+                if target is not None and items[0][0] != path:
+                    target = self._folder_target(path, target)
+                if target is None:
+                    # Not mapped to the same folder, transferred one by one
+                    for item in items:
+                        calls.append(
+                            _transfer_call(repo_key, item[0], item[1:], [item])
+                        )
+                else:
+                    calls.append(_transfer_call(repo_key, path, target, items))
+        return calls
+
+    def _transfer(
+        self,
+        method,
+        status,
+        source,
+        destination,
+        dry_run,
+        preview,
+        collapse_folders,
+        max_workers,
+    ):
+        """
+        Preview then perform the planned copy or move calls.
+
+        Parameters
+        ----------
+        method: callable
+            copy_item or move_item
+        status: str
+            Status of the artifacts on success
+
+        """
+        calls = self.plan_transfer(source, destination, collapse_folders)
+        max_workers = max_workers or self._max_workers
+
+        def preview_call(call):
+            call["status"] = "planned"
+            call["messages"] = []
+            call["error"] = None
+            try:
+                r = method(
+                    call["repo"],
+                    call["path"],
+                    call["target_repo"],
+                    call["target_path"],
+                    "&dry=1",
+                    settings={"raw_response": True},
+                )
+                try:
+                    call["messages"] = r.json().get("messages", [])
+                except ValueError:
+                    pass
+                levels = [message.get("level") for message in call["messages"]]
+                if r.status_code >= 400 or "ERROR" in levels:
+                    call["status"] = "conflict"
+            except Exception as error:
+                call["status"] = "failed"
+                call["error"] = error
+            return call
+
+        def perform_call(call):
+            if call.get("status", "planned") != "planned":
+                return call
+            try:
+                r = method(
+                    call["repo"],
+                    call["path"],
+                    call["target_repo"],
+                    call["target_path"],
+                )
+                if isinstance(r, dict):
+                    call["messages"] = r.get("messages", [])
+                call["status"] = status
+            except Exception as error:
+                call["status"] = "failed"
+                call["error"] = error
+            return call
+
+        if preview or dry_run:
+            calls = list(run_concurrently(preview_call, calls, max_workers))
+            # A conflict in a folder only blocks the conflicting artifacts
+            previewed_calls, split_calls = [], []
+            for call in calls:
+                if call["status"] == "conflict" and len(call["items"]) > 1:
+                    split_calls.extend(
+                        _transfer_call(call["repo"], item[0], item[1:], [item])
+                        for item in call["items"]
+                    )
+                else:
+                    previewed_calls.append(call)
+            calls = previewed_calls
+            calls += run_concurrently(preview_call, split_calls, max_workers)
+        if not dry_run:
+            calls = list(run_concurrently(perform_call, calls, max_workers))
+
+        results = []
+        for call in calls:
+            for artifact_path, target_repo_key, target_path in call["items"]:
+                results.append(
+                    {
+                        "repo": call["repo"],
+                        "path": artifact_path,
+                        "target_repo": target_repo_key,
+                        "target_path": target_path,
+                        "folder": (
+                            call["path"] if call["path"] != artifact_path else None
+                        ),
+                        "status": call.get("status", "failed"),
+                        "messages": call.get("messages", []),
+                        "error": call.get("error"),
+                    }
+                )
+        return results
+
+    @_traced("Sync")
+    def sync(
+        self,
+        local_directory,
+        repo_key,
+        folder_path="",
+        direction="both",
+        delete=False,
+        state_file=None,
+        sha_type="sha1",
+        max_workers=None,
+        hash_workers=None,
+        chunk_size=DEFAULT_CHUNK_SIZE,
+    ):
+        """
+        Synchronize a local directory and a folder of a repository incrementally.
+
+        The files are compared by SHA-1 checksum (the remote checksums come
+        from one deep file list), only the files that differ are transferred,
+        concurrently. The uploads are deployed by checksum first, the downloads
+        are written to a temporary file renamed once verified.
+
+        The state file records the size, modification time and checksums of
+        the files after each sync : the local files whose size and modification
+        time didn't change are not hashed again, and with direction="both"
+        the recorded checksum tells which side changed a file since the last
+        sync (a file changed on both sides is a conflict, left untouched).
+        The files only are synchronized, not the empty folders.
+
+        Parameters
+        ----------
+        local_directory: str
+            Local directory, created if needed
+        repo_key: str
+            Key of the repository
+        folder_path: str, optional
+            Path of the folder in the repository, root by default
+        direction: str, optional
+            "upload" to make the folder match the local directory, "download"
+            to make the local directory match the folder, "both" (default)
+            to propagate the changes of each side to the other one
+        delete: bool, optional
+            True to delete the files missing on the source side ("upload" and
+            "download") or deleted on one side since the last sync ("both"),
+            False (default) to only add and update files
+        state_file: str, optional
+            Local path of the JSON state file, read then written after the sync,
+            files are compared by checksum only and hashed on each run
+            if not provided
+        sha_type: str, optional
+            Type of secure hash used to deploy by checksum ("sha1" or "sha256"),
+            "sha1" by default
+        max_workers: int, optional
+            Number of concurrent transfers,
+            the "pool_maxsize" setting of the rtpy.Rtpy object by default
+        hash_workers: int, optional
+            Number of threads hashing the new and modified local files,
+            depends on the number of CPUs by default
+        chunk_size: int, optional
+            Size of the chunks read from the network (1 MiB by default)
+
+        Returns
+        -------
+        results: list
+            One dictionary per file present on a side :
+            {"local_path": str, "repo": str, "path": str,
+            "action": None/"upload"/"download"/"delete_local"/"delete_remote",
+            "status": "unchanged"/"conflict"/"deployed_by_checksum"/"deployed"/
+            "downloaded"/"deleted"/"failed",
+            "error": Exception or None}
+
+        """
+        if direction not in SYNC_DIRECTIONS:
+            message = (
+                'direction must be "upload", "download" or "both", '
+                + 'value given was "'
+                + str(direction)
+                + '"'
+            )
+            raise RtpyBase.RtpyError(message)
+        _check_sha_type(sha_type)
+
+        local_directory = os.path.abspath(local_directory)
+        folder_path = folder_path.strip("/")
+        state = _read_sync_state(state_file)
+        entries = state.get("files", {})
+        base = {}
+        if (state.get("repo"), state.get("path")) == (repo_key, folder_path):
+            base = dict((path, entry["sha1"]) for path, entry in entries.items())
+
+        remote = {}
+        try:
+            r = self._artifacts_and_storage.file_list(
+                repo_key,
+                folder_path,
+                "&deep=1&listFolders=0&mdTimestamps=0",
+                settings={"stream_json": False},
+            )
+            for item in r["files"]:
+                if not item.get("folder"):
+                    remote[item["uri"].strip("/")] = item["sha1"]
+        except RtpyBase.AfApiError as error:
+            # The folder is created by the first upload
+            if error.status_code != 404:
+                raise
+
+        # Local files, hashed only if their size or modification time changed
+        local = {}
+        checksums = {}
+        to_hash = {}
+        excluded = os.path.abspath(state_file) if state_file else None
+        for path, local_path, status in _local_files(local_directory, excluded):
+            local[path] = status
+            entry = entries.get(path)
+            if entry and (entry["size"], entry["mtime"]) == status:
+                checksums[path] = {"sha1": entry["sha1"], "sha256": entry["sha256"]}
+            else:
+                to_hash[local_path] = path
+        for local_path, result in map_file_checksums(
+            to_hash, DEPLOY_ALGORITHMS, max_workers=hash_workers
+        ):
+            checksums[to_hash[local_path]] = result
+
+        actions = []
+        for path in sorted(set(local) | set(remote)):
+            if isinstance(checksums.get(path), Exception):
+                # Reported as failed
+                actions.append((path, None))
+                continue
+            local_sha1 = checksums[path]["sha1"] if path in local else None
+            action = _sync_action(
+                local_sha1, remote.get(path), base.get(path), direction, delete
+            )
+            if action is not False:
+                actions.append((path, action))
+
+        def sync_file(item):
+            path, action = item
+            artifact_path = (folder_path + "/" + path).strip("/")
+            result = {
+                "local_path": None,
+                "repo": repo_key,
+                "path": artifact_path,
+                "action": action,
+                "status": "failed",
+                "error": None,
+            }
+            entry = None
+            try:
+                local_path = _local_path(local_directory, repo_key, path, False)
+                result["local_path"] = local_path
+                item_checksums = checksums.get(path)
+                if isinstance(item_checksums, Exception):
+                    raise item_checksums
+                if action is None:
+                    result["status"] = "unchanged"
+                elif action == "conflict":
+                    result["action"] = None
+                    result["status"] = "conflict"
+                elif action == "upload":
+                    result["status"] = self._deploy_file(
+                        repo_key, local_path, artifact_path, sha_type, item_checksums
+                    )
+                elif action == "download":
+                    item_checksums = self._download_file(
+                        repo_key,
+                        artifact_path,
+                        local_path,
+                        {"sha1": remote[path]},
+                        chunk_size,
+                    )
+                    result["status"] = "downloaded"
+                elif action == "delete_remote":
+                    self._artifacts_and_storage.delete_item(repo_key, artifact_path)
+                    result["status"] = "deleted"
+                else:
+                    os.remove(local_path)
+                    result["status"] = "deleted"
+                if result["status"] not in ["deleted", "conflict"]:
+                    status = _file_status(local_path)
+                    entry = {
+                        "size": status[0],
+                        "mtime": status[1],
+                        "sha1": item_checksums["sha1"],
+                        "sha256": item_checksums["sha256"],
+                    }
+            except Exception as error:
+                result["error"] = error
+            return path, result, entry
+
+        files = {}
+        results = []
+        for path, result, entry in run_concurrently(
+            sync_file, actions, max_workers or self._max_workers
+        ):
+            if entry is not None:
+                files[path] = entry
+            elif result["status"] in ["failed", "conflict"] and path in entries:
+                # Compared again with the same base on the next sync
+                files[path] = entries[path]
+            results.append(result)
+
+        if state_file:
+            _write_sync_state(
+                state_file,
+                {
+                    "version": SYNC_STATE_VERSION,
+                    "repo": repo_key,
+                    "path": folder_path,
+                    "files": files,
+                },
+            )
+        return sorted(results, key=lambda result: result["path"])
+
+    def _apply_properties(
+        self, method, items, formatter, status, collapse_folders, max_workers
+    ):
+        """
+        Run a set or delete properties method on many items.
+
+        Parameters
+        ----------
+        method: callable
+            set_item_properties or delete_item_properties
+        items: iterable
+            (repo_key, item_path, properties) tuples
+        formatter: callable
+            Function converting the properties to the string of the method
+        status: str
+            Status of the items on success
+
+        """
+        groups = OrderedDict()
+        for repo_key, item_path, properties in items:
+            key = (repo_key, formatter(properties))
+            groups.setdefault(key, []).append(item_path.strip("/"))
+
+        calls = []
+        for (repo_key, properties), item_paths in groups.items():
+            if collapse_folders:
+                paths = self._collapse_folders(repo_key, item_paths)
+            else:
+                paths = [(item_path, [item_path]) for item_path in item_paths]
+            for path, covered_paths in paths:
+                calls.append((repo_key, path, properties, covered_paths))
+
+        def apply_properties(call):
+            repo_key, path, properties, covered_paths = call
+            error = None
+            try:
+                method(repo_key, path, properties)
+            except Exception as exception:
+                error = exception
+            return [
+                {
+                    "repo": repo_key,
+                    "path": item_path,
+                    "properties": properties,
+                    "folder": path if covered_paths != [path] else None,
+                    "status": "failed" if error else status,
+                    "error": error,
+                }
+                for item_path in covered_paths
+            ]
+
+        results = []
+        for call_results in run_concurrently(
+            apply_properties, calls, max_workers or self._max_workers
+        ):
+            results.extend(call_results)
+        return results
+
+    def _collapse_folders(self, repo_key, item_paths):
+        """
+        Group the items of a repository under the folders holding only them.
+
+        The items are grouped by top-level folder, the deepest folder common
+        to a group is listed (deep file list) to find its subfolders
+        whose files are all in the group.
+
+        Returns
+        -------
+        calls: list
+            (path, item_paths) tuples, the path being a folder holding
+            item_paths or an item on its own
+
+        """
+        top_level_groups = OrderedDict()
+        for item_path in OrderedDict.fromkeys(item_paths):
+            top_level_groups.setdefault(item_path.split("/")[0], []).append(item_path)
+
+        calls = []
+        for paths in top_level_groups.values():
+            folder = _common_folder(paths)
+            files = None
+            if len(paths) > 1 and folder:
+                try:
+                    r = self._artifacts_and_storage.file_list(
+                        repo_key,
+                        folder,
+                        "&deep=1",
+                        settings={"raw_response": False, "stream_json": False},
+                    )
+                    files = [
+                        folder + "/" + item["uri"].strip("/")
+                        for item in r["files"]
+                        if not item.get("folder")
+                    ]
+                except Exception:
+                    # Not listable, each item is set on its own
+                    files = None
+            if files is None:
+                calls.extend((path, [path]) for path in paths)
+            else:
+                calls.extend(_covering_folders(folder, paths, files))
+        return calls
+
+    def _folder_target(self, folder, target):
+        """
+        Return the target of a folder copied or moved with one call.
+
+        Artifactory puts the folder inside the target folder if it exists :
+        the parent of an existing target folder is targeted when the names
+        match, the files are transferred one by one otherwise.
+
+        Returns
+        -------
+        target: tuple or None
+            (target_repo_key, target_path) of the call, None if the files
+            must be transferred one by one
+
+        """
+        target_repo_key, target_folder = target
+        try:
+            self._artifacts_and_storage.folder_info(
+                target_repo_key,
+                target_folder,
+                settings={"raw_response": False, "stream_json": False},
+            )
+        except RtpyBase.AfApiError as error:
+            if error.status_code == 404:
+                return target
+            return None
+        parent, _, name = target_folder.rpartition("/")
+        if not target_folder or name != folder.rpartition("/")[2]:
+            return None
+        return target_repo_key, parent
+
+    def _deploy_file(self, repo_key, local_path, artifact_path, sha_type, checksums):
+        """
+        Deploy a local file by checksum, upload it if Artifactory doesn't store it.
+
+        Returns
+        -------
+        status: str
+            "deployed_by_checksum" or "deployed"
+
+        """
+        try:
+            self._artifacts_and_storage.deploy_artifact_by_checksum(
+                repo_key, artifact_path, sha_type, checksums[sha_type]
+            )
+            return "deployed_by_checksum"
+        except RtpyBase.AfApiError as error:
+            if error.status_code != 404:
+                raise
+        self._artifacts_and_storage.deploy_artifact(
+            repo_key, local_path, artifact_path, checksums=checksums
+        )
+        return "deployed"
+
+    def _download_file(
+        self, repo_key, artifact_path, local_path, checksums, chunk_size
+    ):
+        """
+        Download an artifact to a temporary file renamed once verified.
+
+        Returns
+        -------
+        checksums: dict
+            {"sha1": str, "sha256": str, "size": int}
+
+        """
+        directory, name = os.path.split(local_path)
+        _makedirs(directory)
+        temporary_path = os.path.join(directory, "." + name + ".part")
+        try:
+            r = self._artifacts_and_storage.download_artifact(
+                repo_key,
+                artifact_path,
+                temporary_path,
+                chunk_size=chunk_size,
+                checksums=checksums,
+            )
+            _replace_file(temporary_path, local_path)
+        except BaseException:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+            raise
+        return r
+
+    def _download_items(self, source):
+        """
+        Yield the (repo_key, artifact_path, checksums) tuples of a bulk download.
+
+        The results of an AQL query are streamed, not loaded as a whole.
+
+        Parameters
+        ----------
+        source: str or list
+            AQL query or list of (repo_key, artifact_path) tuples
+
+        """
+        if not _is_string(source):
+            for repo_key, artifact_path in source:
+                yield repo_key, artifact_path, {}
+            return
+
+        query = source
+        if ".include(" not in query:
+            query = _add_aql_include(query, AQL_DOWNLOAD_FIELDS)
+        r = self._searches.artifactory_query_language(
+            query, settings={"raw_response": False, "stream_json": "results"}
+        )
+        # The whole document if the results couldn't be streamed
+        results = r["results"] if isinstance(r, dict) else r
+        for item in results:
+            if item.get("type", "file") != "file":
+                continue
+            artifact_path = item["name"]
+            if item["path"] not in ["", "."]:
+                artifact_path = item["path"] + "/" + item["name"]
+            checksums = {}
+            if item.get("actual_sha1"):
+                checksums["sha1"] = item["actual_sha1"]
+            if item.get("sha256"):
+                checksums["sha256"] = item["sha256"]
+            yield item["repo"], artifact_path, checksums
+
+
+def run_concurrently(function, items, max_workers):
+    """
+    Apply a function to items in a pool of threads and yield the results.
+
+    At most twice max_workers items are consumed ahead of the running calls,
+    so items can be a lazy iterator over a large number of elements.
+    The results are yielded as they complete (not in the order of the items).
+
+    Parameters
+    ----------
+    function: callable
+        Function called with each item
+    items: iterable
+        Items to process
+    max_workers: int
+        Number of threads
+
+    """
+    items = iter(items)
+    # The calls of the workers are children of the current span
+    function = propagate(function)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = set()
+        exhausted = False
+        while pending or not exhausted:
+            while not exhausted and len(pending) < 2 * max_workers:
+                try:
+                    item = next(items)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending.add(executor.submit(function, item))
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+
+def _add_aql_include(query, fields):
+    """Insert an include clause in an AQL query, before sort/offset/limit."""
+    include = ".include(" + ", ".join('"' + field + '"' for field in fields) + ")"
+    positions = [
+        query.find(clause)
+        for clause in [".sort(", ".offset(", ".limit("]
+        if clause in query
+    ]
+    if positions:
+        position = min(positions)
+        return query[:position] + include + query[position:]
+    return query.rstrip() + include
+
+
+def _check_sha_type(sha_type):
+    """Raise a RtpyError if sha_type isn't a type of deploy by checksum."""
+    if sha_type not in ["sha1", "sha256"]:
+        message = (
+            'sha_type must be "sha1" or "sha256", '
+            + 'type given was "'
+            + sha_type
+            + '"'
+        )
+        raise RtpyBase.RtpyError(message)
+
+
+def _local_files(local_directory, excluded=None):
+    """
+    Yield the files of a local directory tree for a sync.
+
+    The temporary files of the downloads and the excluded path (state file)
+    are skipped.
+
+    Returns
+    -------
+    files: iterator
+        (path, local_path, (size, mtime)) tuples, path being relative to
+        the local directory with "/" separators
+
+    """
+    for root, directories, files in os.walk(local_directory):
+        directories.sort()
+        for name in sorted(files):
+            local_path = os.path.join(root, name)
+            if name.startswith(".") and name.endswith(".part"):
+                continue
+            if local_path == excluded:
+                continue
+            relative_path = os.path.relpath(local_path, local_directory)
+            path = "/".join(relative_path.split(os.sep))
+            yield path, local_path, _file_status(local_path)
+
+
+def _file_status(local_path):
+    """Return the (size, modification time) of a local file."""
+    status = os.stat(local_path)
+    return status.st_size, status.st_mtime
+
+
+def _sync_action(local_sha1, remote_sha1, base_sha1, direction, delete):
+    """
+    Return the action synchronizing a file.
+
+    Parameters
+    ----------
+    local_sha1: str or None
+        SHA-1 checksum of the local file, None if missing
+    remote_sha1: str or None
+        SHA-1 checksum of the artifact, None if missing
+    base_sha1: str or None
+        SHA-1 checksum recorded by the last sync, None if unknown
+    direction: str
+        "upload", "download" or "both"
+    delete: bool
+        True to propagate the deletions
+
+    Returns
+    -------
+    action: str, None or False
+        "upload", "download", "delete_local", "delete_remote" or "conflict",
+        None if the file is in sync, False if there is nothing to report
+
+    """
+    if local_sha1 == remote_sha1:
+        return None
+    if direction == "upload":
+        if local_sha1 is not None:
+            return "upload"
+        return "delete_remote" if delete else False
+    if direction == "download":
+        if remote_sha1 is not None:
+            return "download"
+        return "delete_local" if delete else False
+
+    local_changed = local_sha1 != base_sha1
+    remote_changed = remote_sha1 != base_sha1
+    if local_changed and remote_changed:
+        # A modified file wins over a deletion
+        if local_sha1 is None:
+            return "download"
+        if remote_sha1 is None:
+            return "upload"
+        return "conflict"
+    if local_changed:
+        if local_sha1 is None:
+            return "delete_remote" if delete else "download"
+        return "upload"
+    if remote_sha1 is None:
+        return "delete_local" if delete else "upload"
+    return "download"
+
+
+def _read_sync_state(state_file):
+    """Return the content of a sync state file, empty if missing or invalid."""
+    if not state_file or not os.path.isfile(state_file):
+        return {}
+    try:
+        with open(state_file, "rb") as files:
+            state = json.loads(files.read().decode("utf-8"))
+    except ValueError:
+        return {}
+    if not isinstance(state, dict) or state.get("version") != SYNC_STATE_VERSION:
+        return {}
+    return state
+
+
+def _write_sync_state(state_file, state):
+    """Write a sync state file atomically."""
+    directory = os.path.dirname(os.path.abspath(state_file))
+    _makedirs(directory)
+    file_descriptor, temporary_path = tempfile.mkstemp(dir=directory, suffix=".part")
+    try:
+        with os.fdopen(file_descriptor, "wb") as files:
+            files.write(json.dumps(state, indent=1, sort_keys=True).encode("utf-8"))
+        _replace_file(temporary_path, state_file)
+    except BaseException:
+        os.remove(temporary_path)
+        raise
+
+
+def _local_path(local_directory, repo_key, artifact_path, include_repo_key):
+    """
+    Build the local path of an artifact, which must be inside local_directory.
+
+    Raises
+    ------
+    RtpyBase.RtpyError
+        If the artifact path escapes the local directory
+
+    """
+    local_directory = os.path.abspath(local_directory)
+    parts = artifact_path.split("/")
+    if include_repo_key:
+        parts = [repo_key] + parts
+    local_path = os.path.normpath(os.path.join(local_directory, *parts))
+    if not local_path.startswith(local_directory + os.sep):
+        message = (
+            'artifact path "' + artifact_path + '" is outside of the local directory !'
+        )
+        raise RtpyBase.RtpyError(message)
+    return local_path
+
+
+def _matches_checksums(local_path, checksums):
+    """Return True if a local file exists and matches the given checksums."""
+    if not checksums or not os.path.isfile(local_path):
+        return False
+    sha_type = "sha256" if "sha256" in checksums else "sha1"
+    checksum = file_checksums(local_path, [sha_type])[sha_type]
+    return checksum == checksums[sha_type].lower()
+
+
+def _properties_string(properties):
+    """
+    Build the string of properties of the set properties API method.
+
+    Parameters
+    ----------
+    properties: dict or str
+        {"name": "value"} or {"name": ["value1", "value2"]}, a string
+        is returned unchanged
+
+    """
+    if _is_string(properties):
+        return properties
+
+    def escape(value):
+        value = "%s" % value
+        for character in PROPERTY_SPECIAL_CHARACTERS:
+            value = value.replace(character, "\\" + character)
+        return quote(value.encode("utf-8"), safe="")
+
+    strings = []
+    for name in sorted(properties):
+        values = properties[name]
+        if _is_string(values) or not hasattr(values, "__iter__"):
+            values = [values]
+        strings.append(escape(name) + "=" + ",".join(escape(value) for value in values))
+    return ";".join(strings)
+
+
+def _property_names(properties):
+    """Build the string of property names ("a,b") from a list or a string."""
+    if _is_string(properties):
+        return properties
+    return ",".join(properties)
+
+
+def _common_folder(paths):
+    """Return the deepest folder holding all the paths ("" for the root)."""
+    folders = [path.split("/")[:-1] for path in paths]
+    common = []
+    for parts in zip(*folders):
+        if any(part != parts[0] for part in parts):
+            break
+        common.append(parts[0])
+    return "/".join(common)
+
+
+def _covering_folders(folder, paths, files):
+    """
+    Return the (path, item_paths) calls covering paths with the fewest folders.
+
+    Parameters
+    ----------
+    folder: str
+        Listed folder
+    paths: list
+        Item paths under the folder
+    files: list
+        Paths of all the files under the folder
+
+    """
+    selected = set(paths)
+    totals = {}
+    counts = {}
+    for file_path in files:
+        parts = file_path.split("/")
+        # The listed folder and its subfolders holding the file
+        for depth in range(len(folder.split("/")), len(parts)):
+            subfolder = "/".join(parts[:depth])
+            totals[subfolder] = totals.get(subfolder, 0) + 1
+            if file_path in selected:
+                counts[subfolder] = counts.get(subfolder, 0) + 1
+
+    covering = []
+    for subfolder in sorted(totals, key=lambda path: (path.count("/"), path)):
+        if counts.get(subfolder, 0) < 2 or counts[subfolder] != totals[subfolder]:
+            continue
+        if not any(subfolder.startswith(parent + "/") for parent in covering):
+            covering.append(subfolder)
+
+    calls = [(subfolder, []) for subfolder in covering]
+    for path in paths:
+        for index, subfolder in enumerate(covering):
+            if path.startswith(subfolder + "/"):
+                calls[index][1].append(path)
+                break
+        else:
+            calls.append((path, [path]))
+    return calls
+
+
+def _target_folder(folder, items):
+    """
+    Return the (target_repo_key, target_folder) tuple of a folder.
+
+    Parameters
+    ----------
+    folder: str
+        Source folder (or artifact path for a single artifact)
+    items: list
+        (artifact_path, target_repo_key, target_path) tuples of the files
+        of the folder
+
+    Returns
+    -------
+    target: tuple or None
+        None if the files of the folder are not mapped to the same folder
+
+    """
+    if len(items) == 1 and items[0][0] == folder:
+        return items[0][1:]
+    artifact_path, target_repo_key, target_path = items[0]
+    relative_path = artifact_path[len(folder) + 1 :]
+    if not target_path.endswith("/" + relative_path):
+        return None
+    target_folder = target_path[: -len(relative_path) - 1]
+    for artifact_path, other_target_repo_key, target_path in items:
+        relative_path = artifact_path[len(folder) + 1 :]
+        if (
+            other_target_repo_key != target_repo_key
+            or target_path != target_folder + "/" + relative_path
+        ):
+            return None
+    return target_repo_key, target_folder
+
+
+def _transfer_call(repo_key, path, target, items):
+    """Build a copy or move call of the plan_transfer method."""
+    return {
+        "repo": repo_key,
+        "path": path,
+        "target_repo": target[0],
+        "target_path": target[1],
+        "items": items,
+    }
+
+
+def _is_string(value):
+    """Return True if value is a str (or unicode with Python 2)."""
+    try:
+        return isinstance(value, basestring)
+    except NameError:
+        return isinstance(value, str)
@@ -0,0 +1,284 @@
+# coding: utf-8
+
+# Copyright (C) 2018 Orange
+#
+# This software is distributed under the terms and conditions of the 'Apache-2.0'
+# license which can be found in the 'LICENSE.md' file
+# or at 'http://www.apache.org/licenses/LICENSE-2.0'.
+
+"""ResponseCache class definition, in-memory cache of the GET API calls."""
+
+from __future__ import unicode_literals
+import fnmatch
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    from urllib.parse import parse_qs, unquote, urlsplit
+except ImportError:
+    from urllib import unquote
+    from urlparse import parse_qs, urlsplit
+
+# Monotonic clock when available (Python 3)
+_clock = getattr(time, "monotonic", time.time)
+
+# Prefixes removed from the paths to get the resource they act on
+_RESOURCE_PREFIXES = ["api/storage/", "api/copy/", "api/move/", "api/"]
+
+
+class ResponseCache(object):
+    """
+    In-memory cache of the responses of the GET API calls, with TTL and LRU eviction.
+
+    Given as the "cache" setting of a rtpy.Rtpy object, it is shared by all
+    the categories. Successful GET responses are stored, a PUT, POST, PATCH
+    or DELETE API call invalidates the cached responses of the same resource,
+    of its parents and of its children (a deploy in a folder invalidates
+    the folder info for example). The cache can be disabled for a call
+    with settings={"cache": None}.
+
+    Expired responses with an ETag or a Last-Modified header are kept and
+    revalidated with a conditional GET (If-None-Match, If-Modified-Since),
+    a 304 Not Modified answer is served from the cached content.
+
+    Parameters
+    ----------
+    max_entries: int, optional
+        Maximum number of responses, the least recently used is evicted first,
+        1024 by default
+    ttl: float, optional
+        Time to live of the responses in seconds, 60 by default
+    ttls: dict, optional
+        {pattern: ttl} time to live for the paths matching fnmatch patterns
+        (relative to the Artifactory URL, "api/repositories*" for example),
+        the longest matching pattern wins, with a ttl of 0 the responses are
+        always revalidated (or not cached without ETag and Last-Modified)
+    max_content_size: int, optional
+        Responses with a larger content are not stored (1 MiB by default)
+    revalidate: bool, optional
+        True to revalidate the expired responses with conditional GETs,
+        True by default
+
+    Examples
+    --------
+    >>> cache = rtpy.ResponseCache(ttl=30, ttls={"api/repositories*": 300})
+    >>> af = rtpy.Rtpy(dict(settings, cache=cache))
+
+    """
+
+    def __init__(
+        self,
+        max_entries=1024,
+        ttl=60,
+        ttls=None,
+        max_content_size=1024 * 1024,
+        revalidate=True,
+    ):
+        """Object instantiation."""
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_content_size = max_content_size
+        self.revalidate = revalidate
+        self._ttls = sorted(
+            (ttls or {}).items(), key=lambda item: len(item[0]), reverse=True
+        )
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+
+    def __len__(self):
+        """Return the number of cached responses."""
+        return len(self._entries)
+
+    def get(self, path, identity=None):
+        """
+        Return the cached response of a GET API call.
+
+        Parameters
+        ----------
+        path: str
+            Path of the call relative to the Artifactory URL (with the query)
+        identity: str, optional
+            User name or API key of the call
+
+        Returns
+        -------
+        response: requests.Response or None
+            None if the response is not cached or expired
+
+        """
+        key = (identity, path)
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None or entry[0] <= _clock():
+                self.misses += 1
+                # Expired entries are kept for a conditional GET
+                if entry is not None and self.revalidate and entry[3]:
+                    self._entries[key] = entry
+                return None
+            # Most recently used entries are at the end
+            self._entries[key] = entry
+            self.hits += 1
+            return entry[2]
+
+    def conditional_headers(self, path, identity=None):
+        """
+        Return the headers revalidating an expired response with a conditional GET.
+
+        Parameters
+        ----------
+        path: str
+            Path of the call relative to the Artifactory URL (with the query)
+        identity: str, optional
+            User name or API key of the call
+
+        Returns
+        -------
+        headers: dict
+            "If-None-Match" and/or "If-Modified-Since" headers,
+            empty if the response is not cached or has no validators
+
+        """
+        with self._lock:
+            entry = self._entries.get((identity, path))
+        if entry is None or not self.revalidate:
+            return {}
+        headers = {}
+        if "ETag" in entry[3]:
+            headers["If-None-Match"] = entry[3]["ETag"]
+        if "Last-Modified" in entry[3]:
+            headers["If-Modified-Since"] = entry[3]["Last-Modified"]
+        return headers
+
+    def refresh(self, path, identity, response):
+        """
+        Renew a cached response after a 304 Not Modified answer.
+
+        Parameters
+        ----------
+        path: str
+            Path of the call relative to the Artifactory URL (with the query)
+        identity: str
+            User name or API key of the call
+        response: requests.Response
+            The 304 response, its validators replace the cached ones
+
+        Returns
+        -------
+        response: requests.Response or None
+            The cached response, None if it was evicted in the meantime
+
+        """
+        key = (identity, path)
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return None
+            validators = dict(entry[3])
+            validators.update(_validators(response))
+            expires = _clock() + max(self.ttl_for(path), 0)
+            self._entries[key] = (expires, entry[1], entry[2], validators)
+            self.revalidations += 1
+            return entry[2]
+
+    def put(self, path, identity, response):
+        """
+        Store the response of a successful GET API call.
+
+        Parameters
+        ----------
+        path: str
+            Path of the call relative to the Artifactory URL (with the query)
+        identity: str
+            User name or API key of the call
+        response: requests.Response
+            Response with its content loaded
+
+        """
+        ttl = self.ttl_for(path)
+        validators = _validators(response) if self.revalidate else {}
+        if (
+            (ttl <= 0 and not validators)
+            or not 200 <= response.status_code < 300
+            or len(response.content) > self.max_content_size
+        ):
+            return
+        key = (identity, path)
+        entry = (_clock() + max(ttl, 0), _resources(path)[0], response, validators)
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, path=None):
+        """
+        Remove the cached responses of the resources modified by an API call.
+
+        Parameters
+        ----------
+        path: str, optional
+            Path of the call relative to the Artifactory URL (with the query),
+            all the responses are removed if not provided
+
+        """
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+                return
+            resources = _resources(path)
+            for key, entry in list(self._entries.items()):
+                if any(_related(entry[1], resource) for resource in resources):
+                    del self._entries[key]
+
+    def ttl_for(self, path):
+        """Return the time to live of the responses of a path."""
+        for pattern, ttl in self._ttls:
+            if fnmatch.fnmatchcase(path, pattern):
+                return ttl
+        return self.ttl
+
+
+def _validators(response):
+    """Return the ETag and Last-Modified headers of a response."""
+    return dict(
+        (header, response.headers[header])
+        for header in ["ETag", "Last-Modified"]
+        if response.headers.get(header)
+    )
+
+
+def _resources(path):
+    """
+    Return the resources (repository paths, "repositories/key"...) of a path.
+
+    The target of copy and move operations ("to" query parameter) is included.
+
+    """
+    parts = urlsplit(path)
+    resources = [_resource(unquote(parts.path))]
+    for target in parse_qs(parts.query).get("to", []):
+        resources.append(_resource(target))
+    return resources
+
+
+def _resource(path):
+    """Remove the API prefix and the matrix parameters of a path."""
+    path = path.lstrip("/")
+    for prefix in _RESOURCE_PREFIXES:
+        if path.startswith(prefix):
+            path = path[len(prefix) :]
+            break
+    return "/".join(segment.split(";")[0] for segment in path.split("/")).strip("/")
+
+
+def _related(resource, other):
+    """Return True if a resource is the same, a parent or a child of the other."""
+    return (
+        resource == other
+        or resource.startswith(other + "/")
+        or other.startswith(resource + "/")
+    )
@@ -0,0 +1,260 @@
+# coding: utf-8
+
+# Copyright (C) 2018 Orange
+#
+# This software is distributed under the terms and conditions of the 'Apache-2.0'
+# license which can be found in the 'LICENSE.md' file
+# or at 'http://www.apache.org/licenses/LICENSE-2.0'.
+
+"""Functions and classes computing checksums of files and buffers."""
+
+from __future__ import unicode_literals
+import hashlib
+import itertools
+import mmap
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# Size of the chunks read from the network or from files
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+# Checksums supported by Artifactory
+ALGORITHMS = ("md5", "sha1", "sha256")
+
+
+class MultiHash(object):
+    """
+    Update several hashlib objects with the same chunks.
+
+    Parameters
+    ----------
+    algorithms: list, optional
+        Names of the hashlib algorithms, ALGORITHMS by default
+
+    """
+
+    def __init__(self, algorithms=ALGORITHMS):
+        """Object instantiation."""
+        self._hashes = [(name, hashlib.new(name)) for name in algorithms]
+
+    def update(self, chunk):
+        """Update all the checksums with a chunk."""
+        for _, checksum in self._hashes:
+            checksum.update(chunk)
+
+    def hexdigests(self):
+        """
+        Return the checksums.
+
+        Returns
+        -------
+        checksums: dict
+            {algorithm: hexadecimal checksum}
+
+        """
+        return dict((name, checksum.hexdigest()) for name, checksum in self._hashes)
+
+
+def iter_chunks(source, chunk_size=DEFAULT_CHUNK_SIZE, start=0, stop=None):
+    """
+    Yield memoryview chunks of a file or a buffer without copying the content.
+
+    Files are memory-mapped while iterating. Each chunk is released
+    when the next one is requested, it must not be kept by the caller.
+    Python 2 mappings don't support memoryview, their chunks are copies.
+
+    Parameters
+    ----------
+    source: str or buffer
+        Local path or object supporting the buffer protocol
+        (bytes, bytearray, memoryview, mmap...)
+    chunk_size: int, optional
+        Size of the chunks (1 MiB by default)
+    start: int, optional
+        Offset of the first byte, 0 by default
+    stop: int, optional
+        Offset after the last byte, the end of the content by default
+
+    """
+    files = None
+    mapping = None
+    try:
+        if not _is_path(source):
+            view = _byte_view(source)
+        else:
+            files = open(source, "rb")
+            try:
+                mapping = mmap.mmap(files.fileno(), 0, access=mmap.ACCESS_READ)
+                view = _byte_view(mapping)
+            except ValueError:
+                # Empty files can't be memory-mapped
+                view = b""
+        if stop is None or stop > len(view):
+            stop = len(view)
+        try:
+            for offset in range(start, stop, chunk_size):
+                chunk = view[offset : min(offset + chunk_size, stop)]
+                try:
+                    yield chunk
+                finally:
+                    # Release the slice so the mapping can be closed
+                    _release(chunk)
+        finally:
+            _release(view)
+    finally:
+        if mapping is not None:
+            mapping.close()
+        if files is not None:
+            files.close()
+
+
+def file_checksums(
+    source, algorithms=ALGORITHMS, chunk_size=DEFAULT_CHUNK_SIZE, byte_range=None
+):
+    """
+    Compute several checksums of a file or a buffer in a single read pass.
+
+    hashlib releases the GIL while hashing large chunks,
+    so this function scales with threads.
+
+    Parameters
+    ----------
+    source: str or buffer
+        Local path or object supporting the buffer protocol
+    algorithms: list, optional
+        Names of the hashlib algorithms, ("md5", "sha1", "sha256") by default
+    chunk_size: int, optional
+        Size of the chunks (1 MiB by default)
+    byte_range: tuple, optional
+        (start, stop) offsets of the part of the content to hash (stop excluded)
+
+    Returns
+    -------
+    checksums: dict
+        {algorithm: hexadecimal checksum}
+
+    """
+    start, stop = byte_range or (0, None)
+    checksums = MultiHash(algorithms)
+    for chunk in iter_chunks(source, chunk_size, start, stop):
+        checksums.update(chunk)
+    return checksums.hexdigests()
+
+
+def map_file_checksums(
+    paths,
+    algorithms=ALGORITHMS,
+    max_workers=None,
+    processes=False,
+    chunk_size=DEFAULT_CHUNK_SIZE,
+):
+    """
+    Compute the checksums of many files concurrently.
+
+    The files are hashed in a pool of threads (hashlib releases the GIL)
+    or in a pool of processes. With processes the calling script must be
+    protected by a if __name__ == "__main__" block on Windows and macOS.
+
+    Parameters
+    ----------
+    paths: iterable
+        Local paths of the files
+    algorithms: list, optional
+        Names of the hashlib algorithms, ("md5", "sha1", "sha256") by default
+    max_workers: int, optional
+        Number of threads or processes, depends on the number of CPUs by default
+    processes: bool, optional
+        True to use a pool of processes, False by default
+    chunk_size: int, optional
+        Size of the chunks (1 MiB by default)
+
+    Returns
+    -------
+    results: iterator
+        (path, checksums) tuples in the order of paths, checksums is the
+        IOError/OSError instead of a dict if the file couldn't be read
+
+    """
+    paths = list(paths)
+    if processes:
+        executor = ProcessPoolExecutor(max_workers=max_workers)
+        # Files sent to the processes in batches to amortize the pickling
+        batch_size = 16
+    else:
+        if max_workers is None:
+            # Default of Python 3.5+, required before
+            max_workers = _cpu_count() * 5
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        batch_size = 1
+    # Batches instead of the chunksize argument of Executor.map (Python 3.5+)
+    batches = [
+        (paths[index : index + batch_size], tuple(algorithms), chunk_size)
+        for index in range(0, len(paths), batch_size)
+    ]
+    with executor:
+        results = executor.map(_file_checksums_or_errors, batches)
+        for path, checksums in zip(paths, itertools.chain.from_iterable(results)):
+            yield path, checksums
+
+
+def _file_checksums_or_errors(arguments):
+    """Call file_checksums for a batch of paths, return errors instead."""
+    paths, algorithms, chunk_size = arguments
+    results = []
+    for path in paths:
+        try:
+            results.append(file_checksums(path, algorithms, chunk_size))
+        except (IOError, OSError) as error:
+            results.append(error)
+    return results
+
+
+def _byte_view(content):
+    """
+    Return a memoryview of the bytes of a buffer, sliceable in bytes.
+
+    Objects memoryview doesn't support (Python 2 mappings) are returned as is.
+    Items of several bytes are copied (memoryview.cast is Python 3.3+).
+    """
+    try:
+        view = memoryview(content)
+    except TypeError:
+        return content
+    if view.ndim != 1 or view.itemsize != 1:
+        view = memoryview(view.tobytes())
+    return view
+
+
+def _byte_size(content):
+    """Return the number of bytes of a buffer (memoryview.nbytes is Python 3.3+)."""
+    try:
+        view = memoryview(content)
+    except TypeError:
+        return len(content)
+    size = view.itemsize
+    for dimension in view.shape or ():
+        size *= dimension
+    return size
+
+
+def _release(view):
+    """Release a memoryview (Python 3.2+) so the underlying mapping can be closed."""
+    release = getattr(view, "release", None)
+    if release is not None:
+        release()
+
+
+def _cpu_count():
+    """Return the number of CPUs, 1 if unknown."""
+    try:
+        return multiprocessing.cpu_count()
+    except NotImplementedError:
+        return 1
+
+
+def _is_path(value):
+    """Return True if value is a path (str, or unicode with Python 2)."""
+    try:
+        return isinstance(value, basestring)
+    except NameError:
+        return isinstance(value, str)
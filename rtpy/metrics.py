@@ -0,0 +1,415 @@
+# coding: utf-8
+
+# Copyright (C) 2018 Orange
+#
+# This software is distributed under the terms and conditions of the 'Apache-2.0'
+# license which can be found in the 'LICENSE.md' file
+# or at 'http://www.apache.org/licenses/LICENSE-2.0'.
+
+"""Metrics class definition, latency, byte and error metrics of the API calls."""
+
+from __future__ import unicode_literals
+import io
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+from .artifact_cache import _replace_file
+
+# Upper bounds of the buckets of the duration histograms (seconds)
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.075,
+    0.1,
+    0.25,
+    0.5,
+    0.75,
+    1.0,
+    2.5,
+    5.0,
+    7.5,
+    10.0,
+    30.0,
+    60.0,
+    120.0,
+)
+
+# Status label of the calls failing without response (connection errors...)
+ERROR_STATUS = "error"
+
+
+class Metrics(object):
+    """
+    In-process histograms and counters of the API calls.
+
+    Given as the "metrics" setting of a rtpy.Rtpy object, every HTTP call
+    records its API method name, verb, status code, duration, request and
+    response body sizes and number of retries. The calls are grouped by
+    (api_method, verb, status), the durations in histograms from which the
+    quantiles are estimated like the Prometheus histogram_quantile function.
+
+    The duration covers the retries and their backoff delays, and the wait
+    for the throttle if any. For a streamed response (download_artifact...)
+    it stops when the headers are received and the response size is given
+    by its Content-Length header. The responses served by the "cache" setting
+    without calling Artifactory are not recorded.
+
+    Parameters
+    ----------
+    buckets: iterable, optional
+        Upper bounds of the duration histogram buckets in seconds
+        (DEFAULT_BUCKETS, from 5ms to 2 minutes, by default)
+    namespace: str, optional
+        Prefix of the names of the Prometheus metrics, "rtpy" by default
+
+    Examples
+    --------
+    >>> metrics = rtpy.Metrics()
+    >>> af = rtpy.Rtpy(dict(settings, metrics=metrics))
+    >>> ...
+    >>> metrics.summary()["[SEARCHES] : Artifactory Query Language"]["p99"]
+    2.1
+    >>> metrics.write_prometheus("/var/lib/node_exporter/rtpy.prom")
+
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, namespace="rtpy"):
+        """Object instantiation."""
+        self.buckets = tuple(sorted(float(bound) for bound in buckets))
+        if not self.buckets or self.buckets[0] <= 0:
+            raise ValueError("buckets must be positive numbers!")
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def record(
+        self,
+        api_method,
+        verb,
+        status,
+        duration,
+        request_bytes=0,
+        response_bytes=0,
+        retries=0,
+    ):
+        """
+        Record an API call.
+
+        Parameters
+        ----------
+        api_method: str
+            Name of the API method (category and name)
+        verb: str
+            HTTP verb ("GET", "POST"...)
+        status: int or None
+            Status code of the response, None if no response was received
+        duration: float
+            Duration of the call in seconds
+        request_bytes: int, optional
+            Size of the request body
+        response_bytes: int, optional
+            Size of the response body
+        retries: int, optional
+            Number of attempts after the first one
+
+        """
+        key = (api_method, verb, ERROR_STATUS if status is None else str(status))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _Series(len(self.buckets))
+            series.add(self.buckets, duration, request_bytes, response_bytes, retries)
+
+    def reset(self):
+        """Remove all the recorded calls."""
+        with self._lock:
+            self._series = {}
+
+    def snapshot(self):
+        """
+        Return the recorded values of each (api_method, verb, status).
+
+        Returns
+        -------
+        series: list
+            Sorted [{"api_method", "verb", "status", "count", "duration_sum",
+            "buckets", "request_bytes", "response_bytes", "retries"}],
+            buckets holds the (upper bound, cumulative count) pairs of the
+            duration histogram, the last upper bound is float("inf")
+
+        """
+        with self._lock:
+            items = sorted((key, series.copy()) for key, series in self._series.items())
+        return [
+            OrderedDict(
+                [
+                    ("api_method", api_method),
+                    ("verb", verb),
+                    ("status", status),
+                    ("count", series.count),
+                    ("duration_sum", series.duration_sum),
+                    ("buckets", self._cumulative_buckets(series.bucket_counts)),
+                    ("request_bytes", series.request_bytes),
+                    ("response_bytes", series.response_bytes),
+                    ("retries", series.retries),
+                ]
+            )
+            for (api_method, verb, status), series in items
+        ]
+
+    def summary(self, quantiles=(0.5, 0.9, 0.99)):
+        """
+        Return the metrics of each API method (all verbs and statuses).
+
+        Parameters
+        ----------
+        quantiles: iterable, optional
+            Quantiles of the durations to estimate, (0.5, 0.9, 0.99) by default
+
+        Returns
+        -------
+        summary: dict
+            {api_method: {"count", "errors", "duration_sum", "mean", "p50",
+            "p90", "p99", "request_bytes", "response_bytes", "retries"}}
+            sorted by API method, errors counts the statuses >= 400
+            and the calls without response
+
+        """
+        with self._lock:
+            items = sorted((key, series.copy()) for key, series in self._series.items())
+        merged = OrderedDict()
+        errors = {}
+        for (api_method, _, status), series in items:
+            if api_method not in merged:
+                merged[api_method] = _Series(len(self.buckets))
+                errors[api_method] = 0
+            merged[api_method].merge(series)
+            if status == ERROR_STATUS or int(status) >= 400:
+                errors[api_method] += series.count
+
+        summary = OrderedDict()
+        for api_method, series in merged.items():
+            values = OrderedDict(
+                [
+                    ("count", series.count),
+                    ("errors", errors[api_method]),
+                    ("duration_sum", series.duration_sum),
+                    ("mean", series.duration_sum / series.count),
+                ]
+            )
+            for quantile in quantiles:
+                name = "p" + ("%g" % (quantile * 100)).replace(".", "_")
+                values[name] = self._quantile(quantile, series.bucket_counts)
+            values["request_bytes"] = series.request_bytes
+            values["response_bytes"] = series.response_bytes
+            values["retries"] = series.retries
+            summary[api_method] = values
+        return summary
+
+    def quantile(self, quantile, api_method=None):
+        """
+        Estimate a quantile of the durations.
+
+        Parameters
+        ----------
+        quantile: float
+            Quantile between 0 and 1 (0.99 for the 99th percentile)
+        api_method: str, optional
+            Name of the API method, all the calls by default
+
+        Returns
+        -------
+        duration: float or None
+            Estimated duration in seconds, None without recorded calls
+
+        """
+        if not 0 <= quantile <= 1:
+            raise ValueError("quantile must be between 0 and 1!")
+        merged = _Series(len(self.buckets))
+        with self._lock:
+            for key, series in self._series.items():
+                if api_method is None or key[0] == api_method:
+                    merged.merge(series)
+        return self._quantile(quantile, merged.bucket_counts)
+
+    def to_prometheus(self):
+        """
+        Return the metrics in the Prometheus text exposition format.
+
+        Returns
+        -------
+        text: str
+            The {namespace}_request_duration_seconds histogram and the
+            {namespace}_request_bytes_total, {namespace}_response_bytes_total
+            and {namespace}_retries_total counters, labelled with api_method,
+            verb and status
+
+        """
+        series = self.snapshot()
+        name = self.namespace + "_request_duration_seconds"
+        lines = [
+            "# HELP " + name + " Duration of the Artifactory REST API calls.",
+            "# TYPE " + name + " histogram",
+        ]
+        for values in series:
+            labels = _labels(values)
+            for bound, count in values["buckets"]:
+                lines.append(
+                    name
+                    + "_bucket{"
+                    + labels
+                    + ',le="'
+                    + _format_value(bound)
+                    + '"} '
+                    + str(count)
+                )
+            lines.append(
+                name + "_sum{" + labels + "} " + _format_value(values["duration_sum"])
+            )
+            lines.append(name + "_count{" + labels + "} " + str(values["count"]))
+
+        for key, description in [
+            ("request_bytes", "Size of the request bodies sent."),
+            ("response_bytes", "Size of the response bodies received."),
+            ("retries", "Attempts after the first one."),
+        ]:
+            name = self.namespace + "_" + key + "_total"
+            lines.append("# HELP " + name + " " + description)
+            lines.append("# TYPE " + name + " counter")
+            for values in series:
+                lines.append(name + "{" + _labels(values) + "} " + str(values[key]))
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, destination):
+        """
+        Write the metrics in the Prometheus text exposition format.
+
+        Parameters
+        ----------
+        destination: str or file object or callable
+            Path of a file, replaced atomically (for the textfile collector
+            of the node exporter), file object opened in text mode, or callable
+            receiving the text (logging or HTTP handler...)
+
+        """
+        text = self.to_prometheus()
+        if callable(destination):
+            destination(text)
+        elif hasattr(destination, "write"):
+            destination.write(text)
+        else:
+            directory = os.path.dirname(os.path.abspath(destination))
+            descriptor, temporary_path = tempfile.mkstemp(
+                prefix=".metrics-", dir=directory
+            )
+            try:
+                with io.open(descriptor, "w", encoding="utf-8") as metrics_file:
+                    metrics_file.write(text)
+                # mkstemp creates the file readable by its owner only
+                os.chmod(temporary_path, 0o644)
+                _replace_file(temporary_path, destination)
+            except BaseException:
+                os.remove(temporary_path)
+                raise
+
+    def _cumulative_buckets(self, bucket_counts):
+        """Return the (upper bound, cumulative count) pairs of a histogram."""
+        cumulative = []
+        total = 0
+        for bound, count in zip(self.buckets + (float("inf"),), bucket_counts):
+            total += count
+            cumulative.append((bound, total))
+        return cumulative
+
+    def _quantile(self, quantile, bucket_counts):
+        """Estimate a quantile by linear interpolation in its bucket."""
+        count = sum(bucket_counts)
+        if count == 0:
+            return None
+        rank = quantile * count
+        total = 0
+        lower = 0.0
+        for bound, bucket_count in zip(self.buckets, bucket_counts):
+            if bucket_count and total + bucket_count >= rank:
+                return lower + (bound - lower) * (rank - total) / bucket_count
+            total += bucket_count
+            lower = bound
+        # In the +Inf bucket, the largest finite bound is the best estimate
+        return self.buckets[-1]
+
+
+class _Series(object):
+    """Recorded values of the calls of an (api_method, verb, status)."""
+
+    __slots__ = (
+        "count",
+        "duration_sum",
+        "bucket_counts",
+        "request_bytes",
+        "response_bytes",
+        "retries",
+    )
+
+    def __init__(self, buckets):
+        """Object instantiation."""
+        self.count = 0
+        self.duration_sum = 0.0
+        # One count per bucket (not cumulative), the last one for +Inf
+        self.bucket_counts = [0] * (buckets + 1)
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.retries = 0
+
+    def add(self, bounds, duration, request_bytes, response_bytes, retries):
+        """Add a call."""
+        self.count += 1
+        self.duration_sum += duration
+        index = len(bounds)
+        for position, bound in enumerate(bounds):
+            if duration <= bound:
+                index = position
+                break
+        self.bucket_counts[index] += 1
+        self.request_bytes += request_bytes
+        self.response_bytes += response_bytes
+        self.retries += retries
+
+    def merge(self, other):
+        """Add the calls of another series."""
+        self.count += other.count
+        self.duration_sum += other.duration_sum
+        for index, count in enumerate(other.bucket_counts):
+            self.bucket_counts[index] += count
+        self.request_bytes += other.request_bytes
+        self.response_bytes += other.response_bytes
+        self.retries += other.retries
+
+    def copy(self):
+        """Return a copy of the series."""
+        series = _Series(len(self.bucket_counts) - 1)
+        series.merge(self)
+        return series
+
+
+def _labels(values):
+    """Format the api_method, verb and status labels of a series."""
+    return ",".join(
+        key + '="' + _escape_label(values[key]) + '"'
+        for key in ["api_method", "verb", "status"]
+    )
+
+
+def _escape_label(value):
+    """Escape a label value of the Prometheus text format."""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value):
+    """Format a number of the Prometheus text format."""
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
@@ -8,11 +8,12 @@
 
 """Rtpy class definition with it's attributes which is exposed to the end user."""
 
-from copy import deepcopy
+from requests.adapters import DEFAULT_POOLSIZE
 
-from .tools import RtpyBase
+from .tools import RtpyBase, create_session
 from .artifacts_and_storage import RtpyArtifactsAndStorage
 from .builds import RtpyBuilds
+from .bulk import RtpyBulk
 from .repositories import RtpyRepositories
 from .searches import RtpySearches
 from .security import RtpySecurity
@@ -30,6 +31,9 @@ class Rtpy(RtpyBase):
     settings: dict
         The user settings, mandaroty keys are "af_url" and "api_key"
         or "username" and "password".
+        A single pooled requests.Session() is shared by all the categories,
+        it is configured with the optional "pool_connections", "pool_maxsize",
+        "pool_block" and "keep_alive" keys unless a "session" is provided.
 
     Attributes
     ----------
@@ -37,6 +41,8 @@ class Rtpy(RtpyBase):
         Category for multiple API methods
     buils: rtpy.builds.RtpyBuilds
         Category for multiple API methods
+    bulk: rtpy.bulk.RtpyBulk
+        Bulk operations running many API calls concurrently
     repositories: rtpy.repositories.RtpyRepositories
         Category for multiple API methods
     searches: rtpy.searches.RtpySearches
@@ -49,25 +55,38 @@ class Rtpy(RtpyBase):
         Category for multiple API methods
     settings: dict
         Previously supplied settings at class instantiation
+    session: requests.Session
+        HTTP transport shared by all the categories
 
     """
 
     def __init__(self, settings):
         """Object Instantiation."""
-        settings = deepcopy(settings)
+        # Shallow copy, objects such as the session are shared with the user
+        settings = dict(settings)
+        categories_settings = dict(settings)
+        if categories_settings.get("session") is None:
+            categories_settings["session"] = create_session(settings)
+
         self.artifacts_and_storage = RtpyArtifactsAndStorage(
-            settings, "storage/", "[ARTIFACTS & STORAGE] : "
+            categories_settings, "storage/", "[ARTIFACTS & STORAGE] : "
         )
-        self.builds = RtpyBuilds(settings, "build/", "[BUILDS] : ")
+        self.builds = RtpyBuilds(categories_settings, "build/", "[BUILDS] : ")
         self.repositories = RtpyRepositories(
-            settings, "repositories/", "[REPOSITORIES] : "
+            categories_settings, "repositories/", "[REPOSITORIES] : "
         )
-        self.searches = RtpySearches(settings, "search/", "[SEARCHES] : ")
-        self.security = RtpySecurity(settings, "security/", "[SECURITY] : ")
+        self.searches = RtpySearches(categories_settings, "search/", "[SEARCHES] : ")
+        self.security = RtpySecurity(categories_settings, "security/", "[SECURITY] : ")
         self.system_and_configuration = RtpySystemAndConfiguration(
-            settings, "system/", "[SYSTEM & CONFIGURATION] : "
+            categories_settings, "system/", "[SYSTEM & CONFIGURATION] : "
+        )
+        self.bulk = RtpyBulk(
+            self.artifacts_and_storage,
+            self.searches,
+            settings.get("pool_maxsize", DEFAULT_POOLSIZE),
         )
         self.settings = settings
+        self.session = categories_settings["session"]
 
     def __call__(self):
         """Shortcut to all the system health ping method to verify connectivity."""
@@ -8,8 +8,14 @@
 
 """Functions for the SEARCHES REST API Methods category."""
 
+import re
+from concurrent.futures import ThreadPoolExecutor
 
 from .tools import RtpyBase
+from .tracing import propagate
+
+# Offset and limit clauses of an AQL query
+AQL_WINDOW_PATTERN = re.compile(r"\.(offset|limit)\(\s*(\d+)\s*\)")
 
 
 class RtpySearches(RtpyBase):
@@ -34,6 +40,66 @@ class RtpySearches(RtpyBase):
             "POST", target, api_method, kwargs, data=query, params=params
         )
 
+    def iter_artifactory_query_language(
+        self, query, page_size=1000, prefetch=True, **kwargs
+    ):
+        """
+        Iterate lazily over the results of an AQL query, page by page.
+
+        The query is rewritten with .offset() and .limit() windows of page_size
+        items, so at most two pages are held in memory. An offset or limit
+        already in the query bounds the iteration. The query should have a
+        sort clause for the pages to be consistent.
+
+        Parameters
+        ---------
+        query: str
+            The AQL string (items.find(...)...)
+        page_size: int, optional
+            Number of items requested per API call, 1000 by default
+        prefetch: bool, optional
+            True to request the next page in a background thread while the
+            current one is consumed, True by default
+        **kwargs
+            Keyword arguments
+
+        Returns
+        -------
+        results: iterator
+            Items of the "results" list of each page
+
+        """
+        kwargs = self._decoded_kwargs(kwargs)
+        query, offset, end = _aql_window(query, page_size)
+        executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+
+        def fetch(page_offset):
+            page_query, size = _aql_page(query, page_offset, end, page_size)
+            r = self.artifactory_query_language(page_query, **kwargs)
+            return size, r["results"]
+
+        next_page = None
+        try:
+            while end is None or offset < end:
+                if next_page is None:
+                    size, results = fetch(offset)
+                else:
+                    size, results = next_page.result()
+                    next_page = None
+                offset += len(results)
+                last_page = len(results) < size or (end is not None and offset >= end)
+                if executor is not None and not last_page:
+                    next_page = executor.submit(propagate(fetch), offset)
+                for item in results:
+                    yield item
+                if last_page:
+                    return
+        finally:
+            if executor is not None:
+                if next_page is not None:
+                    next_page.cancel()
+                executor.shutdown(wait=False)
+
     """Old previously supported methods (code not updated for current rtpy)
     def artifact_search_quick_search(
             artifact_name, options=None,
@@ -178,3 +244,39 @@ class RtpySearches(RtpyBase):
         target = "docker/" + repo_key + "/v2/" + image_path + "/tags/list"
         target = self._append_to_string(target, options)
         return self._request("GET", target, api_method, kwargs)
+
+
+def _aql_window(query, page_size):
+    """
+    Remove the offset and limit clauses of an AQL query.
+
+    Raises
+    ------
+    RtpyBase.RtpyError
+        If page_size is not a positive integer
+
+    Returns
+    -------
+    tuple
+        (query, offset, end), end is None without limit clause
+
+    """
+    if not isinstance(page_size, int) or isinstance(page_size, bool) or page_size < 1:
+        raise RtpyBase.RtpyError("page_size must be a positive integer!")
+    window = dict(
+        (clause, int(value)) for clause, value in AQL_WINDOW_PATTERN.findall(query)
+    )
+    offset = window.get("offset", 0)
+    end = None
+    if "limit" in window:
+        end = offset + window["limit"]
+    return AQL_WINDOW_PATTERN.sub("", query).rstrip(), offset, end
+
+
+def _aql_page(query, offset, end, page_size):
+    """Return the (query, size) of the page of an AQL query starting at offset."""
+    size = page_size
+    if end is not None:
+        size = min(page_size, end - offset)
+    page_query = query + ".offset(" + str(offset) + ").limit(" + str(size) + ")"
+    return page_query, size
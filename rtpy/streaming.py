@@ -0,0 +1,416 @@
+# coding: utf-8
+
+# Copyright (C) 2018 Orange
+#
+# This software is distributed under the terms and conditions of the 'Apache-2.0'
+# license which can be found in the 'LICENSE.md' file
+# or at 'http://www.apache.org/licenses/LICENSE-2.0'.
+
+"""Incremental parsing of the large JSON lists returned by the REST API."""
+
+from __future__ import unicode_literals
+import codecs
+import json
+import re
+
+# Size of the chunks read from the network when streaming JSON items
+JSON_CHUNK_SIZE = 64 * 1024
+
+# Characters skipped between JSON tokens
+_WHITESPACE = " \t\n\r"
+
+# Characters ending a number or a literal
+_DELIMITERS = _WHITESPACE + ",]}"
+
+# Characters searched when scanning a value outside and inside the strings
+_STRUCTURE = re.compile(r'["\[\]{}]')
+_STRING_END = re.compile(r'["\\]')
+_SCALAR_END = re.compile("[" + re.escape(_DELIMITERS) + "]")
+
+
+class JsonItemsParser(object):
+    """
+    Push parser yielding the items of a JSON list as the content arrives.
+
+    The list is either the JSON document itself (key True) or the named member
+    of the top-level object ({"results": [...]}, {"files": [...]}...). Only the
+    current item and the unparsed content are kept in memory, the members of
+    the top-level object other than the list are skipped.
+
+    The streaming attribute tells once known if the content holds such a list :
+    None until then, True if its items are parsed, False otherwise (the rest
+    of the content is ignored, it is to be decoded as a whole).
+
+    The content is scanned in linear time : the end of an item split between
+    chunks is searched in the new chunks only, the item is decoded once complete.
+
+    Parameters
+    ----------
+    key: str or bool, optional
+        Name of the member of the top-level object holding the list,
+        True (default) for a top-level list
+
+    Examples
+    --------
+    >>> parser = JsonItemsParser("results")
+    >>> parser.feed(b'{"results": [{"a": 1}, {"a"')
+    [{'a': 1}]
+    >>> parser.feed(b': 2}], "range": {}}')
+    [{'a': 2}]
+    >>> parser.close()
+
+    """
+
+    def __init__(self, key=True):
+        """Object instantiation."""
+        self._key = key
+        self._decoder = json.JSONDecoder()
+        self._text_decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._position = 0
+        # Scanner and text of the value split between chunks
+        self._scanner = None
+        self._pending = []
+        self._state = "start"
+        self._member = None
+        self._final = False
+        self.streaming = None
+
+    def feed(self, data):
+        """
+        Parse a chunk of the content.
+
+        Parameters
+        ----------
+        data: bytes
+            Next chunk of the UTF-8 encoded content
+
+        Raises
+        ------
+        ValueError
+            If the content is not valid JSON
+
+        Returns
+        -------
+        items: list
+            Items of the list completed by the chunk
+
+        """
+        if self.streaming is False:
+            return []
+        self._buffer += self._text_decoder.decode(data)
+        return self._parse()
+
+    def close(self):
+        """
+        Parse the end of the content and verify that the list was complete.
+
+        Raises
+        ------
+        ValueError
+            If the content is not valid JSON or the list was not complete
+
+        Returns
+        -------
+        items: list
+            Last items of the list
+
+        """
+        self._buffer += self._text_decoder.decode(b"", final=True)
+        self._final = True
+        items = self._parse()
+        if self._state != "done":
+            raise ValueError("Incomplete JSON content!")
+        return items
+
+    def _parse(self):
+        """Consume the buffer as far as possible and return the completed items."""
+        items = []
+        while self._state != "done":
+            if self._scanner is not None:
+                # Value split between chunks
+                if not self._decode_value():
+                    break
+                self._value_decoded(items)
+                continue
+            character = self._next_character()
+            if character is None:
+                break
+            if self._state == "start":
+                if character == "[" and self._key is True:
+                    self.streaming = True
+                    self._advance("first_item")
+                elif character == "{" and self._key is not True:
+                    self._advance("key")
+                else:
+                    self._not_streamed()
+            elif self._state == "key":
+                if character == "}":
+                    # Member missing
+                    self._not_streamed()
+                elif character == ",":
+                    self._advance("key")
+                elif character == '"':
+                    if not self._decode_value():
+                        break
+                    self._value_decoded(items)
+                else:
+                    self._fail()
+            elif self._state == "colon":
+                if character != ":":
+                    self._fail()
+                self._advance("member")
+            elif self._state == "member":
+                if self._member == self._key:
+                    if character != "[":
+                        self._not_streamed()
+                        continue
+                    self.streaming = True
+                    self._advance("first_item")
+                elif not self._decode_value():
+                    break
+                else:
+                    self._value_decoded(items)
+            elif self._state == "first_item" and character == "]":
+                self._advance("done")
+            elif self._state in ["first_item", "item"]:
+                if not self._decode_value():
+                    break
+                self._value_decoded(items)
+            elif self._state == "after_item":
+                if character == ",":
+                    self._advance("item")
+                elif character == "]":
+                    self._advance("done")
+                else:
+                    self._fail()
+
+        # Drop the consumed content
+        self._buffer = self._buffer[self._position :]
+        self._position = 0
+        return items
+
+    def _not_streamed(self):
+        """Stop the parsing, the content holds no list to stream."""
+        self.streaming = False
+        self._state = "done"
+        self._buffer = ""
+        self._position = 0
+
+    def _value_decoded(self, items):
+        """Change the state once the value of the current state is decoded."""
+        if self._state == "key":
+            self._member = self._value
+            self._state = "colon"
+        elif self._state == "member":
+            self._state = "key"
+        else:
+            items.append(self._value)
+            self._state = "after_item"
+
+    def _next_character(self):
+        """Skip the whitespace and return the next character (None if missing)."""
+        while (
+            self._position < len(self._buffer)
+            and self._buffer[self._position] in _WHITESPACE
+        ):
+            self._position += 1
+        if self._position < len(self._buffer):
+            return self._buffer[self._position]
+        return None
+
+    def _advance(self, state):
+        """Consume one character and change the state."""
+        self._position += 1
+        self._state = state
+
+    def _decode_value(self):
+        """
+        Decode the JSON value at the current position into the _value attribute.
+
+        The end of the value is searched first, a value split between chunks
+        is kept aside with the state of its scanner until the next chunk.
+
+        Raises
+        ------
+        ValueError
+            If the complete value is not valid JSON
+
+        Returns
+        -------
+        bool
+            False if more content is needed to decode the value
+
+        """
+        if self._scanner is None:
+            scanner = _ValueScanner(self._buffer[self._position])
+            if not scanner.scalar:
+                # Most values are complete in the buffer, decoded at once
+                try:
+                    self._value, self._position = self._decoder.raw_decode(
+                        self._buffer, self._position
+                    )
+                    return True
+                except ValueError:
+                    if self._final:
+                        raise
+            self._scanner = scanner
+        end = self._scanner.scan(self._buffer, self._position, self._final)
+        if end is None:
+            self._pending.append(self._buffer[self._position :])
+            self._buffer = ""
+            self._position = 0
+            return False
+
+        if self._pending:
+            text = "".join(self._pending) + self._buffer[self._position : end]
+            self._pending = []
+            start, text_end = 0, len(text)
+        else:
+            text, start, text_end = self._buffer, self._position, end
+        self._value, value_end = self._decoder.raw_decode(text, start)
+        if value_end != text_end:
+            raise ValueError("Invalid JSON value " + repr(text[start:text_end]) + "!")
+        self._scanner = None
+        self._position = end
+        return True
+
+    def _fail(self):
+        """Raise an error for an unexpected character."""
+        message = (
+            "Unexpected character "
+            + repr(self._buffer[self._position])
+            + " in JSON content!"
+        )
+        raise ValueError(message)
+
+
+class _ValueScanner(object):
+    """Search the end of a JSON value, the content being given in pieces."""
+
+    __slots__ = ("scalar", "depth", "in_string", "escape")
+
+    def __init__(self, first_character):
+        """Object instantiation."""
+        self.scalar = first_character not in '{["'
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+
+    def scan(self, text, position, final):
+        """
+        Scan text from position.
+
+        Returns
+        -------
+        end: int or None
+            Position following the value in text, None if it continues
+            in the next piece
+
+        """
+        if self.scalar:
+            # A number or a literal is only complete once followed by a delimiter
+            match = _SCALAR_END.search(text, position)
+            if match is not None:
+                return match.start()
+            return len(text) if final else None
+
+        while True:
+            if self.in_string:
+                if self.escape:
+                    if position >= len(text):
+                        return None
+                    position += 1
+                    self.escape = False
+                match = _STRING_END.search(text, position)
+                if match is None:
+                    return None
+                position = match.end()
+                if match.group() == "\\":
+                    self.escape = True
+                    continue
+                self.in_string = False
+                if self.depth == 0:
+                    return position
+            else:
+                match = _STRUCTURE.search(text, position)
+                if match is None:
+                    return None
+                position = match.end()
+                character = match.group()
+                if character == '"':
+                    self.in_string = True
+                elif character in "[{":
+                    self.depth += 1
+                else:
+                    self.depth -= 1
+                    if self.depth <= 0:
+                        return position
+
+
+def stream_json_items(response, key=True, chunk_size=JSON_CHUNK_SIZE):
+    """
+    Return an iterator over the items of a JSON list from a streamed requests.Response.
+
+    The content is read until the list is found, the response is closed when
+    the iteration ends. If the content holds no such list or is not valid JSON,
+    the whole content is loaded into the response instead.
+
+    Parameters
+    ----------
+    response: requests.Response
+        Response of a request performed with stream=True
+    key: str or bool, optional
+        Name of the member of the top-level object holding the list,
+        True (default) for a top-level list
+    chunk_size: int, optional
+        Size of the chunks read from the network (64 KiB by default)
+
+    Returns
+    -------
+    items: iterator or None
+        Items of the list, None if the content was loaded into the response
+
+    """
+    parser = JsonItemsParser(key)
+    chunks = response.iter_content(chunk_size)
+    read = []
+    try:
+        for chunk in chunks:
+            read.append(chunk)
+            items = parser.feed(chunk)
+            if parser.streaming:
+                return _iter_json_items(response, parser, items, chunks)
+            if parser.streaming is not None:
+                break
+    except ValueError:
+        # Not valid JSON, loaded as is
+        pass
+    except Exception:
+        response.close()
+        raise
+
+    try:
+        response._content = b"".join(read) + b"".join(chunks)
+    finally:
+        response.close()
+    return None
+
+
+def _iter_json_items(response, parser, items, chunks):
+    """Yield the items already parsed, then the items of the next chunks."""
+    try:
+        for item in items:
+            yield item
+        for chunk in chunks:
+            for item in parser.feed(chunk):
+                yield item
+        for item in parser.close():
+            yield item
+    finally:
+        response.close()
+
+
+def is_json_response(headers):
+    """Return True if the Content-Type of a response is JSON."""
+    return "json" in headers.get("Content-Type", "")
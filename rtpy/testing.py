@@ -0,0 +1,1735 @@
+# coding: utf-8
+
+# Copyright (C) 2018 Orange
+#
+# This software is distributed under the terms and conditions of the 'Apache-2.0'
+# license which can be found in the 'LICENSE.md' file
+# or at 'http://www.apache.org/licenses/LICENSE-2.0'.
+
+"""StandInServer class definition, in-process stand-in of the Artifactory REST API."""
+
+from __future__ import unicode_literals
+import argparse
+import base64
+import fnmatch
+import hashlib
+import io
+import json
+import re
+import tarfile
+import threading
+import time
+import uuid
+import zipfile
+from collections import OrderedDict
+from email.utils import formatdate, mktime_tz, parsedate_tz
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import unquote, urlsplit
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urllib import unquote
+    from urlparse import urlsplit
+
+# Size of the chunks read and written when the bandwidth is limited
+BANDWIDTH_CHUNK_SIZE = 64 * 1024
+
+# Version reported by the stand-in server
+STAND_IN_VERSION = "6.23.0"
+
+# Fields of the AQL results without include clause
+AQL_DEFAULT_FIELDS = [
+    "repo",
+    "path",
+    "name",
+    "type",
+    "size",
+    "created",
+    "created_by",
+    "modified",
+    "modified_by",
+    "updated",
+]
+
+# Units of the relative times of the AQL $before and $last operators (seconds)
+AQL_TIME_UNITS = OrderedDict(
+    [
+        ("mo", 30 * 86400),
+        ("mi", 60),
+        ("ms", 0.001),
+        ("y", 365 * 86400),
+        ("w", 7 * 86400),
+        ("d", 86400),
+        ("h", 3600),
+        ("s", 1),
+    ]
+)
+
+
+class StandInServer(object):
+    """
+    In-process HTTP stand-in of Artifactory, storing everything in memory.
+
+    It implements the endpoints used by rtpy (system, repositories, security,
+    storage, file list, properties, AQL, copy and move, trash can, archives,
+    artifacts GET/HEAD/PUT/DELETE with deploy by checksum) closely enough
+    to run the functional tests and load tests without network nor
+    Artifactory instance. Reindexing and other server-side tasks are
+    acknowledged without doing anything.
+
+    The latency and the bandwidth are applied to each request, they can be
+    changed while the server is running. A latency of 0 and no bandwidth
+    limit measure the overhead of the client itself.
+
+    Each connection is served in a thread. The bodies are read, the uploads
+    hashed, the latency waited and the responses sent concurrently, but the
+    requests access the content one at a time (a single lock), which bounds
+    the throughput of concurrent calls without latency.
+
+    Parameters
+    ----------
+    host: str, optional
+        Address to listen on, "127.0.0.1" by default
+    port: int, optional
+        Port to listen on, a free port by default
+    username: str, optional
+        User name of the administrator, "admin" by default
+    password: str, optional
+        Password of the administrator, "password" by default
+    latency: float, optional
+        Delay added before each response in seconds, 0 by default
+    bandwidth: float, optional
+        Maximum transfer rate of the request and response bodies of each
+        connection in bytes per second, unlimited by default
+
+    Attributes
+    ----------
+    requests: int
+        Number of requests received
+    bytes_received: int
+        Size of the request bodies received
+    bytes_sent: int
+        Size of the response bodies sent
+
+    Examples
+    --------
+    >>> with rtpy.testing.StandInServer(latency=0.005) as server:
+    ...     af = rtpy.Rtpy(server.settings())
+    ...     af.system_and_configuration.system_health_ping()
+    'OK'
+
+    From a shell (the tests use the AF_TEST_* environment variables) :
+
+    $ python -m rtpy.testing --port 8081 --latency 0.005
+
+    """
+
+    def __init__(
+        self,
+        host="127.0.0.1",
+        port=0,
+        username="admin",
+        password="password",
+        latency=0.0,
+        bandwidth=None,
+    ):
+        """Object instantiation."""
+        if latency < 0:
+            raise ValueError("latency must be a positive number!")
+        if bandwidth is not None and bandwidth <= 0:
+            raise ValueError("bandwidth must be a positive number!")
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.requests = 0
+        self.bytes_received = 0
+        self.bytes_sent = 0
+        self._lock = threading.RLock()
+        self._state = _Artifactory(username, password)
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        """URL of the Artifactory instance (the af_url setting)."""
+        return "http://" + self.host + ":" + str(self.port) + "/artifactory"
+
+    def settings(self):
+        """Return the settings of a rtpy.Rtpy object using the administrator."""
+        return {
+            "af_url": self.url,
+            "username": self.username,
+            "password": self.password,
+        }
+
+    def start(self):
+        """Start serving in a thread, return the server."""
+        self._server = _HTTPServer((self.host, self.port), _StandInHandler)
+        self._server.stand_in = self
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving and close the listening socket."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
+            self._thread = None
+
+    def reset(self):
+        """Remove all the content and zero the counters."""
+        with self._lock:
+            self._state = _Artifactory(self.username, self.password)
+            self.requests = 0
+            self.bytes_received = 0
+            self.bytes_sent = 0
+
+    def serve_forever(self):
+        """Serve in the current thread until interrupted (started if needed)."""
+        if self._server is None:
+            self.start()
+        try:
+            while self._thread.is_alive():
+                self._thread.join(1)
+        finally:
+            self.stop()
+
+    def __enter__(self):
+        """Start the server."""
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Stop the server."""
+        self.stop()
+
+    def _count(self, requests=0, received=0, sent=0):
+        """Update the counters."""
+        with self._lock:
+            self.requests += requests
+            self.bytes_received += received
+            self.bytes_sent += sent
+
+
+class _HTTPServer(ThreadingMixIn, HTTPServer):
+    """HTTP server with a thread per connection."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _Item(object):
+    """File (content is bytes) or folder (content is None) of a repository."""
+
+    __slots__ = (
+        "content",
+        "checksums",
+        "created",
+        "created_by",
+        "modified",
+        "modified_by",
+        "properties",
+        "downloads",
+        "last_downloaded",
+        "last_downloaded_by",
+    )
+
+    def __init__(self, content, user, created=None, checksums=None):
+        """Object instantiation."""
+        self.content = content
+        self.checksums = {}
+        if content is not None:
+            self.checksums = checksums or _checksums(content)
+        self.created = created or time.time()
+        self.created_by = user
+        self.modified = self.created
+        self.modified_by = user
+        self.properties = OrderedDict()
+        self.downloads = 0
+        self.last_downloaded = 0
+        self.last_downloaded_by = None
+
+    @property
+    def folder(self):
+        """True for a folder."""
+        return self.content is None
+
+    def copy(self, user):
+        """Return a copy of the item (properties included)."""
+        item = _Item(None, user, self.created)
+        item.content = self.content
+        item.checksums = dict(self.checksums)
+        item.properties = OrderedDict(
+            (name, list(values)) for name, values in self.properties.items()
+        )
+        item.modified = time.time()
+        return item
+
+
+class _Repository(object):
+    """Configuration and items of a repository, with an index of the children."""
+
+    def __init__(self, config, user):
+        """Object instantiation."""
+        self.config = config
+        self.items = {"": _Item(None, user)}
+        self.children = {"": set()}
+
+    def add(self, path, item, user):
+        """Add an item, creating the missing parent folders."""
+        parent, _, name = path.rpartition("/")
+        if parent not in self.items:
+            self.add(parent, _Item(None, user), user)
+        self.children[parent].add(name)
+        if item.folder:
+            self.children.setdefault(path, set())
+        else:
+            self.children.pop(path, None)
+        self.items[path] = item
+
+    def remove(self, path):
+        """Remove an item and its descendants, return them (parents first)."""
+        removed = list(self.walk(path))
+        for item_path, _ in removed:
+            del self.items[item_path]
+            self.children.pop(item_path, None)
+        parent, _, name = path.rpartition("/")
+        self.children[parent].discard(name)
+        return removed
+
+    def walk(self, path):
+        """Yield the (path, item) of an item and of its descendants."""
+        stack = [path]
+        while stack:
+            item_path = stack.pop()
+            yield item_path, self.items[item_path]
+            for name in sorted(self.children.get(item_path, ()), reverse=True):
+                stack.append(_join(item_path, name))
+
+
+class _Artifactory(object):
+    """In-memory content of a StandInServer."""
+
+    def __init__(self, username, password):
+        """Object instantiation."""
+        self.lock = threading.RLock()
+        self.repositories = OrderedDict()
+        self.users = OrderedDict(
+            [
+                (
+                    username,
+                    {
+                        "name": username,
+                        "email": username + "@localhost",
+                        "password": password,
+                        "admin": True,
+                        "groups": ["readers"],
+                    },
+                )
+            ]
+        )
+        self.groups = OrderedDict(
+            [("readers", {"name": "readers", "description": "Read-only users"})]
+        )
+        self.permissions = OrderedDict(
+            [
+                (
+                    "Anything",
+                    {
+                        "name": "Anything",
+                        "repositories": ["ANY"],
+                        "principals": {"users": {"anonymous": ["r"]}},
+                    },
+                )
+            ]
+        )
+        self.api_keys = {}
+        self.trash = OrderedDict()
+        self.configuration = (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<config xmlns="http://artifactory.jfrog.org/xsd/2.2.0">\n'
+            "    <offlineMode>true</offlineMode>\n"
+            "</config>\n"
+        )
+
+    def authenticate(self, headers):
+        """Return the user name of the credentials of a request (None if invalid)."""
+        api_key = headers.get("X-JFrog-Art-Api")
+        if api_key:
+            return self._api_key_user(api_key)
+        authorization = headers.get("Authorization") or ""
+        if not authorization.startswith("Basic "):
+            return None
+        try:
+            credentials = base64.b64decode(authorization[6:].encode("ascii"))
+            username, _, password = credentials.decode("utf-8").partition(":")
+        except (TypeError, ValueError):
+            return None
+        user = self.users.get(username)
+        if user is None:
+            return None
+        if user.get("password") == password or self.api_keys.get(username) == password:
+            return username
+        return None
+
+    def _api_key_user(self, api_key):
+        """Return the user name of an API key."""
+        for username, key in self.api_keys.items():
+            if key == api_key:
+                return username
+        return None
+
+
+class _Response(object):
+    """Status, headers and body of a response of the stand-in server."""
+
+    def __init__(self, status, body=None, headers=None, content_type=None):
+        """Object instantiation."""
+        self.status = status
+        self.headers = OrderedDict(headers or {})
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body).encode("utf-8")
+            content_type = content_type or "application/json"
+        elif body is None:
+            body = b""
+        elif not isinstance(body, bytes):
+            body = body.encode("utf-8")
+            content_type = content_type or "text/plain"
+        if content_type:
+            self.headers["Content-Type"] = content_type
+        self.body = body
+
+
+def _checksums(content):
+    """Return the MD5, SHA-1 and SHA-256 checksums of a content."""
+    return dict(
+        (algorithm, hashlib.new(algorithm, content).hexdigest())
+        for algorithm in ["md5", "sha1", "sha256"]
+    )
+
+
+def _error(status, message):
+    """Build a response with a standard Artifactory error JSON."""
+    return _Response(status, {"errors": [{"status": status, "message": message}]})
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    """Request handler of a StandInServer, one instance per request."""
+
+    protocol_version = "HTTP/1.1"
+    server_version = "Artifactory/" + STAND_IN_VERSION
+    # The headers and the body are written separately, avoid the delayed ACKs
+    disable_nagle_algorithm = True
+
+    # (verb, regular expression of the path relative to the API, method name)
+    routes = [
+        ("GET", r"system/ping", "_system_ping"),
+        ("GET", r"system", "_system_info"),
+        ("GET", r"system/version", "_system_version"),
+        ("GET", r"system/configuration", "_get_configuration"),
+        ("POST", r"system/configuration", "_save_configuration"),
+        ("GET", r"system/license", "_license_information"),
+        ("POST", r"system/license", "_install_license"),
+        ("GET", r"system/configuration/webServer", "_reverse_proxy_configuration"),
+        ("GET", r"system/configuration/reverseProxy/nginx", "_reverse_proxy_snippet"),
+        ("POST", r"system/storage/optimize", "_optimize_storage"),
+        ("GET", r"storageinfo", "_storage_info"),
+        ("GET", r"tasks", "_background_tasks"),
+        ("GET", r"repositories", "_get_repositories"),
+        ("GET", r"repositories/(?P<key>[^/]+)", "_repository_configuration"),
+        ("PUT", r"repositories/(?P<key>[^/]+)", "_create_repository"),
+        ("POST", r"repositories/(?P<key>[^/]+)", "_update_repository"),
+        ("DELETE", r"repositories/(?P<key>[^/]+)", "_delete_repository"),
+        (
+            "POST",
+            r"(yum|nuget|npm|maven|deb|opkg|bower|helm|cran|conda)(/.*)?",
+            "_reindex",
+        ),
+        ("GET", r"storage/(?P<repo>[^/]+)(/(?P<path>.*))?", "_get_storage"),
+        ("PUT", r"storage/(?P<repo>[^/]+)(/(?P<path>.*))?", "_set_properties"),
+        ("DELETE", r"storage/(?P<repo>[^/]+)(/(?P<path>.*))?", "_delete_properties"),
+        ("POST", r"checksum/sha256", "_set_sha256_checksum"),
+        ("POST", r"search/aql", "_artifactory_query_language"),
+        ("GET", r"docker/(?P<repo>[^/]+)/v2/_catalog", "_docker_repositories"),
+        ("GET", r"docker/(?P<repo>[^/]+)/v2/(?P<image>.+)/tags/list", "_docker_tags"),
+        ("POST", r"(?P<verb>copy|move)/(?P<repo>[^/]+)(/(?P<path>.*))?", "_transfer"),
+        ("GET", r"archive/download/(?P<repo>[^/]+)(/(?P<path>.*))?", "_archive"),
+        ("GET", r"download/(?P<repo>[^/]+)/(?P<path>.+)", "_sync_download"),
+        ("POST", r"trash/empty", "_empty_trash_can"),
+        ("DELETE", r"trash/clean/(?P<path>.+)", "_clean_trash_can"),
+        ("POST", r"trash/restore/(?P<path>.+)", "_restore_from_trash_can"),
+        ("GET", r"build", "_all_builds"),
+        ("GET", r"security/users", "_get_users"),
+        ("GET", r"security/users/(?P<name>[^/]+)", "_get_user"),
+        ("PUT", r"security/users/(?P<name>[^/]+)", "_create_user"),
+        ("POST", r"security/users/(?P<name>[^/]+)", "_update_user"),
+        ("DELETE", r"security/users/(?P<name>[^/]+)", "_delete_user"),
+        ("GET", r"security/encryptedPassword", "_encrypted_password"),
+        ("GET", r"security/lockedUsers", "_locked_users"),
+        ("POST", r"security/(unlockUsers(/[^/]+)?|unlockAllUsers)", "_unlock_users"),
+        ("GET", r"security/apiKey", "_get_api_key"),
+        ("POST", r"security/apiKey", "_create_api_key"),
+        ("PUT", r"security/apiKey", "_regenerate_api_key"),
+        ("DELETE", r"security/apiKey(/(?P<name>[^/]+))?", "_revoke_api_key"),
+        ("GET", r"security/(?P<kind>groups|permissions)", "_get_principals"),
+        (
+            "GET",
+            r"security/(?P<kind>groups|permissions)/(?P<name>[^/]+)",
+            "_get_principal",
+        ),
+        (
+            "PUT",
+            r"security/(?P<kind>groups|permissions)/(?P<name>[^/]+)",
+            "_create_principal",
+        ),
+        (
+            "POST",
+            r"security/(?P<kind>groups|permissions)/(?P<name>[^/]+)",
+            "_update_principal",
+        ),
+        (
+            "DELETE",
+            r"security/(?P<kind>groups|permissions)/(?P<name>[^/]+)",
+            "_delete_principal",
+        ),
+    ]
+    compiled_routes = [
+        (verb, re.compile(pattern + "$"), name) for verb, pattern, name in routes
+    ]
+
+    def do_GET(self):
+        """Handle a GET request."""
+        self._handle()
+
+    do_HEAD = do_PUT = do_POST = do_DELETE = do_PATCH = do_GET
+
+    def log_message(self, format, *args):
+        """Don't log the requests."""
+        pass
+
+    def _handle(self):
+        """Read the request, dispatch it and send the response."""
+        stand_in = self.server.stand_in
+        body = self._read_body(stand_in.bandwidth)
+        stand_in._count(requests=1, received=len(body))
+        parts = urlsplit(self.path)
+        self.request_path = unquote(parts.path).lstrip("/")
+        if self.request_path.startswith("artifactory/"):
+            self.request_path = self.request_path[len("artifactory/") :]
+        self.query = _parse_query(parts.query)
+        self.raw_query = parts.query
+        self.body = body
+        self.base_url = stand_in.url
+        self.state = stand_in._state
+
+        # Hashed before taking the lock of the content, the longest part of a deploy
+        self.body_checksums = None
+        if self.command == "PUT" and not self.request_path.startswith("api/"):
+            self.body_checksums = _checksums(body)
+
+        if stand_in.latency:
+            time.sleep(stand_in.latency)
+        try:
+            with self.state.lock:
+                response = self._dispatch()
+        except Exception as error:
+            response = _error(500, "Stand-in server error : " + repr(error))
+        self._send(response, stand_in)
+
+    def _dispatch(self):
+        """Return the response of the request."""
+        self.user = self.state.authenticate(self.headers)
+        if self.request_path.startswith("api/"):
+            path = self.request_path[len("api/") :].rstrip("/")
+            if path != "system/ping" and self.user is None:
+                return _error(401, "Bad credentials")
+            verb = "GET" if self.command == "HEAD" else self.command
+            for route_verb, pattern, name in self.compiled_routes:
+                match = pattern.match(path)
+                if match and route_verb == verb:
+                    return getattr(self, name)(**match.groupdict())
+            return _error(404, "Not Found")
+
+        if self.user is None:
+            return _error(401, "Bad credentials")
+        repo_key, _, path = self.request_path.partition("/")
+        if self.command == "PUT":
+            return self._deploy(repo_key, path)
+        if self.command in ["GET", "HEAD"]:
+            return self._retrieve(repo_key, path)
+        if self.command == "DELETE":
+            return self._delete_item(repo_key, path.strip("/"))
+        return _error(405, "Method Not Allowed")
+
+    def _read_body(self, bandwidth):
+        """Read the body of the request (Content-Length or chunked)."""
+        if "chunked" in (self.headers.get("Transfer-Encoding") or "").lower():
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().split(b";")[0].strip(), 16)
+                if size == 0:
+                    # Trailers
+                    while self.rfile.readline().strip():
+                        pass
+                    break
+                chunks.append(self._read(size, bandwidth))
+                self.rfile.readline()
+            return b"".join(chunks)
+        return self._read(int(self.headers.get("Content-Length") or 0), bandwidth)
+
+    def _read(self, size, bandwidth):
+        """Read bytes from the connection at the bandwidth."""
+        if bandwidth is None:
+            return self.rfile.read(size)
+        chunks = []
+        while size > 0:
+            chunk = self.rfile.read(min(size, BANDWIDTH_CHUNK_SIZE))
+            if not chunk:
+                break
+            chunks.append(chunk)
+            size -= len(chunk)
+            time.sleep(len(chunk) / float(bandwidth))
+        return b"".join(chunks)
+
+    def _send(self, response, stand_in):
+        """Send a response at the bandwidth."""
+        self.send_response(response.status)
+        no_body = response.status in [204, 304] or self.command == "HEAD"
+        if response.status not in [204, 304]:
+            self.send_header("Content-Length", str(len(response.body)))
+        for name, value in response.headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        if no_body:
+            return
+        bandwidth = stand_in.bandwidth
+        if bandwidth is None:
+            self.wfile.write(response.body)
+        else:
+            view = memoryview(response.body)
+            for start in range(0, len(view), BANDWIDTH_CHUNK_SIZE):
+                chunk = view[start : start + BANDWIDTH_CHUNK_SIZE]
+                # Delayed before writing so that the client receives it late
+                time.sleep(len(chunk) / float(bandwidth))
+                self.wfile.write(chunk)
+        stand_in._count(sent=len(response.body))
+
+    def _json_body(self):
+        """Return the JSON body of the request."""
+        return json.loads(self.body.decode("utf-8") or "{}")
+
+    def _now(self):
+        """Return the current time in the ISO 8601 format of Artifactory."""
+        return _iso_time(time.time())
+
+    def _repository(self, repo_key):
+        """Return a repository, None if it doesn't exist."""
+        return self.state.repositories.get(repo_key)
+
+    # SYSTEM AND CONFIGURATION
+
+    def _system_ping(self):
+        return _Response(200, "OK")
+
+    def _system_info(self):
+        return _Response(200, "rtpy stand-in server " + STAND_IN_VERSION + "\n")
+
+    def _system_version(self):
+        return _Response(
+            200,
+            {
+                "version": STAND_IN_VERSION,
+                "revision": "62300900",
+                "addons": [],
+                "license": "stand-in",
+            },
+        )
+
+    def _get_configuration(self):
+        return _Response(200, self.state.configuration, content_type="application/xml")
+
+    def _save_configuration(self):
+        self.state.configuration = self.body.decode("utf-8")
+        return _Response(200, "Reload of new configuration succeeded")
+
+    def _license_information(self):
+        return _Response(
+            200, {"type": "Stand-in", "validThrough": "", "licensedTo": "rtpy"}
+        )
+
+    def _install_license(self):
+        # Artifactory answers with a non standard error JSON
+        return _Response(400, {"status": 400, "message": "Invalid license"})
+
+    def _reverse_proxy_configuration(self):
+        return _Response(200, {"key": "nginx", "webServerType": "NGINX"})
+
+    def _reverse_proxy_snippet(self):
+        return _error(400, "No reverse proxy configuration")
+
+    def _optimize_storage(self):
+        return _Response(200, "Scheduled storage optimization")
+
+    def _storage_info(self):
+        files = folders = size = 0
+        summaries = []
+        for key, repository in self.state.repositories.items():
+            repository_files = sum(
+                1 for item in repository.items.values() if not item.folder
+            )
+            repository_size = sum(
+                len(item.content)
+                for item in repository.items.values()
+                if not item.folder
+            )
+            files += repository_files
+            folders += len(repository.items) - repository_files
+            size += repository_size
+            summaries.append(
+                {
+                    "repoKey": key,
+                    "repoType": repository.config["rclass"].upper(),
+                    "filesCount": repository_files,
+                    "foldersCount": len(repository.items) - repository_files,
+                    "usedSpace": str(repository_size) + " bytes",
+                    "packageType": repository.config["packageType"],
+                }
+            )
+        return _Response(
+            200,
+            {
+                "binariesSummary": {
+                    "binariesCount": str(files),
+                    "binariesSize": str(size) + " bytes",
+                    "itemsCount": str(files + folders),
+                },
+                "fileStoreSummary": {"storageType": "memory"},
+                "repositoriesSummaryList": summaries,
+            },
+        )
+
+    def _background_tasks(self):
+        return _Response(200, {"tasks": []})
+
+    # REPOSITORIES
+
+    def _get_repositories(self):
+        repositories = []
+        for key, repository in self.state.repositories.items():
+            config = repository.config
+            if self.query.get("type", config["rclass"]) != config["rclass"]:
+                continue
+            package_type = self.query.get("packageType", config["packageType"])
+            if package_type.lower() != config["packageType"].lower():
+                continue
+            repositories.append(
+                {
+                    "key": key,
+                    "type": config["rclass"].upper(),
+                    "description": config.get("description", ""),
+                    "url": self.base_url + "/" + key,
+                    "packageType": config["packageType"],
+                }
+            )
+        return _Response(200, repositories)
+
+    def _repository_configuration(self, key):
+        repository = self._repository(key)
+        if repository is None:
+            return _error(400, "Bad Request")
+        return _Response(200, repository.config)
+
+    def _create_repository(self, key):
+        if key in self.state.repositories:
+            return _error(400, "Case insensitive repository key already exists")
+        config = {
+            "key": key,
+            "rclass": "local",
+            "packageType": "generic",
+            "description": "",
+            "notes": "",
+            "includesPattern": "**/*",
+            "excludesPattern": "",
+        }
+        config.update(self._json_body())
+        config["key"] = key
+        self.state.repositories[key] = _Repository(config, self.user)
+        return _Response(200, "Successfully created repository '" + key + "' \n")
+
+    def _update_repository(self, key):
+        repository = self._repository(key)
+        if repository is None:
+            return _error(400, "Bad Request")
+        repository.config.update(self._json_body())
+        repository.config["key"] = key
+        return _Response(200, "Repository " + key + " update successful.\n")
+
+    def _delete_repository(self, key):
+        if self.state.repositories.pop(key, None) is None:
+            return _error(404, "Repository " + key + " does not exist")
+        return _Response(
+            200,
+            "Repository '" + key + "' and all its content have been removed "
+            "successfully.\n",
+        )
+
+    def _reindex(self):
+        return _Response(200, "Metadata calculation scheduled.\n")
+
+    # ARTIFACTS AND STORAGE
+
+    def _item_uri(self, repo_key, path):
+        return self.base_url + "/api/storage/" + _join(repo_key, path)
+
+    def _item_info(self, repo_key, path, item):
+        """Build the file info or folder info of an item."""
+        info = OrderedDict(
+            [
+                ("repo", repo_key),
+                ("path", "/" + path),
+                ("created", _iso_time(item.created)),
+                ("createdBy", item.created_by),
+                ("lastModified", _iso_time(item.modified)),
+                ("modifiedBy", item.modified_by),
+                ("lastUpdated", _iso_time(item.modified)),
+            ]
+        )
+        if item.folder:
+            children = self._repository(repo_key).children.get(path, ())
+            info["children"] = [
+                {
+                    "uri": "/" + name,
+                    "folder": self._repository(repo_key)
+                    .items[_join(path, name)]
+                    .folder,
+                }
+                for name in sorted(children)
+            ]
+        else:
+            info["downloadUri"] = self.base_url + "/" + _join(repo_key, path)
+            info["mimeType"] = "application/octet-stream"
+            info["size"] = str(len(item.content))
+            info["checksums"] = dict(item.checksums)
+            info["originalChecksums"] = dict(item.checksums)
+        info["uri"] = self._item_uri(repo_key, path)
+        return info
+
+    def _find_item(self, repo, path):
+        """Return (repository, path, item) or an error response."""
+        repository = self._repository(repo)
+        if repository is None:
+            return None, None, _error(404, "Repository " + repo + " not found")
+        path = (path or "").strip("/")
+        item = repository.items.get(path)
+        if item is None:
+            return repository, path, _error(404, "Unable to find item")
+        return repository, path, item
+
+    def _get_storage(self, repo, path=None):
+        repository, path, item = self._find_item(repo, path)
+        if isinstance(item, _Response):
+            return item
+        if "list" in self.query:
+            return self._file_list(repo, repository, path, item)
+        if "properties" in self.query:
+            names = [name for name in self.query["properties"].split(",") if name]
+            properties = OrderedDict(
+                (name, values)
+                for name, values in item.properties.items()
+                if not names or name in names
+            )
+            if not properties:
+                return _error(404, "No properties could be found.")
+            return _Response(
+                200,
+                {"properties": properties, "uri": self._item_uri(repo, path)},
+            )
+        if "permissions" in self.query:
+            return _Response(
+                200,
+                {
+                    "repo": repo,
+                    "path": "/" + path,
+                    "principals": {
+                        "users": {self.user: ["r", "w", "n", "d", "m"]},
+                        "groups": {"readers": ["r"]},
+                    },
+                },
+            )
+        if "lastModified" in self.query:
+            modified = max(walked.modified for _, walked in repository.walk(path))
+            return _Response(
+                200,
+                {
+                    "uri": self._item_uri(repo, path),
+                    "lastModified": _iso_time(modified),
+                },
+            )
+        if "stats" in self.query:
+            return _Response(
+                200,
+                {
+                    "uri": self._item_uri(repo, path),
+                    "downloadCount": item.downloads,
+                    "lastDownloaded": int(item.last_downloaded * 1000),
+                    "lastDownloadedBy": item.last_downloaded_by,
+                    "remoteDownloadCount": 0,
+                    "remoteLastDownloaded": 0,
+                },
+            )
+        return _Response(
+            200,
+            self._item_info(repo, path, item),
+            headers={"ETag": _etag(item), "Last-Modified": _http_time(item.modified)},
+        )
+
+    def _file_list(self, repo, repository, path, item):
+        if not item.folder:
+            return _error(400, "Expected folder but found file: " + path)
+        deep = self.query.get("deep", "0") == "1"
+        list_folders = self.query.get("listFolders", "0") == "1"
+        md_timestamps = self.query.get("mdTimestamps", "0") == "1"
+        prefix = len(path) + 1 if path else 0
+        files = []
+        for item_path, walked in repository.walk(path):
+            if item_path == path:
+                if self.query.get("includeRootPath", "0") != "1":
+                    continue
+            elif not deep and item_path.rpartition("/")[0] != path:
+                continue
+            if walked.folder and not list_folders:
+                continue
+            entry = OrderedDict(
+                [
+                    ("uri", "/" + item_path[prefix:]),
+                    ("size", -1 if walked.folder else len(walked.content)),
+                    ("lastModified", _iso_time(walked.modified)),
+                    ("folder", walked.folder),
+                ]
+            )
+            if not walked.folder:
+                entry["sha1"] = walked.checksums["sha1"]
+                entry["sha2"] = walked.checksums["sha256"]
+                if md_timestamps:
+                    entry["mdTimestamps"] = {}
+            files.append(entry)
+        files.sort(key=lambda entry: entry["uri"])
+        return _Response(
+            200,
+            {
+                "uri": self._item_uri(repo, path),
+                "created": _iso_time(item.created),
+                "files": files,
+            },
+        )
+
+    def _set_properties(self, repo, path=None):
+        repository, path, item = self._find_item(repo, path)
+        if isinstance(item, _Response):
+            return item
+        if "properties" not in self.query:
+            return _error(400, "Properties are required")
+        properties = _parse_properties(self.query["properties"])
+        recursive = self.query.get("recursive", "1") != "0"
+        items = repository.walk(path) if recursive else [(path, item)]
+        for _, walked in items:
+            walked.properties.update(
+                (name, list(values)) for name, values in properties.items()
+            )
+        return _Response(204)
+
+    def _delete_properties(self, repo, path=None):
+        repository, path, item = self._find_item(repo, path)
+        if isinstance(item, _Response):
+            return item
+        names = [name for name in self.query.get("properties", "").split(",") if name]
+        recursive = self.query.get("recursive", "1") != "0"
+        items = repository.walk(path) if recursive else [(path, item)]
+        for _, walked in items:
+            for name in names:
+                walked.properties.pop(name, None)
+        return _Response(204)
+
+    def _set_sha256_checksum(self):
+        params = self._json_body()
+        _, _, item = self._find_item(params.get("repoKey", ""), params.get("path"))
+        if isinstance(item, _Response):
+            return item
+        if not item.folder:
+            item.properties["sha256"] = [item.checksums["sha256"]]
+        return _Response(200, "")
+
+    def _deploy(self, repo_key, path):
+        repository = self._repository(repo_key)
+        if repository is None:
+            return _error(404, "Repository " + repo_key + " not found")
+        segments = path.split("/")
+        matrix = segments[-1].split(";")
+        segments[-1] = matrix[0]
+        path = "/".join(segments)
+        properties = _parse_properties(";".join(matrix[1:]))
+
+        if path.endswith("/") or path == "":
+            path = path.strip("/")
+            item = repository.items.get(path)
+            if item is None:
+                item = _Item(None, self.user)
+                repository.add(path, item, self.user)
+            elif not item.folder:
+                return _error(409, "A file exists at " + path)
+            item.properties.update(properties)
+            info = self._item_info(repo_key, path, item)
+            return _Response(201, info)
+
+        existing = repository.items.get(path)
+        if existing is not None and existing.folder:
+            return _error(409, "A folder exists at " + path)
+        headers = self.headers
+        if (headers.get("X-Checksum-Deploy") or "").lower() == "true":
+            item = self._find_by_checksum(
+                headers.get("X-Checksum-Sha1"), headers.get("X-Checksum-Sha256")
+            )
+            if item is None:
+                return _error(404, "Checksum deploy failed, no binary found")
+            content, checksums = item.content, dict(item.checksums)
+        else:
+            content, checksums = self.body, self.body_checksums
+        item = _Item(content, self.user, checksums=checksums)
+        for header, algorithm in [
+            ("X-Checksum-Sha1", "sha1"),
+            ("X-Checksum-Sha256", "sha256"),
+            ("X-Checksum", "md5"),
+        ]:
+            expected = headers.get(header)
+            if expected and expected.lower() != item.checksums[algorithm]:
+                return _error(
+                    409,
+                    "Checksum policy : the " + algorithm + " checksum doesn't match",
+                )
+        if existing is not None:
+            item.created = existing.created
+            item.created_by = existing.created_by
+            item.properties = existing.properties
+        item.properties.update(properties)
+        repository.add(path, item, self.user)
+        info = self._item_info(repo_key, path, item)
+        del info["lastModified"], info["modifiedBy"], info["lastUpdated"]
+        return _Response(201, info)
+
+    def _find_by_checksum(self, sha1, sha256):
+        """Return a file with the given SHA-1 or SHA-256 checksum."""
+        for repository in self.state.repositories.values():
+            for item in repository.items.values():
+                if item.folder:
+                    continue
+                if (sha1 and item.checksums["sha1"] == sha1.lower()) or (
+                    sha256 and item.checksums["sha256"] == sha256.lower()
+                ):
+                    return item
+        return None
+
+    def _retrieve(self, repo_key, path):
+        if "trace" in self.query:
+            return _Response(
+                200,
+                "Request ID: " + uuid.uuid4().hex[:8] + "\n"
+                "Repo Path ID: " + repo_key + ":" + path + "\n",
+            )
+        repository, path, item = self._find_item(repo_key, path)
+        if isinstance(item, _Response):
+            return item
+        if item.folder:
+            names = sorted(repository.children.get(path, ()))
+            listing = "".join(
+                '<a href="' + name + '">' + name + "</a>\n" for name in names
+            )
+            return _Response(
+                200,
+                "<html><body><pre>" + listing + "</pre></body></html>",
+                {},
+                "text/html",
+            )
+
+        headers = OrderedDict(
+            [
+                ("ETag", _etag(item)),
+                ("Last-Modified", _http_time(item.modified)),
+                ("X-Checksum-Sha1", item.checksums["sha1"]),
+                ("X-Checksum-Sha256", item.checksums["sha256"]),
+                ("X-Checksum-Md5", item.checksums["md5"]),
+                ("Accept-Ranges", "bytes"),
+            ]
+        )
+        if self.headers.get("If-None-Match") == _etag(item):
+            return _Response(304, headers=headers)
+        since = _parse_http_time(self.headers.get("If-Modified-Since"))
+        if since is not None and int(item.modified) <= since:
+            return _Response(304, headers=headers)
+        if self.command == "GET":
+            item.downloads += 1
+            item.last_downloaded = time.time()
+            item.last_downloaded_by = self.user
+        return _Response(200, item.content, headers, "application/octet-stream")
+
+    def _delete_item(self, repo_key, path):
+        repository, path, item = self._find_item(repo_key, path)
+        if isinstance(item, _Response):
+            return item
+        if path == "":
+            return _error(403, "Deleting the root of a repository isn't allowed")
+        for removed_path, removed in repository.remove(path):
+            self.state.trash[_join(repo_key, removed_path)] = removed
+        return _Response(204)
+
+    def _transfer(self, verb, repo, path=None):
+        repository, path, item = self._find_item(repo, path)
+        if isinstance(item, _Response):
+            return _Response(
+                404,
+                {"messages": [{"level": "ERROR", "message": "Source not found"}]},
+            )
+        target_repo_key, _, target_path = (
+            self.query.get("to", "").strip("/").partition("/")
+        )
+        target_repository = self._repository(target_repo_key)
+        if target_repository is None:
+            return _Response(
+                404,
+                {"messages": [{"level": "ERROR", "message": "Target not found"}]},
+            )
+
+        # Like Artifactory, a folder is put inside an existing target folder
+        target_item = target_repository.items.get(target_path)
+        if item.folder and path and target_item is not None and target_item.folder:
+            target_path = _join(target_path, path.rpartition("/")[2])
+
+        moves = []
+        messages = []
+        prefix = len(path)
+        for item_path, walked in repository.walk(path):
+            destination = (target_path + item_path[prefix:]).strip("/")
+            existing = target_repository.items.get(destination)
+            if existing is not None and existing.folder != walked.folder:
+                messages.append(
+                    {
+                        "level": "ERROR",
+                        "message": "Can't overwrite "
+                        + target_repo_key
+                        + ":"
+                        + destination,
+                    }
+                )
+            moves.append((item_path, destination, walked))
+        if messages:
+            return _Response(409, {"messages": messages})
+
+        files = sum(1 for _, _, walked in moves if not walked.folder)
+        if self.query.get("dry", "0") != "1":
+            for _, destination, walked in moves:
+                existing = target_repository.items.get(destination)
+                if walked.folder and existing is not None:
+                    continue
+                target_repository.add(destination, walked.copy(self.user), self.user)
+            if verb == "move" and path:
+                repository.remove(path)
+            elif verb == "move":
+                for name in list(repository.children[""]):
+                    repository.remove(name)
+        message = (
+            verb
+            + " "
+            + repo
+            + ":"
+            + path
+            + " to "
+            + target_repo_key
+            + ":"
+            + target_path
+            + " completed successfully, "
+            + str(files)
+            + " artifacts and "
+            + str(len(moves) - files)
+            + " folders were "
+            + ("copied" if verb == "copy" else "moved")
+        )
+        return _Response(200, {"messages": [{"level": "INFO", "message": message}]})
+
+    def _archive(self, repo, path=None):
+        repository, path, item = self._find_item(repo, path)
+        if isinstance(item, _Response):
+            return item
+        archive_type = self.query.get("archiveType", "zip")
+        checksums = self.query.get("includeChecksumFiles", "false") == "true"
+        prefix = len(path) + 1 if path else 0
+        files = []
+        for item_path, walked in repository.walk(path):
+            if walked.folder:
+                continue
+            name = item_path[prefix:]
+            files.append((name, walked.content))
+            if checksums:
+                for algorithm in ["md5", "sha1"]:
+                    checksum = walked.checksums[algorithm].encode("ascii")
+                    files.append((name + "." + algorithm, checksum))
+
+        buffer = io.BytesIO()
+        if archive_type == "zip":
+            with zipfile.ZipFile(buffer, "w") as archive:
+                for name, content in files:
+                    archive.writestr(name, content)
+        elif archive_type in ["tar", "tar.gz", "tgz"]:
+            mode = "w" if archive_type == "tar" else "w:gz"
+            with tarfile.open(fileobj=buffer, mode=mode) as archive:
+                for name, content in files:
+                    info = tarfile.TarInfo(name)
+                    info.size = len(content)
+                    archive.addfile(info, io.BytesIO(content))
+        else:
+            return _error(400, "Unsupported archive type " + archive_type)
+        return _Response(200, buffer.getvalue(), {}, "application/octet-stream")
+
+    def _sync_download(self, repo, path):
+        _, path, item = self._find_item(repo, path)
+        if isinstance(item, _Response):
+            return item
+        content = self.query.get("content", "")
+        if content == "none":
+            return _Response(200, "")
+        if content == "progress":
+            size = str(len(item.content or b""))
+            return _Response(
+                200, "Completed: 100% [" + size + " bytes/" + size + " bytes]\n"
+            )
+        return _Response(200, item.content, {}, "application/octet-stream")
+
+    def _empty_trash_can(self):
+        self.state.trash.clear()
+        return _Response(200, "Trash can emptied successfully\n")
+
+    def _clean_trash_can(self, path):
+        path = path.strip("/")
+        keys = [
+            key for key in self.state.trash if key == path or key.startswith(path + "/")
+        ]
+        if not keys:
+            return _error(404, "Item not found in the trash can")
+        for key in keys:
+            del self.state.trash[key]
+        return _Response(200, "")
+
+    def _restore_from_trash_can(self, path):
+        path = path.strip("/")
+        target_repo_key, _, target_path = (
+            self.query.get("to", path).strip("/").partition("/")
+        )
+        target_repository = self._repository(target_repo_key)
+        if target_repository is None:
+            return _error(404, "Repository " + target_repo_key + " not found")
+        keys = [
+            key for key in self.state.trash if key == path or key.startswith(path + "/")
+        ]
+        if not keys:
+            return _error(404, "Item not found in the trash can")
+        for key in keys:
+            item = self.state.trash.pop(key)
+            destination = (target_path + key[len(path) :]).strip("/")
+            if item.folder and destination in target_repository.items:
+                continue
+            target_repository.add(destination, item, self.user)
+        return _Response(200, "Successfully restored trash items\n")
+
+    def _all_builds(self):
+        return _error(404, "No builds were found")
+
+    def _docker_repositories(self, repo):
+        if self._repository(repo) is None:
+            return _error(404, "Repository " + repo + " not found")
+        return _Response(200, {"repositories": []})
+
+    def _docker_tags(self, repo, image):
+        return _error(404, "Tag list not found for image " + image)
+
+    # SEARCHES
+
+    def _artifactory_query_language(self):
+        try:
+            query = _parse_aql(self.body.decode("utf-8"))
+        except ValueError as error:
+            return _error(400, "Failed to parse query : " + str(error))
+        results = []
+        for key, repository in self.state.repositories.items():
+            for item_path, item in repository.items.items():
+                if item_path == "":
+                    continue
+                fields = _aql_fields(key, item_path, item)
+                if _aql_match(query["find"], fields, item):
+                    results.append(fields)
+        for direction, names in reversed(query["sort"]):
+            results.sort(
+                key=lambda fields: tuple(fields.get(name) or "" for name in names),
+                reverse=direction == "$desc",
+            )
+        offset = query["offset"]
+        results = results[offset:]
+        if query["limit"] is not None:
+            results = results[: query["limit"]]
+
+        include = query["include"] or AQL_DEFAULT_FIELDS
+        if "*" in include:
+            include = (
+                [name for name in results[0] if not name.startswith("_")]
+                if (results)
+                else []
+            )
+        output = [
+            OrderedDict((name, fields[name]) for name in include if name in fields)
+            for fields in results
+        ]
+        page = {
+            "start_pos": offset,
+            "end_pos": offset + len(output),
+            "total": len(output),
+        }
+        if query["limit"] is not None:
+            page["limit"] = query["limit"]
+        return _Response(200, OrderedDict([("results", output), ("range", page)]))
+
+    # SECURITY
+
+    def _get_users(self):
+        return _Response(
+            200,
+            [
+                {
+                    "name": name,
+                    "uri": self.base_url + "/api/security/users/" + name,
+                    "realm": "internal",
+                }
+                for name in self.state.users
+            ],
+        )
+
+    def _user_details(self, user):
+        details = OrderedDict(
+            (key, value) for key, value in user.items() if key != "password"
+        )
+        details.setdefault("admin", False)
+        details.setdefault("groups", [])
+        details["realm"] = "internal"
+        details["profileUpdatable"] = True
+        return details
+
+    def _get_user(self, name):
+        user = self.state.users.get(name)
+        if user is None:
+            return _error(404, "User " + name + " does not exist")
+        return _Response(200, self._user_details(user))
+
+    def _create_user(self, name):
+        user = self._json_body()
+        user["name"] = name
+        self.state.users[name] = user
+        return _Response(201, "")
+
+    def _update_user(self, name):
+        user = self.state.users.get(name)
+        if user is None:
+            return _error(404, "User " + name + " does not exist")
+        user.update(self._json_body())
+        user["name"] = name
+        return _Response(200, "")
+
+    def _delete_user(self, name):
+        if self.state.users.pop(name, None) is None:
+            return _error(404, "User " + name + " does not exist")
+        self.state.api_keys.pop(name, None)
+        return _Response(
+            200, "The user: '" + name + "' has been removed successfully.\n"
+        )
+
+    def _encrypted_password(self):
+        password = self.state.users[self.user].get("password") or ""
+        digest = hashlib.sha256(password.encode("utf-8")).hexdigest()
+        return _Response(200, "AP" + digest[:40])
+
+    def _locked_users(self):
+        return _Response(200, [])
+
+    def _unlock_users(self):
+        return _Response(200, "")
+
+    def _get_api_key(self):
+        api_key = self.state.api_keys.get(self.user)
+        return _Response(200, {"apiKey": api_key} if api_key else {})
+
+    def _create_api_key(self):
+        if self.user in self.state.api_keys:
+            return _error(400, "Api key already exists for user: " + self.user)
+        self.state.api_keys[self.user] = "AKC" + uuid.uuid4().hex + uuid.uuid4().hex
+        return _Response(201, {"apiKey": self.state.api_keys[self.user]})
+
+    def _regenerate_api_key(self):
+        self.state.api_keys[self.user] = "AKC" + uuid.uuid4().hex + uuid.uuid4().hex
+        return _Response(200, {"apiKey": self.state.api_keys[self.user]})
+
+    def _revoke_api_key(self, name=None):
+        self.state.api_keys.pop(name or self.user, None)
+        return _Response(200, {"info": "Api key removed"})
+
+    def _principals(self, kind):
+        return self.state.groups if kind == "groups" else self.state.permissions
+
+    def _get_principals(self, kind):
+        return _Response(
+            200,
+            [
+                {
+                    "name": name,
+                    "uri": self.base_url + "/api/security/" + kind + "/" + name,
+                }
+                for name in self._principals(kind)
+            ],
+        )
+
+    def _get_principal(self, kind, name):
+        principal = self._principals(kind).get(name)
+        if principal is None:
+            return _error(404, kind[:-1].capitalize() + " " + name + " not found")
+        return _Response(200, principal)
+
+    def _create_principal(self, kind, name):
+        principal = self._json_body()
+        principal["name"] = name
+        self._principals(kind)[name] = principal
+        return _Response(201, "")
+
+    def _update_principal(self, kind, name):
+        principal = self._principals(kind).get(name)
+        if principal is None:
+            return _error(404, kind[:-1].capitalize() + " " + name + " not found")
+        principal.update(self._json_body())
+        principal["name"] = name
+        return _Response(200, "")
+
+    def _delete_principal(self, kind, name):
+        if self._principals(kind).pop(name, None) is None:
+            return _error(404, kind[:-1].capitalize() + " " + name + " not found")
+        return _Response(200, "'" + name + "' has been removed successfully.\n")
+
+
+def _join(path, name):
+    """Join two parts of a path, any of them can be empty."""
+    return (path + "/" + name).strip("/")
+
+
+def _iso_time(timestamp):
+    """Format a timestamp like Artifactory (2020-07-06T12:00:00.000Z)."""
+    return time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(timestamp)) + ".%03dZ" % (
+        int(timestamp * 1000) % 1000
+    )
+
+
+def _http_time(timestamp):
+    """Format a timestamp for the Last-Modified header."""
+    return formatdate(timestamp, usegmt=True)
+
+
+def _parse_http_time(value):
+    """Parse an HTTP date to a timestamp (None if invalid)."""
+    parsed = parsedate_tz(value) if value else None
+    return mktime_tz(parsed) if parsed else None
+
+
+def _etag(item):
+    """Return the ETag of an item."""
+    return item.checksums.get("sha1") or "%x" % int(item.modified * 1000)
+
+
+def _parse_query(query):
+    """
+    Parse a query string, the values can hold ";" (properties).
+
+    Returns
+    -------
+    parameters: dict
+        {name: last value}, the value of a parameter without "=" is ""
+
+    """
+    parameters = {}
+    for parameter in query.split("&"):
+        if parameter:
+            name, _, value = parameter.partition("=")
+            parameters[unquote(name)] = unquote(value)
+    return parameters
+
+
+def _split_unescaped(text, separator):
+    """Split a string on a separator not escaped with a backslash."""
+    parts = [""]
+    escaped = False
+    for character in text:
+        if escaped:
+            parts[-1] += character
+            escaped = False
+        elif character == "\\":
+            escaped = True
+        elif character == separator:
+            parts.append("")
+        else:
+            parts[-1] += character
+    return parts
+
+
+def _parse_properties(text):
+    """Parse a "name=value1,value2;name2=value" string of properties."""
+    properties = OrderedDict()
+    for part in _split_unescaped_keeping_escapes(text, ";"):
+        if not part:
+            continue
+        name, _, values = part.partition("=")
+        name = _split_unescaped(name, "=")[0]
+        properties[name] = _split_unescaped(values, ",")
+    return properties
+
+
+def _split_unescaped_keeping_escapes(text, separator):
+    """Split a string on a separator not escaped, the escapes are kept."""
+    parts = [""]
+    escaped = False
+    for character in text:
+        if escaped:
+            parts[-1] += character
+            escaped = False
+        elif character == "\\":
+            parts[-1] += character
+            escaped = True
+        elif character == separator:
+            parts.append("")
+        else:
+            parts[-1] += character
+    return parts
+
+
+def _balanced_argument(query, start):
+    """Return the argument of a call starting at query[start] == "(" and its end."""
+    depth = 0
+    in_string = False
+    index = start
+    while index < len(query):
+        character = query[index]
+        if in_string:
+            if character == "\\":
+                index += 1
+            elif character == '"':
+                in_string = False
+        elif character == '"':
+            in_string = True
+        elif character == "(":
+            depth += 1
+        elif character == ")":
+            depth -= 1
+            if depth == 0:
+                return query[start + 1 : index], index + 1
+        index += 1
+    raise ValueError("unbalanced parentheses")
+
+
+def _parse_aql(text):
+    """
+    Parse an items.find() AQL query.
+
+    Returns
+    -------
+    query: dict
+        {"find": dict, "include": list, "sort": [(direction, fields)],
+        "offset": int, "limit": int or None}
+
+    """
+    text = text.strip()
+    if not text.startswith("items.find("):
+        raise ValueError("only items.find() queries are supported")
+    query = {"find": {}, "include": [], "sort": [], "offset": 0, "limit": None}
+    position = len("items")
+    while position < len(text):
+        match = re.compile(r"\s*\.\s*(\w+)\s*").match(text, position)
+        if match is None:
+            raise ValueError("unexpected text " + text[position:])
+        name = match.group(1)
+        argument, position = _balanced_argument(text, match.end())
+        argument = argument.strip()
+        if name == "find":
+            query["find"] = json.loads(argument or "{}")
+        elif name == "include":
+            query["include"] = json.loads("[" + argument + "]")
+        elif name == "sort":
+            query["sort"] = list(json.loads(argument).items())
+        elif name == "offset":
+            query["offset"] = int(argument)
+        elif name == "limit":
+            query["limit"] = int(argument)
+        else:
+            raise ValueError("unsupported clause " + name)
+    return query
+
+
+def _aql_fields(repo_key, path, item):
+    """Return the AQL fields of an item."""
+    parent, _, name = path.rpartition("/")
+    fields = OrderedDict(
+        [
+            ("repo", repo_key),
+            ("path", parent or "."),
+            ("name", name),
+            ("type", "folder" if item.folder else "file"),
+            ("size", 0 if item.folder else len(item.content)),
+            ("created", _iso_time(item.created)),
+            ("created_by", item.created_by),
+            ("modified", _iso_time(item.modified)),
+            ("modified_by", item.modified_by),
+            ("updated", _iso_time(item.modified)),
+            ("depth", path.count("/") + 1),
+        ]
+    )
+    if not item.folder:
+        fields["actual_sha1"] = item.checksums["sha1"]
+        fields["original_sha1"] = item.checksums["sha1"]
+        fields["actual_md5"] = item.checksums["md5"]
+        fields["original_md5"] = item.checksums["md5"]
+        fields["sha256"] = item.checksums["sha256"]
+    fields["property"] = [
+        {"key": key, "value": value}
+        for key, values in item.properties.items()
+        for value in values
+    ]
+    fields["_timestamps"] = {
+        "created": item.created,
+        "modified": item.modified,
+        "updated": item.modified,
+    }
+    return fields
+
+
+def _aql_match(criteria, fields, item, top_level=True):
+    """Return True if the fields of an item match AQL criteria."""
+    if top_level and not _aql_has_type(criteria) and fields["type"] != "file":
+        # Only the files are returned by default
+        return False
+    for key, condition in criteria.items():
+        if key == "$and":
+            if not all(_aql_match(part, fields, item, False) for part in condition):
+                return False
+        elif key == "$or":
+            if not any(_aql_match(part, fields, item, False) for part in condition):
+                return False
+        elif key.startswith("@"):
+            values = item.properties.get(key[1:], [])
+            if not any(_aql_compare(value, condition, None) for value in values):
+                return False
+        elif key == "type" and condition == "any":
+            continue
+        elif not _aql_compare(
+            fields.get(key), condition, fields["_timestamps"].get(key)
+        ):
+            return False
+    return True
+
+
+def _aql_has_type(criteria):
+    """Return True if AQL criteria have a condition on the type."""
+    for key, condition in criteria.items():
+        if key == "type":
+            return True
+        if key in ["$and", "$or"] and any(_aql_has_type(part) for part in condition):
+            return True
+    return False
+
+
+def _aql_compare(value, condition, timestamp):
+    """Return True if a value satisfies an AQL condition ({"$op": operand})."""
+    if not isinstance(condition, dict):
+        condition = {"$eq": condition}
+    for operator, operand in condition.items():
+        if operator in ["$before", "$last"]:
+            if timestamp is None:
+                return False
+            limit = time.time() - _aql_relative_time(operand)
+            matched = timestamp < limit if operator == "$before" else timestamp >= limit
+        elif value is None:
+            matched = operator in ["$ne", "$nmatch"]
+        elif operator == "$eq":
+            matched = value == operand
+        elif operator == "$ne":
+            matched = value != operand
+        elif operator == "$match":
+            matched = fnmatch.fnmatchcase(str(value), operand)
+        elif operator == "$nmatch":
+            matched = not fnmatch.fnmatchcase(str(value), operand)
+        elif operator == "$gt":
+            matched = value > operand
+        elif operator == "$gte":
+            matched = value >= operand
+        elif operator == "$lt":
+            matched = value < operand
+        elif operator == "$lte":
+            matched = value <= operand
+        else:
+            raise ValueError("unsupported operator " + operator)
+        if not matched:
+            return False
+    return True
+
+
+def _aql_relative_time(text):
+    """Convert a relative time ("30d", "2w"...) to seconds."""
+    match = re.match(r"^\s*(\d+(?:\.\d+)?)\s*([a-z]+)\s*$", str(text))
+    if match is None or match.group(2) not in AQL_TIME_UNITS:
+        raise ValueError("invalid relative time " + str(text))
+    return float(match.group(1)) * AQL_TIME_UNITS[match.group(2)]
+
+
+def main(arguments=None):
+    """Run a StandInServer from the command line."""
+    parser = argparse.ArgumentParser(
+        description="In-process stand-in of the Artifactory REST API."
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="password")
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="delay per request in seconds"
+    )
+    parser.add_argument(
+        "--bandwidth", type=float, default=None, help="bytes per second"
+    )
+    arguments = parser.parse_args(arguments)
+    server = StandInServer(
+        arguments.host,
+        arguments.port,
+        arguments.username,
+        arguments.password,
+        arguments.latency,
+        arguments.bandwidth,
+    )
+    server.start()
+    print("AF_TEST_URL=" + server.url)
+    print("AF_TEST_USERNAME=" + server.username)
+    print("AF_TEST_PASSWORD=" + server.password)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+# coding: utf-8
+
+# Copyright (C) 2018 Orange
+#
+# This software is distributed under the terms and conditions of the 'Apache-2.0'
+# license which can be found in the 'LICENSE.md' file
+# or at 'http://www.apache.org/licenses/LICENSE-2.0'.
+
+"""Throttle class definition, client-side rate limiter and concurrency governor."""
+
+from __future__ import unicode_literals
+import fnmatch
+import threading
+import time
+
+# Monotonic clock when available (Python 3)
+_clock = getattr(time, "monotonic", time.time)
+
+
+class Throttle(object):
+    """
+    Token bucket rate limiter and maximum of requests in flight.
+
+    Given as the "throttle" setting of a rtpy.Rtpy object, it is shared by all
+    the categories and all the threads (and by several rtpy.Rtpy objects
+    given the same Throttle). Each HTTP request waits for a token of the bucket
+    and for a free slot before being sent, the slot is released when the
+    response is received (before reading a streamed content).
+    The retries of a request are throttled too, cached responses are not.
+
+    Parameters
+    ----------
+    rate: float, optional
+        Requests per second, unlimited by default
+    burst: int, optional
+        Capacity of the token bucket, requests sent at once after an idle
+        period, rate (at least 1) by default
+    max_in_flight: int, optional
+        Maximum number of requests in flight, unlimited by default
+    limits: dict, optional
+        {pattern: {"rate": ..., "burst": ..., "max_in_flight": ...}} stricter
+        limits for the API methods matching fnmatch patterns (the method names
+        of the error messages, "[SEARCHES] : Artifactory Query Language"...),
+        the longest matching pattern wins, the global limits still apply
+
+    Attributes
+    ----------
+    waited: float
+        Total time spent waiting for a token in seconds
+
+    Examples
+    --------
+    >>> throttle = rtpy.Throttle(
+    ...     rate=20,
+    ...     max_in_flight=8,
+    ...     limits={
+    ...         "*Artifactory Query Language": {"rate": 1, "max_in_flight": 2},
+    ...         "*: Calculate *": {"max_in_flight": 1},
+    ...     },
+    ... )
+    >>> af = rtpy.Rtpy(dict(settings, throttle=throttle))
+
+    """
+
+    def __init__(self, rate=None, burst=None, max_in_flight=None, limits=None):
+        """Object instantiation."""
+        self._lock = threading.Lock()
+        self._global_limit = _Limit(self, rate, burst, max_in_flight)
+        self._limits = sorted(
+            (
+                (pattern, _Limit(self, **limit))
+                for pattern, limit in (limits or {}).items()
+            ),
+            key=lambda item: len(item[0]),
+            reverse=True,
+        )
+        self.waited = 0.0
+
+    def limits_for(self, api_method):
+        """
+        Return the limits applying to an API method.
+
+        Parameters
+        ----------
+        api_method: str
+            Name of the API method (category and name)
+
+        Returns
+        -------
+        limits: list
+            The limits of the longest matching pattern if any, then the global
+            limits (the slots are always acquired in this order)
+
+        """
+        for pattern, limit in self._limits:
+            if fnmatch.fnmatchcase(api_method, pattern):
+                return [limit, self._global_limit]
+        return [self._global_limit]
+
+    def acquire(self, api_method):
+        """
+        Wait for a free slot and a token for a request.
+
+        Parameters
+        ----------
+        api_method: str
+            Name of the API method (category and name)
+
+        Returns
+        -------
+        acquired: list
+            Limits holding a slot, to give to the release method
+
+        """
+        limits = self.limits_for(api_method)
+        acquired = []
+        try:
+            for limit in limits:
+                if limit.slots is not None:
+                    limit.slots.acquire()
+                    acquired.append(limit)
+            for limit in limits:
+                delay = limit.reserve()
+                if delay > 0:
+                    time.sleep(delay)
+        except BaseException:
+            self.release(acquired)
+            raise
+        return acquired
+
+    def release(self, acquired):
+        """Release the slots given by the acquire method."""
+        for limit in reversed(acquired):
+            limit.slots.release()
+
+
+class _Limit(object):
+    """Token bucket and semaphore of a Throttle."""
+
+    def __init__(self, throttle, rate=None, burst=None, max_in_flight=None):
+        """Object instantiation."""
+        if rate is not None and rate <= 0:
+            raise ValueError("rate must be a positive number!")
+        if max_in_flight is not None and max_in_flight < 1:
+            raise ValueError("max_in_flight must be a positive integer!")
+        self._throttle = throttle
+        self.rate = rate
+        self.capacity = burst or max(rate or 1, 1)
+        self.slots = None
+        if max_in_flight is not None:
+            self.slots = threading.BoundedSemaphore(max_in_flight)
+        self._tokens = self.capacity
+        self._last = _clock()
+
+    def reserve(self):
+        """
+        Take a token from the bucket.
+
+        The bucket can go in debt, the callers are served in the order
+        of their reservations.
+
+        Returns
+        -------
+        delay: float
+            Time to wait before sending the request in seconds
+
+        """
+        if self.rate is None:
+            return 0.0
+        with self._throttle._lock:
+            now = _clock()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._last) * self.rate
+            )
+            self._last = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            delay = -self._tokens / self.rate
+            self._throttle.waited += delay
+            return delay
@@ -10,12 +10,61 @@
 
 from __future__ import unicode_literals
 import json
+import os
+import random
 import sys
-from copy import deepcopy
+import tempfile
+import time
+from email.utils import mktime_tz, parsedate_tz
 
 import requests
+from requests.adapters import DEFAULT_POOLSIZE, HTTPAdapter
+from requests.auth import _basic_auth_str
 from requests.exceptions import HTTPError
 
+from .artifact_cache import ArtifactCache, _replace_file
+from .cache import ResponseCache
+from .checksums import (
+    DEFAULT_CHUNK_SIZE,
+    MultiHash,
+    _byte_size,
+    _is_path,
+    iter_chunks,
+)
+from .metrics import Metrics
+from .streaming import is_json_response, stream_json_items
+from .throttle import Throttle
+from .tracing import Tracer, instrument_session, url_template
+
+# Verbs invalidating the cached responses of the resource they act on
+MUTATING_VERBS = ["PUT", "POST", "PATCH", "DELETE"]
+
+# Default retry policy, the "retry" setting can override each key
+DEFAULT_RETRY = {
+    "max_attempts": 4,
+    "backoff_base": 0.5,
+    "backoff_cap": 30.0,
+    "jitter": True,
+    "retry_after": True,
+    "status_codes": [429, 502, 503, 504],
+    "verbs": ["GET", "HEAD", "OPTIONS", "PUT", "DELETE"],
+}
+
+# Monotonic clock when available (Python 3)
+_clock = getattr(time, "monotonic", time.time)
+
+# Headers that can be supplied in the params dict of the API methods
+SUPPORTED_HEADERS = frozenset(
+    [
+        "Content-Type",
+        "X-Checksum-Deploy",
+        "X-Checksum-Sha1",
+        "X-Checksum-Sha256",
+        "X-Result-detail",
+        "X-GPG-PASSPHRASE",
+    ]
+)
+
 
 class RtpyBase(object):
     """
@@ -29,6 +78,8 @@ class RtpyBase(object):
         Major API method category (Searches, Repositories...)
     _user_settings: dict
         Complete user settings, default values are changed at class instantiation
+    _config: rtpy.tools.ClientConfig
+        Configuration of the API calls precompiled from the user settings
 
     """
 
@@ -60,10 +111,22 @@ class RtpyBase(object):
             "auth": (),
             "X-JFrog-Art-Api": None,
             "api_endpoint": None,
-            "session": requests.Session(),
+            "session": None,
+            "pool_connections": DEFAULT_POOLSIZE,
+            "pool_maxsize": DEFAULT_POOLSIZE,
+            "pool_block": False,
+            "keep_alive": True,
+            "stream_json": False,
+            "cache": None,
+            "artifact_cache": None,
+            "retry": None,
+            "throttle": None,
+            "metrics": None,
+            "tracer": None,
         }
         self._configure_user_settings(provided_settings)
         self._validate_user_settings()
+        self._config = ClientConfig(self._user_settings)
 
     def _check_provided_keys_in_settings(self, provided_settings):
         """
@@ -93,6 +156,17 @@ class RtpyBase(object):
             "raw_response",
             "verbose_level",
             "session",
+            "pool_connections",
+            "pool_maxsize",
+            "pool_block",
+            "keep_alive",
+            "stream_json",
+            "cache",
+            "artifact_cache",
+            "retry",
+            "throttle",
+            "metrics",
+            "tracer",
         ]
 
         message = ""
@@ -127,22 +201,56 @@ class RtpyBase(object):
 
         """
         self._check_provided_keys_in_settings(provided_settings)
-        self._original_user_settings = deepcopy(self._user_settings)
         for setting in provided_settings:
             self._user_settings[setting] = provided_settings[setting]
 
-    def _restore_user_settings(self):
-        """Restore original user settings."""
-        self._user_settings = self._original_user_settings
+    def _request_settings(self, kwargs):
+        """
+        Return the configuration of an API call, overridden by the settings kwarg.
+
+        The _user_settings attribute is never modified by an API call,
+        overridden settings are compiled into a new ClientConfig (sharing
+        the session and the other objects) so a Rtpy object can be used
+        by several threads at once.
+
+        Parameters
+        ----------
+        kwargs: dict
+            Keyword arguments (supplied by the method)
 
-    def _validate_user_settings(self):
+        Raises
+        ------
+        UserSettingsError
+            If the overridden settings are invalid
+
+        Returns
+        -------
+        config: rtpy.tools.ClientConfig
+            Configuration of the API call, not to be modified
+
+        """
+        settings = self._settings_if_settings_in_kwargs(kwargs)
+        if not settings:
+            return self._config
+        self._check_provided_keys_in_settings(settings)
+        user_settings = dict(self._user_settings)
+        user_settings.update(settings)
+        self._validate_user_settings(user_settings)
+        return ClientConfig(user_settings)
+
+    def _validate_user_settings(self, user_settings=None):
         """
-        Verify if the _user_settings attribute dict is valid.
+        Verify if the user settings dict is valid and set the derived settings.
+
+        Parameters
+        ----------
+        user_settings: dict, optional
+            Settings to validate, the _user_settings attribute by default
 
         Raises
         ------
         UserSettingsError
-            If the _user_settings dict is invalid
+            If the user settings dict is invalid
 
         Returns
         -------
@@ -150,13 +258,13 @@ class RtpyBase(object):
             Nothing
 
         """
+        client_settings = user_settings is None
+        if client_settings:
+            user_settings = self._user_settings
         if (
-            not self._user_settings["af_url"]
-            or not self._user_settings["api_key"]
-            and (
-                not self._user_settings["username"]
-                or not self._user_settings["password"]
-            )
+            not user_settings["af_url"]
+            or not user_settings["api_key"]
+            and (not user_settings["username"] or not user_settings["password"])
         ):
 
             message = (
@@ -165,8 +273,8 @@ class RtpyBase(object):
             )
             raise UserSettingsError(message)
 
-        if self._user_settings["api_key"] and (
-            self._user_settings["username"] or self._user_settings["password"]
+        if user_settings["api_key"] and (
+            user_settings["username"] or user_settings["password"]
         ):
             message = (
                 "An api_key and user name and password"
@@ -174,29 +282,67 @@ class RtpyBase(object):
             )
             raise UserSettingsError(message)
 
-        self._user_settings["auth"] = None
-        if self._user_settings["username"] and self._user_settings["password"]:
-            self._user_settings["auth"] = (
-                self._user_settings["username"],
-                self._user_settings["password"],
+        user_settings["auth"] = None
+        if user_settings["username"] and user_settings["password"]:
+            user_settings["auth"] = (
+                user_settings["username"],
+                user_settings["password"],
             )
 
-        self._user_settings["X-JFrog-Art-Api"] = self._user_settings["api_key"]
-        self._user_settings["api_endpoint"] = self._user_settings["af_url"] + "/api/"
+        user_settings["X-JFrog-Art-Api"] = user_settings["api_key"]
+        user_settings["api_endpoint"] = user_settings["af_url"] + "/api/"
 
         allowed_raw_response = [False, True]
         allowed_verbose_level = [0, 1]
 
-        if self._user_settings["raw_response"] not in allowed_raw_response:
+        if user_settings["raw_response"] not in allowed_raw_response:
             raise UserSettingsError(
                 "raw_response must be " + str(allowed_raw_response) + "!"
             )
 
-        if self._user_settings["verbose_level"] not in allowed_verbose_level:
+        if user_settings["verbose_level"] not in allowed_verbose_level:
             raise UserSettingsError(
                 "verbose_level must be " + str(allowed_verbose_level) + "!"
             )
 
+        stream_json = user_settings["stream_json"]
+        if not isinstance(stream_json, bool) and not _is_path(stream_json):
+            raise UserSettingsError(
+                "stream_json must be False, True or the name of a JSON member!"
+            )
+        if stream_json is True and client_settings:
+            raise UserSettingsError(
+                "stream_json can only be True for a call, "
+                + "the name of a JSON member must be given for the client!"
+            )
+
+        cache = user_settings["cache"]
+        if cache is not None and not isinstance(cache, ResponseCache):
+            raise UserSettingsError("cache must be None or a rtpy.ResponseCache!")
+
+        artifact_cache = user_settings["artifact_cache"]
+        if artifact_cache is not None and not isinstance(artifact_cache, ArtifactCache):
+            raise UserSettingsError(
+                "artifact_cache must be None or a rtpy.ArtifactCache!"
+            )
+
+        retry_policy(user_settings["retry"])
+
+        throttle = user_settings["throttle"]
+        if throttle is not None and not isinstance(throttle, Throttle):
+            raise UserSettingsError("throttle must be None or a rtpy.Throttle!")
+
+        metrics = user_settings["metrics"]
+        if metrics is not None and not isinstance(metrics, Metrics):
+            raise UserSettingsError("metrics must be None or a rtpy.Metrics!")
+
+        tracer = user_settings["tracer"]
+        if tracer is not None and not isinstance(tracer, Tracer):
+            raise UserSettingsError("tracer must be None or a rtpy.Tracer!")
+
+        if user_settings["session"] is None:
+            user_settings["session"] = create_session(user_settings)
+
     def _request(
         self,
         verb,
@@ -207,6 +353,7 @@ class RtpyBase(object):
         no_api=False,
         data=None,
         params=None,
+        stream=False,
     ):
         """
         Call the remote API, process the response and return it.
@@ -233,6 +380,10 @@ class RtpyBase(object):
             Python requests data keyword argument
         params
             Python requests json keyword argument
+        stream: bool
+            True to not load the response content before returning
+            (used with byte_output)
+            False by default
 
         Returns
         -------
@@ -241,46 +392,190 @@ class RtpyBase(object):
                 given by _convert_response method
 
         """
-        # Checking if the settings kwarg was supplied
-        settings = self._settings_if_settings_in_kwargs(kwargs)
-        if settings:
-            self._configure_user_settings(settings)
-            self._validate_user_settings()
+        config = self._request_settings(kwargs)
+        stream_json = config.stream_json
+        request_url, headers, params = self._prepare_request(
+            verb, target, api_method, no_api, params, config
+        )
+
+        throttle = config.throttle
+        metrics = config.metrics
+        tracer = config.tracer
+        streamed = stream or bool(stream_json)
+        attempts = [0]
+        # Start, headers received and end of the last attempt (traced calls)
+        last_attempt = [None, None, None]
+        hooks = {}
+
+        def headers_received(response, **kwargs):
+            last_attempt[1] = _clock()
+
+        if tracer is not None:
+            hooks["hooks"] = {"response": headers_received}
+
+        def send_once(headers):
+            attempts[0] += 1
+            acquired = throttle.acquire(api_method) if throttle is not None else []
+            try:
+                last_attempt[:] = [_clock(), None, None]
+                return config.session.request(
+                    verb,
+                    request_url,
+                    headers=headers,
+                    json=params,
+                    data=data,
+                    auth=config.auth,
+                    stream=streamed,
+                    **hooks
+                )
+            finally:
+                last_attempt[2] = _clock()
+                if acquired:
+                    throttle.release(acquired)
+
+        def send(headers):
+            attempts[0] = 0
+            start = _clock()
+            span = None
+            if tracer is not None:
+                span = tracer.start_request(
+                    api_method, verb, request_url, url_template(target, no_api)
+                )
+            response = None
+            try:
+                response = _send_with_retries(
+                    lambda: send_once(headers),
+                    config.retry,
+                    verb,
+                    data,
+                    config.verbose_level,
+                )
+                return response
+            except Exception as error:
+                if span is not None:
+                    span.record_exception(error)
+                raise
+            finally:
+                duration = _clock() - start
+                if metrics is not None or span is not None:
+                    status = response.status_code if response is not None else None
+                    request_bytes = _request_size(data, params)
+                    response_bytes = _response_size(response, verb, streamed)
+                    retries = max(attempts[0] - 1, 0)
+                if metrics is not None:
+                    metrics.record(
+                        api_method,
+                        verb,
+                        status,
+                        duration,
+                        request_bytes,
+                        response_bytes,
+                        retries,
+                    )
+                if span is not None:
+                    tracer.end_request(
+                        span,
+                        status,
+                        request_bytes,
+                        response_bytes,
+                        retries,
+                        _attempt_phases(last_attempt, streamed),
+                    )
+
+        # Streamed responses are never cached, their content is not loaded
+        cache = config.cache
+        cacheable = (
+            cache is not None and verb == "GET" and not stream and not stream_json
+        )
+        response = None
+        if cacheable:
+            cache_path = config.relative_path(request_url)
+            identity = config.identity
+            response = cache.get(cache_path, identity)
+
+        if response is None and not cacheable:
+            response = send(headers)
+            if cache is not None and verb in MUTATING_VERBS:
+                cache.invalidate(config.relative_path(request_url))
+        elif response is None:
+            conditional_headers = cache.conditional_headers(cache_path, identity)
+            response = send(dict(headers, **conditional_headers))
+            if response.status_code == 304:
+                cached_response = cache.refresh(cache_path, identity, response)
+                if cached_response is None:
+                    # Evicted in the meantime, requested again without conditions
+                    response = send(headers)
+                    cache.put(cache_path, identity, response)
+                else:
+                    response = cached_response
+            else:
+                cache.put(cache_path, identity, response)
 
-        headers = {}
+        if config.verbose_level >= 1:
+            message = "\nStatus Code : " + str(response.status_code) + "\n"
+            sys.stdout.write(message)
+
+        return self._convert_response(
+            api_method,
+            request_url,
+            verb,
+            response,
+            config.raw_response,
+            byte_output,
+            stream_json,
+        )
+
+    def _prepare_request(self, verb, target, api_method, no_api, params, config):
+        """
+        Build the URL and the headers of an API call from the user settings.
+
+        Parameters
+        ----------
+        verb: str
+            HTTP verb ("GET", "POST"...)
+        target: str
+            API sub endpoint specific for the method
+        api_method: str
+            Name of the specific method (category and name)
+        no_api: bool
+            True to remove 'api/' from the target endpoint
+        params
+            Python requests json keyword argument, the supported headers
+            are extracted from it
+        config: rtpy.tools.ClientConfig
+            Configuration of the API call (given by _request_settings)
 
-        if self._user_settings["X-JFrog-Art-Api"]:
-            headers = {"X-JFrog-Art-Api": self._user_settings["X-JFrog-Art-Api"]}
+        Returns
+        -------
+        request_url: str
+            Full URL of the API call
+        headers: dict
+            Headers of the API call
+        params: dict or None
+            Python requests json keyword argument without the headers
 
-        auth = self._user_settings["auth"]
-        raw_response = self._user_settings["raw_response"]
+        """
+        # Copy of the precompiled authentication headers
+        headers = dict(config.headers)
 
         # Changing the endpoint when necessary
-        if not no_api:
-            request_url = self._user_settings["api_endpoint"] + target
         if no_api:
-            request_url = self._user_settings["af_url"] + target
-
-        possible_headers = [
-            "Content-Type",
-            "X-Checksum-Deploy",
-            "X-Checksum-Sha1",
-            "X-Checksum-Sha256",
-            "X-Result-detail",
-            "X-GPG-PASSPHRASE",
-        ]
+            request_url = config.af_url + target
+        else:
+            request_url = config.api_endpoint + target
+
         # Extracting the headers from the params dict
         if params:
-
-            headers_to_add = [field for field in params if field in possible_headers]
+            headers_to_add = [field for field in params if field in SUPPORTED_HEADERS]
 
             for header in headers_to_add:
                 headers[header] = str(params[header])
                 del params[header]
-        else:
+        # No JSON body when params only held headers (an empty upload is falsy)
+        if not params:
             params = None
 
-        if self._user_settings["verbose_level"] >= 1:
+        if config.verbose_level >= 1:
             message = (
                 "\n\nPerforming Artifactory REST API operation : "
                 + api_method
@@ -291,23 +586,83 @@ class RtpyBase(object):
             )
             sys.stdout.write(message)
 
-        response = self._user_settings["session"].request(
-            verb, request_url, headers=headers, json=params, data=data, auth=auth
-        )
+        return request_url, headers, params
 
-        if self._user_settings["verbose_level"] >= 1:
-            message = "\nStatus Code : " + str(response.status_code) + "\n"
-            sys.stdout.write(message)
+    def _download(
+        self,
+        target,
+        api_method,
+        kwargs,
+        destination,
+        chunk_size,
+        no_api=False,
+        checksums=None,
+    ):
+        """
+        Stream the content of a GET API call to a file.
+
+        Parameters
+        ----------
+        target: str
+            API sub endpoint specific for the method
+        api_method: str
+            Name of the specific method (category and name)
+        kwargs: dict
+            Dictionary of keyword arguments (supplied by the method)
+        destination: str or file object
+            Local path or file object opened in binary mode
+        chunk_size: int
+            Size of the chunks read from the network
+        no_api: bool
+            True to remove 'api/' from the target endpoint
+        checksums: dict, optional
+            Expected {"sha1": str, "sha256": str} checksums (both optional)
 
-        if settings:
-            self._restore_user_settings()
+        Returns
+        -------
+        checksums: dict or requests.Response
+            The checksums of the content given by DownloadWriter.close,
+            the requests.Response (content loaded, connection released)
+            if raw_response is True and an error occurred
 
-        return self._convert_response(
-            api_method, request_url, verb, response, raw_response, byte_output
+        """
+        response = self._request(
+            "GET",
+            target,
+            api_method,
+            kwargs,
+            byte_output=True,
+            no_api=no_api,
+            stream=True,
         )
+        if response.status_code >= 400:
+            # Load the error body so the pooled connection is released
+            try:
+                response.content
+            finally:
+                response.close()
+            return response
+
+        writer = DownloadWriter(destination)
+        try:
+            for chunk in response.iter_content(chunk_size):
+                writer.write(chunk)
+            return writer.close(response.headers, checksums)
+        except BaseException:
+            writer.abort()
+            raise
+        finally:
+            response.close()
 
     def _convert_response(
-        self, api_method, target, verb, response, raw_response, byte_output
+        self,
+        api_method,
+        target,
+        verb,
+        response,
+        raw_response,
+        byte_output,
+        stream_json=False,
     ):
         """
         Convert (if necessary) a requests.Response() object raise an error.
@@ -333,6 +688,10 @@ class RtpyBase(object):
             True to return the original requests.Response
         byte_output: bool
             True to return the original requests.Response if no errors are found
+        stream_json: bool or str, optional
+            True for a top-level JSON list or the name of a member of the JSON
+            object to return an iterator over the items of that list instead of
+            the whole document (the response must be streamed), False by default
 
         Raises
         ------
@@ -341,7 +700,7 @@ class RtpyBase(object):
 
         Returns
         -------
-        response: requests.Response or str or dict
+        response: requests.Response or str or dict or iterator
             The returned response to the client
 
         """
@@ -349,17 +708,19 @@ class RtpyBase(object):
             return response
 
         # Trying to see if the response content can be loaded as a json
-        bad_status_codes = list(range(400, 600))
-        if response.status_code in bad_status_codes:
+        if 400 <= response.status_code < 600:
             self._process_and_raise_error(response, api_method, target, verb)
 
         if not raw_response:
             try:
                 if byte_output:
                     return response
-                else:
-                    response2 = response.json()
-                    return response2
+                if stream_json and is_json_response(response.headers):
+                    items = stream_json_items(response, stream_json)
+                    if items is not None:
+                        return items
+                response2 = response.json()
+                return response2
 
             except ValueError:
                 return response.text
@@ -462,6 +823,37 @@ class RtpyBase(object):
             return target
         return target
 
+    def _setting(self, kwargs, key):
+        """
+        Return the value of a setting, overridden by the settings kwarg if present.
+
+        Parameters
+        ----------
+        kwargs: dict
+            Keyword arguments
+        key: str
+            Name of the setting
+
+        """
+        settings = self._settings_if_settings_in_kwargs(kwargs) or {}
+        return settings.get(key, self._user_settings[key])
+
+    def _decoded_kwargs(self, kwargs):
+        """
+        Return the kwargs of an internal call indexing into the decoded result.
+
+        The "raw_response" and "stream_json" settings are disabled for that call.
+
+        Parameters
+        ----------
+        kwargs: dict
+            Keyword arguments
+
+        """
+        settings = self._settings_if_settings_in_kwargs(kwargs) or {}
+        settings = dict(settings, raw_response=False, stream_json=False)
+        return dict(kwargs, settings=settings)
+
     def _settings_if_settings_in_kwargs(self, kwargs):
         """
         Extract the settings key from the kwargs dict and return it if present.
@@ -540,6 +932,11 @@ class RtpyBase(object):
 
         pass
 
+    class ChecksumError(ValueError):
+        """Raised if the checksum of transferred content doesn't match the expected one."""
+
+        pass
+
 
 class UserSettingsError(ValueError):
     """Raised if some of the provided settings are incorrect or missing."""
@@ -547,6 +944,536 @@ class UserSettingsError(ValueError):
     pass
 
 
+def retry_policy(retry):
+    """
+    Build the complete retry policy of the "retry" setting.
+
+    Parameters
+    ----------
+    retry: dict or bool or None
+        None or False to disable the retries, True for the DEFAULT_RETRY policy,
+        a dict to override some of its keys :
+        "max_attempts" (int, attempts including the first one),
+        "backoff_base" and "backoff_cap" (seconds, the delay doubles after each
+        attempt from backoff_base up to backoff_cap),
+        "jitter" (bool, random delay between 0 and the backoff delay),
+        "retry_after" (bool, wait for the Retry-After header delay when present,
+        up to backoff_cap), "status_codes" (list, status codes retried),
+        "verbs" (list, HTTP verbs retried, the idempotent ones by default)
+
+    Raises
+    ------
+    UserSettingsError
+        If the retry setting is invalid
+
+    Returns
+    -------
+    policy: dict or None
+        None if the retries are disabled
+
+    """
+    if retry is None or retry is False:
+        return None
+    if retry is True:
+        return DEFAULT_RETRY
+    if not isinstance(retry, dict):
+        raise UserSettingsError("retry must be None, False, True or a dict!")
+
+    offending_keys = [key for key in retry if key not in DEFAULT_RETRY]
+    if offending_keys:
+        message = (
+            "retry keys must be in "
+            + str(sorted(DEFAULT_RETRY))
+            + ", offending key(s) supplied : "
+            + str(offending_keys)
+            + "!"
+        )
+        raise UserSettingsError(message)
+    policy = dict(DEFAULT_RETRY)
+    policy.update(retry)
+
+    if not isinstance(policy["max_attempts"], int) or policy["max_attempts"] < 1:
+        raise UserSettingsError("retry max_attempts must be a positive integer!")
+    for key in ["backoff_base", "backoff_cap"]:
+        if not isinstance(policy[key], (int, float)) or policy[key] < 0:
+            raise UserSettingsError("retry " + key + " must be a positive number!")
+    for key in ["jitter", "retry_after"]:
+        if policy[key] not in [False, True]:
+            raise UserSettingsError("retry " + key + " must be False or True!")
+    return policy
+
+
+def retry_delay(policy, attempt, response=None):
+    """
+    Return the delay in seconds before retrying a failed attempt.
+
+    Parameters
+    ----------
+    policy: dict
+        Retry policy given by the retry_policy function
+    attempt: int
+        Number of the failed attempt (1 for the first one)
+    response: requests.Response, optional
+        Failed response, its Retry-After header is used when present
+
+    """
+    if response is not None and policy["retry_after"]:
+        retry_after = _parse_retry_after(response.headers.get("Retry-After"))
+        if retry_after is not None:
+            return min(retry_after, policy["backoff_cap"])
+    delay = min(policy["backoff_cap"], policy["backoff_base"] * 2 ** (attempt - 1))
+    if policy["jitter"]:
+        delay = random.uniform(0, delay)
+    return delay
+
+
+def _parse_retry_after(value):
+    """Return the delay of a Retry-After header (seconds or HTTP date)."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        date = parsedate_tz(value)
+        if date is None:
+            return None
+        return max(mktime_tz(date) - time.time(), 0.0)
+
+
+def _retryable(policy, verb, data):
+    """Return True if a request can be retried (verb and rewindable data)."""
+    if policy is None or policy["max_attempts"] < 2 or verb not in policy["verbs"]:
+        return False
+    # An iterator consumed by the first attempt can't be sent again
+    iterator = any(hasattr(data, name) for name in ["__next__", "next", "__anext__"])
+    return not iterator or hasattr(data, "seek")
+
+
+def _log_retry(reason, delay, verbose_level):
+    """Print the reason and the delay of a retry."""
+    if verbose_level >= 1:
+        message = "\nRetrying after " + reason + " in " + "%.2f" % delay + " seconds\n"
+        sys.stdout.write(message)
+
+
+def _send_with_retries(send, policy, verb, data, verbose_level):
+    """
+    Call send until it succeeds or the attempts allowed by the retry policy are spent.
+
+    Connection errors, timeouts and the responses with a status code of the
+    policy are retried, file objects are rewound before each new attempt.
+
+    Returns
+    -------
+    response: requests.Response
+        Last response
+
+    """
+    if not _retryable(policy, verb, data):
+        return send()
+
+    position = data.tell() if hasattr(data, "seek") else None
+    attempt = 1
+    while True:
+        response = None
+        try:
+            response = send()
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            if attempt >= policy["max_attempts"]:
+                raise
+            reason = "connection error"
+        else:
+            if (
+                response.status_code not in policy["status_codes"]
+                or attempt >= policy["max_attempts"]
+            ):
+                return response
+            reason = "status code " + str(response.status_code)
+            response.close()
+
+        delay = retry_delay(policy, attempt, response)
+        _log_retry(reason, delay, verbose_level)
+        time.sleep(delay)
+        if position is not None:
+            data.seek(position)
+        attempt += 1
+
+
+def _request_size(data, params):
+    """Return the size of the body of a request (0 if unknown)."""
+    if params is not None:
+        # Encoded by requests with the same separators
+        return len(json.dumps(params).encode("utf-8"))
+    if data is None:
+        return 0
+    if _is_path(data) and not isinstance(data, bytes):
+        return len(data.encode("utf-8"))
+    if hasattr(data, "__len__"):
+        return len(data)
+    if hasattr(data, "fileno"):
+        try:
+            return os.fstat(data.fileno()).st_size
+        except (OSError, ValueError):
+            return 0
+    return 0
+
+
+def _response_size(response, verb, streamed):
+    """
+    Return the size of the body of a response.
+
+    The Content-Length header is used when present, the content of a
+    streamed response is not read.
+
+    """
+    if response is None or verb == "HEAD":
+        return 0
+    length = response.headers.get("Content-Length")
+    if length is not None and length.isdigit():
+        return int(length)
+    if streamed:
+        return 0
+    return len(response.content or b"")
+
+
+def _attempt_phases(last_attempt, streamed):
+    """
+    Return the server and transfer phases of the last attempt of a call.
+
+    The server phase ends when the headers are received (response hook),
+    the transfer phase when the content is loaded (not for a streamed response).
+
+    """
+    start, headers_received, end = last_attempt
+    if headers_received is None:
+        return []
+    phases = [("server", start, headers_received)]
+    if not streamed:
+        phases.append(("transfer", headers_received, end))
+    return phases
+
+
+def create_session(settings):
+    """
+    Create a requests.Session() with a pooled HTTP transport.
+
+    The same session is shared by all the categories of a rtpy.Rtpy object
+    so the connections (and TLS handshakes) to the Artifactory instance are reused.
+
+    Parameters
+    ----------
+    settings: dict
+        User settings, the "pool_connections", "pool_maxsize", "pool_block",
+        "keep_alive" and "tracer" keys are used when present
+
+    Raises
+    ------
+    UserSettingsError
+        If the pool settings are invalid
+
+    Returns
+    -------
+    session: requests.Session
+        The configured session
+
+    """
+    pool_connections = settings.get("pool_connections", DEFAULT_POOLSIZE)
+    pool_maxsize = settings.get("pool_maxsize", DEFAULT_POOLSIZE)
+    pool_block = settings.get("pool_block", False)
+    keep_alive = settings.get("keep_alive", True)
+
+    for key, value in [
+        ("pool_connections", pool_connections),
+        ("pool_maxsize", pool_maxsize),
+    ]:
+        if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+            raise UserSettingsError(key + " must be a positive integer!")
+
+    allowed_booleans = [False, True]
+    if pool_block not in allowed_booleans:
+        raise UserSettingsError("pool_block must be " + str(allowed_booleans) + "!")
+    if keep_alive not in allowed_booleans:
+        raise UserSettingsError("keep_alive must be " + str(allowed_booleans) + "!")
+
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        pool_block=pool_block,
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    if not keep_alive:
+        session.headers["Connection"] = "close"
+    if settings.get("tracer") is not None:
+        # Connection phases of the traced calls
+        instrument_session(session)
+    return session
+
+
+class DownloadWriter(object):
+    """
+    Write downloaded chunks to a file while computing the SHA-1 and SHA-256 checksums.
+
+    When the destination is a path, the content is written to a temporary file
+    in the same directory which replaces the destination once complete.
+
+    Parameters
+    ----------
+    destination: str or file object
+        Local path or file object opened in binary mode
+
+    """
+
+    def __init__(self, destination):
+        """Object instantiation."""
+        self._checksums = MultiHash(["sha1", "sha256"])
+        self._size = 0
+        self._path = None
+        self._temporary_path = None
+        if hasattr(destination, "write"):
+            self._file = destination
+        else:
+            self._path = destination
+            file_descriptor, self._temporary_path = tempfile.mkstemp(
+                dir=os.path.dirname(os.path.abspath(destination)),
+                prefix="." + os.path.basename(destination) + ".",
+                suffix=".part",
+            )
+            self._file = os.fdopen(file_descriptor, "wb")
+
+    def write(self, chunk):
+        """Write a chunk and update the checksums."""
+        self._file.write(chunk)
+        self._checksums.update(chunk)
+        self._size += len(chunk)
+
+    def close(self, headers, checksums=None):
+        """
+        Verify the checksums against the response headers and finish the file.
+
+        Parameters
+        ----------
+        headers: dict
+            Response headers, "X-Checksum-Sha1" and "X-Checksum-Sha256"
+            are verified when present
+        checksums: dict, optional
+            Expected {"sha1": str, "sha256": str} checksums (both optional),
+            verified in addition to the headers
+
+        Raises
+        ------
+        RtpyBase.ChecksumError
+            If a checksum doesn't match (the destination path is not written)
+
+        Returns
+        -------
+        checksums: dict
+            {"sha1": str, "sha256": str, "size": int}
+
+        """
+        expected_checksums = checksums or {}
+        checksums = self._checksums.hexdigests()
+        checksums["size"] = self._size
+        for sha_type, header in [
+            ("sha1", "X-Checksum-Sha1"),
+            ("sha256", "X-Checksum-Sha256"),
+        ]:
+            for expected in [headers.get(header), expected_checksums.get(sha_type)]:
+                if expected and expected.lower() != checksums[sha_type]:
+                    self.abort()
+                    message = (
+                        sha_type
+                        + " checksum mismatch, expected "
+                        + expected
+                        + " but got "
+                        + checksums[sha_type]
+                        + "!"
+                    )
+                    raise RtpyBase.ChecksumError(message)
+
+        if self._path is None:
+            self._file.flush()
+        else:
+            self._file.close()
+            _replace_file(self._temporary_path, self._path)
+            self._temporary_path = None
+        return checksums
+
+    def abort(self):
+        """Remove the temporary file (if any) after a failure."""
+        if self._temporary_path is not None:
+            self._file.close()
+            os.remove(self._temporary_path)
+            self._temporary_path = None
+
+
+class UploadBuffer(object):
+    """
+    Iterable streaming a file or a buffer in fixed-size chunks for an upload.
+
+    Files are memory-mapped while iterating and the chunks are memoryview
+    slices, so the content is never copied in memory.
+    The length is known so requests sends a Content-Length header
+    (no chunked transfer encoding).
+
+    Parameters
+    ----------
+    source: str or buffer
+        Local path or object supporting the buffer protocol
+        (bytes, bytearray, memoryview, mmap...)
+    chunk_size: int, optional
+        Size of the chunks (1 MiB by default)
+    progress: callable, optional
+        Called after each chunk with the number of bytes sent,
+        the total number of bytes and the throughput in bytes per second
+    byte_range: tuple, optional
+        (start, stop) offsets of the part of the content to stream (stop excluded)
+
+    Attributes
+    ----------
+    sent: int
+        Number of bytes sent during the last iteration
+    throughput: float
+        Bytes per second during the last iteration
+
+    """
+
+    def __init__(
+        self, source, chunk_size=DEFAULT_CHUNK_SIZE, progress=None, byte_range=None
+    ):
+        """Object instantiation."""
+        self._source = source
+        self._chunk_size = chunk_size
+        self._progress = progress
+        if _is_path(source):
+            size = os.path.getsize(source)
+        else:
+            size = _byte_size(source)
+        self._start, self._stop = 0, size
+        if byte_range is not None:
+            self._start, self._stop = byte_range
+            if not 0 <= self._start <= self._stop <= size:
+                message = (
+                    "byte_range must be (start, stop) "
+                    + "with 0 <= start <= stop <= "
+                    + str(size)
+                    + " !"
+                )
+                raise RtpyBase.RtpyError(message)
+        self.sent = 0
+        self.throughput = 0.0
+
+    def __len__(self):
+        """Return the number of bytes to send."""
+        return self._stop - self._start
+
+    def __iter__(self):
+        """Yield memoryview chunks and report the progress."""
+        self.sent = 0
+        self.throughput = 0.0
+        started = _clock()
+        total = len(self)
+        for chunk in self._chunks():
+            yield chunk
+            self.sent += len(chunk)
+            elapsed = _clock() - started
+            if elapsed > 0:
+                self.throughput = self.sent / elapsed
+            if self._progress:
+                self._progress(self.sent, total, self.throughput)
+
+    def checksums(self):
+        """
+        Compute the SHA-1 and SHA-256 checksums of the content in one pass.
+
+        Returns
+        -------
+        checksums: dict
+            {"sha1": str, "sha256": str}
+
+        """
+        checksums = MultiHash(["sha1", "sha256"])
+        for chunk in self._chunks():
+            checksums.update(chunk)
+        return checksums.hexdigests()
+
+    def _chunks(self):
+        """Yield the memoryview chunks of the content, mapping the file if needed."""
+        return iter_chunks(self._source, self._chunk_size, self._start, self._stop)
+
+
+class ClientConfig(object):
+    """
+    Configuration of the API calls precompiled from validated user settings.
+
+    The URLs, the authentication and its headers are computed once,
+    an API call only appends its target. The object is shared by the
+    concurrent calls and must not be modified, see the replace method.
+
+    Parameters
+    ----------
+    user_settings: dict
+        Validated user settings (see RtpyBase._validate_user_settings)
+
+    """
+
+    __slots__ = (
+        "af_url",
+        "api_endpoint",
+        "auth",
+        "authorization",
+        "headers",
+        "identity",
+        "session",
+        "raw_response",
+        "verbose_level",
+        "stream_json",
+        "cache",
+        "artifact_cache",
+        "retry",
+        "throttle",
+        "metrics",
+        "tracer",
+    )
+
+    def __init__(self, user_settings):
+        """Object instantiation."""
+        self.af_url = user_settings["af_url"]
+        self.api_endpoint = user_settings["api_endpoint"]
+        self.auth = user_settings["auth"]
+        # Basic authentication header for the transports not supporting auth
+        self.authorization = None
+        if self.auth:
+            self.authorization = _basic_auth_str(*self.auth)
+        self.headers = {}
+        if user_settings["X-JFrog-Art-Api"]:
+            self.headers["X-JFrog-Art-Api"] = user_settings["X-JFrog-Art-Api"]
+        # User name or API key the responses are cached for
+        self.identity = user_settings["username"] or user_settings["api_key"]
+        self.session = user_settings["session"]
+        self.raw_response = user_settings["raw_response"]
+        self.verbose_level = user_settings["verbose_level"]
+        self.stream_json = user_settings["stream_json"]
+        self.cache = user_settings["cache"]
+        self.artifact_cache = user_settings["artifact_cache"]
+        self.retry = retry_policy(user_settings["retry"])
+        self.throttle = user_settings["throttle"]
+        self.metrics = user_settings["metrics"]
+        self.tracer = user_settings["tracer"]
+
+    def replace(self, **changes):
+        """Return a copy of the configuration with some attributes changed."""
+        config = object.__new__(ClientConfig)
+        for name in self.__slots__:
+            setattr(config, name, changes.get(name, getattr(self, name)))
+        return config
+
+    def relative_path(self, request_url):
+        """Return the path of an API call relative to the Artifactory URL."""
+        return request_url[len(self.af_url) :].lstrip("/")
+
+
 def json_to_dict(json_file_path):
     """
     Convert a .json file to a Python dictionary.
@@ -0,0 +1,632 @@
+# coding: utf-8
+
+# Copyright (C) 2018 Orange
+#
+# This software is distributed under the terms and conditions of the 'Apache-2.0'
+# license which can be found in the 'LICENSE.md' file
+# or at 'http://www.apache.org/licenses/LICENSE-2.0'.
+
+"""Tracer class definition, spans of the API calls and of the bulk operations."""
+
+from __future__ import unicode_literals
+import functools
+import io
+import json
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# urllib3 as used by requests (vendored by the old versions of requests)
+from requests.packages.urllib3.connection import HTTPConnection, HTTPSConnection
+from requests.packages.urllib3.connectionpool import (
+    HTTPConnectionPool,
+    HTTPSConnectionPool,
+)
+
+try:
+    import contextvars
+except ImportError:
+    contextvars = None
+
+# Kinds and status codes of the spans (values of the OpenTelemetry protocol)
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_CLIENT = 3
+STATUS_CODE_UNSET = 0
+STATUS_CODE_OK = 1
+STATUS_CODE_ERROR = 2
+
+# Templates of the API endpoints with variable paths (prefix, template)
+URL_TEMPLATES = [
+    ("api/storage/", "api/storage/{repo_key}/{path}"),
+    ("api/archive/download/", "api/archive/download/{repo_key}/{path}"),
+    ("api/download/", "api/download/{repo_key}/{path}"),
+    ("api/copy/", "api/copy/{repo_key}/{path}"),
+    ("api/move/", "api/move/{repo_key}/{path}"),
+    ("api/trash/clean/", "api/trash/clean/{repo_key}/{path}"),
+    ("api/trash/restore/", "api/trash/restore/{repo_key}/{path}"),
+    ("api/repositories/", "api/repositories/{repo_key}"),
+    ("api/security/users/", "api/security/users/{name}"),
+    ("api/security/groups/", "api/security/groups/{name}"),
+    ("api/security/permissions/", "api/security/permissions/{name}"),
+    ("api/build/", "api/build/{name}/{number}"),
+    ("api/docker/", "api/docker/{repo_key}/{path}"),
+]
+
+# Monotonic clock when available (Python 3)
+_clock = getattr(time, "monotonic", time.time)
+
+# Connection phases recorded by the instrumented connections of the current thread
+_connection_phases = threading.local()
+
+
+class Tracer(object):
+    """
+    Spans of the API calls and of the bulk operations.
+
+    Given as the "tracer" setting of a rtpy.Rtpy object, each HTTP call of
+    RtpyBase._request is a client span with the api_method, verb, URL and URL
+    template, status code, request and response body sizes and retries.
+    The operations of the bulk category are parent spans of their calls,
+    the calls made by their worker threads included.
+
+    The span of a call has child spans for its phases (phases=True) :
+    "connect" (DNS resolution and TCP connection) and "tls" when a new
+    connection is opened, "server" until the response headers are received
+    (upload and server processing), "transfer" for the response body
+    (not for the streamed responses). The connections are instrumented in the
+    sessions created by rtpy only. With AsyncRtpy, the phases are "dns",
+    "connect" (DNS resolution, TCP connection and TLS), "server" and "transfer".
+
+    The data model (128 bits trace ids, 64 bits span ids, nanosecond
+    timestamps, kinds, attributes, events and status) is the OpenTelemetry one,
+    FileSpanExporter writes the OTLP/JSON format read by the
+    OpenTelemetry collector.
+
+    Parameters
+    ----------
+    exporter: object
+        Object with an export(spans) method called with each ended span
+        (in a list), FileSpanExporter or MemorySpanExporter for instance
+    service_name: str, optional
+        service.name attribute of the resource, "rtpy" by default
+    phases: bool, optional
+        True (default) to add the phases of the calls as child spans
+
+    Examples
+    --------
+    >>> tracer = rtpy.Tracer(rtpy.FileSpanExporter("rtpy-spans.jsonl"))
+    >>> af = rtpy.Rtpy(dict(settings, tracer=tracer))
+    >>> with tracer.span("nightly cleanup"):
+    ...     af.bulk.delete('items.find({"repo":"tmp-local"})')
+
+    """
+
+    def __init__(self, exporter, service_name="rtpy", phases=True):
+        """Object instantiation."""
+        if not hasattr(exporter, "export"):
+            raise ValueError("exporter must have an export method!")
+        self.exporter = exporter
+        self.resource = OrderedDict([("service.name", service_name)])
+        self.phases = phases
+
+    def start_span(self, name, kind=SPAN_KIND_INTERNAL, attributes=None, parent=None):
+        """
+        Start a span, child of parent or of the current span.
+
+        The span is not made current, see the span method.
+
+        Parameters
+        ----------
+        name: str
+            Name of the span
+        kind: int, optional
+            SPAN_KIND_INTERNAL (default) or SPAN_KIND_CLIENT
+        attributes: dict, optional
+            Attributes of the span
+        parent: rtpy.tracing.Span, optional
+            Parent span, the current span by default
+
+        Returns
+        -------
+        span: rtpy.tracing.Span
+            Started span, to end with the end_span method
+
+        """
+        if parent is None:
+            parent = current_span()
+        return Span(self, name, kind, parent, attributes)
+
+    def end_span(self, span):
+        """End a span and export it."""
+        span.end()
+        self.exporter.export([span])
+
+    @contextmanager
+    def span(self, name, kind=SPAN_KIND_INTERNAL, attributes=None):
+        """
+        Context manager of a span made current, the parent of the spans started inside.
+
+        An exception raised inside is recorded and sets the status to error.
+
+        Parameters
+        ----------
+        name: str
+            Name of the span
+        kind: int, optional
+            SPAN_KIND_INTERNAL (default) or SPAN_KIND_CLIENT
+        attributes: dict, optional
+            Attributes of the span
+
+        """
+        span = self.start_span(name, kind, attributes)
+        token = _set_current_span(span)
+        try:
+            yield span
+        except BaseException as error:
+            span.record_exception(error)
+            raise
+        finally:
+            _reset_current_span(token)
+            self.end_span(span)
+
+    def start_request(self, api_method, verb, url, url_template):
+        """Start the client span of an HTTP call and record its connection phases."""
+        span = self.start_span(
+            api_method,
+            SPAN_KIND_CLIENT,
+            OrderedDict(
+                [
+                    ("rtpy.api_method", api_method),
+                    ("http.request.method", verb),
+                    ("url.full", url),
+                    ("url.template", url_template),
+                ]
+            ),
+        )
+        _connection_phases.phases = []
+        return span
+
+    def end_request(
+        self, span, status, request_bytes, response_bytes, retries, phases=()
+    ):
+        """
+        End the client span of an HTTP call.
+
+        Parameters
+        ----------
+        span: rtpy.tracing.Span
+            Span given by start_request
+        status: int or None
+            Status code of the response, None if no response was received
+        request_bytes: int
+            Size of the request body
+        response_bytes: int
+            Size of the response body
+        retries: int
+            Number of attempts after the first one
+        phases: list, optional
+            (name, start, end) phases of the last attempt (_clock times),
+            the connection phases recorded in this thread are added
+
+        """
+        recorded = getattr(_connection_phases, "phases", None) or []
+        _connection_phases.phases = None
+        if status is not None:
+            span.set_attribute("http.response.status_code", status)
+            if status >= 400:
+                span.set_attribute("error.type", str(status))
+                span.set_status(STATUS_CODE_ERROR)
+        span.set_attribute("http.request.body.size", request_bytes)
+        span.set_attribute("http.response.body.size", response_bytes)
+        if retries:
+            span.set_attribute("http.request.resend_count", retries)
+        if self.phases:
+            # The server phase starts once the new connection is established
+            connected = max([end for _, _, end in recorded] or [None])
+            phases = [
+                (
+                    (name, max(start, connected), end)
+                    if name == "server" and connected is not None
+                    else (name, start, end)
+                )
+                for name, start, end in phases
+            ]
+            for name, start, end in sorted(
+                list(recorded) + phases, key=lambda phase: phase[1]
+            ):
+                child = Span(self, name, SPAN_KIND_INTERNAL, span)
+                child.start_time = span.clock_time(start)
+                child.end(span.clock_time(end))
+                self.exporter.export([child])
+        self.end_span(span)
+
+    def shutdown(self):
+        """Shut the exporter down if it supports it."""
+        if hasattr(self.exporter, "shutdown"):
+            self.exporter.shutdown()
+
+
+class Span(object):
+    """
+    Span with the data model of OpenTelemetry.
+
+    Attributes
+    ----------
+    name: str
+        Name of the span
+    kind: int
+        SPAN_KIND_INTERNAL or SPAN_KIND_CLIENT
+    trace_id: str
+        Identifier of the trace (32 hexadecimal digits)
+    span_id: str
+        Identifier of the span (16 hexadecimal digits)
+    parent_span_id: str or None
+        Identifier of the parent span
+    start_time: int
+        Start time in nanoseconds since the epoch
+    end_time: int or None
+        End time in nanoseconds since the epoch, None until the span is ended
+    attributes: dict
+        Attributes of the span
+    events: list
+        (name, time, attributes) events of the span
+    status_code: int
+        STATUS_CODE_UNSET, STATUS_CODE_OK or STATUS_CODE_ERROR
+    status_message: str
+
+    """
+
+    __slots__ = (
+        "tracer",
+        "name",
+        "kind",
+        "trace_id",
+        "span_id",
+        "parent_span_id",
+        "start_time",
+        "end_time",
+        "attributes",
+        "events",
+        "status_code",
+        "status_message",
+        "_clock_start",
+    )
+
+    def __init__(self, tracer, name, kind, parent=None, attributes=None):
+        """Object instantiation."""
+        self.tracer = tracer
+        self.name = name
+        self.kind = kind
+        self.trace_id = parent.trace_id if parent else "%032x" % _random_bits(128)
+        self.span_id = "%016x" % _random_bits(64)
+        self.parent_span_id = parent.span_id if parent else None
+        self._clock_start = _clock()
+        self.start_time = _time_ns()
+        self.end_time = None
+        self.attributes = OrderedDict(attributes or {})
+        self.events = []
+        self.status_code = STATUS_CODE_UNSET
+        self.status_message = ""
+
+    def set_attribute(self, key, value):
+        """Set an attribute (str, bool, int, float or list of them)."""
+        self.attributes[key] = value
+
+    def add_event(self, name, attributes=None):
+        """Add an event happening now."""
+        self.events.append((name, _time_ns(), OrderedDict(attributes or {})))
+
+    def set_status(self, code, message=""):
+        """Set the status (STATUS_CODE_OK or STATUS_CODE_ERROR)."""
+        self.status_code = code
+        self.status_message = message
+
+    def record_exception(self, error):
+        """Add an exception event and set the status to error."""
+        self.add_event(
+            "exception",
+            {
+                "exception.type": type(error).__name__,
+                "exception.message": str(error),
+            },
+        )
+        self.attributes.setdefault("error.type", type(error).__name__)
+        self.set_status(STATUS_CODE_ERROR, str(error))
+
+    def end(self, end_time=None):
+        """Set the end time (now by default)."""
+        self.end_time = _time_ns() if end_time is None else end_time
+
+    def clock_time(self, clock_value):
+        """Convert a _clock value to nanoseconds since the epoch."""
+        return self.start_time + int((clock_value - self._clock_start) * 1e9)
+
+    def to_dict(self):
+        """Return the span in the OTLP/JSON format."""
+        span = OrderedDict(
+            [
+                ("traceId", self.trace_id),
+                ("spanId", self.span_id),
+                ("parentSpanId", self.parent_span_id or ""),
+                ("name", self.name),
+                ("kind", self.kind),
+                ("startTimeUnixNano", str(self.start_time)),
+                ("endTimeUnixNano", str(self.end_time)),
+                ("attributes", _otlp_attributes(self.attributes)),
+                (
+                    "events",
+                    [
+                        OrderedDict(
+                            [
+                                ("timeUnixNano", str(event_time)),
+                                ("name", name),
+                                ("attributes", _otlp_attributes(attributes)),
+                            ]
+                        )
+                        for name, event_time, attributes in self.events
+                    ],
+                ),
+                (
+                    "status",
+                    OrderedDict(
+                        [("code", self.status_code), ("message", self.status_message)]
+                    ),
+                ),
+            ]
+        )
+        return span
+
+
+class FileSpanExporter(object):
+    """
+    Append the spans to a file in the OTLP/JSON format.
+
+    Each export is a line holding an ExportTraceServiceRequest
+    ({"resourceSpans": [...]}), the format of the file exporter
+    and of the otlpjsonfile receiver of the OpenTelemetry collector.
+
+    Parameters
+    ----------
+    path: str
+        Path of the file, created if necessary
+
+    """
+
+    def __init__(self, path):
+        """Object instantiation."""
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans):
+        """Append a line with spans."""
+        if not spans:
+            return
+        resource = spans[0].tracer.resource
+        line = json.dumps(
+            {
+                "resourceSpans": [
+                    {
+                        "resource": {"attributes": _otlp_attributes(resource)},
+                        "scopeSpans": [
+                            {
+                                "scope": {"name": "rtpy"},
+                                "spans": [span.to_dict() for span in spans],
+                            }
+                        ],
+                    }
+                ]
+            }
+        )
+        with self._lock:
+            with io.open(self.path, "a", encoding="utf-8") as spans_file:
+                spans_file.write(line + "\n")
+
+
+class MemorySpanExporter(object):
+    """Keep the ended spans in the spans list attribute."""
+
+    def __init__(self):
+        """Object instantiation."""
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def export(self, spans):
+        """Add spans to the list."""
+        with self._lock:
+            self.spans.extend(spans)
+
+    def clear(self):
+        """Empty the list."""
+        with self._lock:
+            self.spans = []
+
+
+def current_span():
+    """Return the current span of the thread (or asyncio task), None if none."""
+    return _get_current_span()
+
+
+def propagate(function):
+    """
+    Return a function running with the current span of the caller.
+
+    Used for the functions run in thread pools, the spans started by the
+    worker threads are children of the span current when propagate was called.
+
+    """
+    span = current_span()
+    if span is None:
+        return function
+
+    @functools.wraps(function)
+    def run_with_span(*args, **kwargs):
+        token = _set_current_span(span)
+        try:
+            return function(*args, **kwargs)
+        finally:
+            _reset_current_span(token)
+
+    return run_with_span
+
+
+def url_template(target, no_api):
+    """
+    Return the URL template of an API call, the variable parts replaced.
+
+    Parameters
+    ----------
+    target: str
+        API sub endpoint of the call
+    no_api: bool
+        True for the artifacts paths (without 'api/')
+
+    Returns
+    -------
+    template: str
+        The path relative to the Artifactory URL ("api/storage/{repo_key}/{path}"...)
+        followed by the names of the query parameters, "?list&deep" for instance
+
+    """
+    path, _, query = target.partition("?")
+    if no_api:
+        template = "{repo_key}/{path}"
+    else:
+        template = "api/" + path
+        for prefix, prefix_template in URL_TEMPLATES:
+            if template.startswith(prefix):
+                template = prefix_template
+                break
+    names = [
+        re.split("[=;]", parameter, 1)[0] for parameter in query.split("&") if parameter
+    ]
+    if names:
+        template += "?" + "&".join(names)
+    return template
+
+
+def instrument_session(session):
+    """
+    Record the connection phases of a requests.Session created by rtpy.
+
+    The connections of the pools of its HTTPAdapters time their TCP
+    connection and their TLS handshake.
+
+    """
+    for adapter in set(session.adapters.values()):
+        poolmanager = getattr(adapter, "poolmanager", None)
+        if poolmanager is not None:
+            poolmanager.pool_classes_by_scheme = {
+                "http": _TimedHTTPConnectionPool,
+                "https": _TimedHTTPSConnectionPool,
+            }
+
+
+class _TimedHTTPConnection(HTTPConnection):
+    """HTTP connection recording the duration of its TCP connection."""
+
+    def _new_conn(self):
+        start = _clock()
+        try:
+            return super(_TimedHTTPConnection, self)._new_conn()
+        finally:
+            _record_connection_phase("connect", start)
+
+
+class _TimedHTTPSConnection(HTTPSConnection):
+    """HTTPS connection recording the durations of its TCP connection and TLS."""
+
+    def _new_conn(self):
+        start = _clock()
+        try:
+            return super(_TimedHTTPSConnection, self)._new_conn()
+        finally:
+            _record_connection_phase("connect", start)
+
+    def connect(self):
+        super(_TimedHTTPSConnection, self).connect()
+        phases = getattr(_connection_phases, "phases", None)
+        if phases:
+            _record_connection_phase("tls", phases[-1][2])
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    """Pool of _TimedHTTPConnection."""
+
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    """Pool of _TimedHTTPSConnection."""
+
+    ConnectionCls = _TimedHTTPSConnection
+
+
+def _record_connection_phase(name, start):
+    """Record a phase of a connection if a call of this thread is traced."""
+    phases = getattr(_connection_phases, "phases", None)
+    if phases is not None:
+        phases.append((name, start, _clock()))
+
+
+if contextvars is not None:
+    _current_span = contextvars.ContextVar("rtpy_current_span", default=None)
+
+    def _get_current_span():
+        return _current_span.get()
+
+    def _set_current_span(span):
+        return _current_span.set(span)
+
+    def _reset_current_span(token):
+        _current_span.reset(token)
+
+else:
+    _current_span = threading.local()
+
+    def _get_current_span():
+        return getattr(_current_span, "span", None)
+
+    def _set_current_span(span):
+        token = _get_current_span()
+        _current_span.span = span
+        return token
+
+    def _reset_current_span(token):
+        _current_span.span = token
+
+
+def _random_bits(bits):
+    """Return a random non-zero integer of bits bits."""
+    return random.getrandbits(bits) or 1
+
+
+def _time_ns():
+    """Return the time in nanoseconds since the epoch."""
+    if hasattr(time, "time_ns"):
+        return time.time_ns()
+    return int(time.time() * 1e9)
+
+
+def _otlp_attributes(attributes):
+    """Convert attributes to the OTLP/JSON key-value list."""
+    return [
+        OrderedDict([("key", key), ("value", _otlp_value(value))])
+        for key, value in attributes.items()
+    ]
+
+
+def _otlp_value(value):
+    """Convert an attribute value to an OTLP/JSON AnyValue."""
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        # 64 bits integers are strings in the OTLP/JSON format
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    if isinstance(value, (list, tuple)):
+        return {"arrayValue": {"values": [_otlp_value(item) for item in value]}}
+    return {"stringValue": "%s" % (value,)}
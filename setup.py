@@ -32,8 +32,11 @@ setup(
     packages=['rtpy'],
     package_dir={"": "."},
     package_data={},
-    install_requires=['requests==2.*,>=2.18.4'],
+    install_requires=[
+        'futures==3.*,>=3.2.0; python_version == "2.7"', 'requests==2.*,>=2.18.4'
+    ],
     extras_require={
+        "async": ['aiohttp==3.*,>=3.5.0; python_version >= "3.6"'],
         "dev": [
             "coverage==4.*,>=4.5.0", "poetry-setup==0.*,>=0.3.0",
             "pytest==3.*,>=3.6.0", "setuptools==40.*,>=40.0.0",
@@ -0,0 +1,34 @@
+# coding: utf-8
+
+# Copyright (C) 2018 Orange
+#
+# This software is distributed under the terms and conditions of the 'Apache-2.0'
+# license which can be found in the 'LICENSE.md' file
+# or at 'http://www.apache.org/licenses/LICENSE-2.0'.
+
+"""Configuration of the tests, without AF_TEST_URL they use a StandInServer."""
+
+from __future__ import unicode_literals
+import os
+
+from rtpy.testing import StandInServer
+
+stand_in_server = None
+
+
+def pytest_configure(config):
+    """Start a StandInServer if no Artifactory instance is configured."""
+    global stand_in_server
+    if os.environ.get("AF_TEST_URL"):
+        return
+    stand_in_server = StandInServer().start()
+    os.environ["AF_TEST_URL"] = stand_in_server.url
+    os.environ["AF_TEST_USERNAME"] = stand_in_server.username
+    os.environ["AF_TEST_PASSWORD"] = stand_in_server.password
+
+
+def pytest_unconfigure(config):
+    """Stop the StandInServer."""
+    if stand_in_server is not None:
+        stand_in_server.stop()
+        del os.environ["AF_TEST_URL"]
@@ -0,0 +1,374 @@
+# coding: utf-8
+
+# Copyright (C) 2018 Orange
+#
+# This software is distributed under the terms and conditions of the 'Apache-2.0'
+# license which can be found in the 'LICENSE.md' file
+# or at 'http://www.apache.org/licenses/LICENSE-2.0'.
+
+"""Definitions of the tests for the AsyncRtpy class defined in rtpy/aio.py."""
+
+from __future__ import unicode_literals
+import json
+import os
+import sys
+import threading
+
+import pytest
+
+from .mixins import RtpyTestMixin
+
+if sys.version_info < (3, 6):
+    pytest.skip("AsyncRtpy requires Python 3.6+", allow_module_level=True)
+asyncio = pytest.importorskip("asyncio")
+aiohttp = pytest.importorskip("aiohttp")
+
+from http.server import BaseHTTPRequestHandler, HTTPServer  # noqa: E402
+from socketserver import ThreadingMixIn  # noqa: E402
+
+import rtpy  # noqa: E402
+
+
+class ScriptedServer(ThreadingMixIn, HTTPServer):
+    """
+    HTTP server answering with scripted outcomes, recording the bodies.
+
+    Each outcome is a status code or None to close the connection without
+    answering, the last outcome is repeated.
+
+    """
+
+    daemon_threads = True
+    outcomes = [200]
+    received = []
+
+
+class ScriptedHandler(BaseHTTPRequestHandler):
+    """Request handler of a ScriptedServer."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        """Read the body and send the next outcome."""
+        if "chunked" in (self.headers.get("Transfer-Encoding") or "").lower():
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().split(b";")[0].strip(), 16)
+                if size == 0:
+                    self.rfile.readline()
+                    break
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+            body = b"".join(chunks)
+        else:
+            body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        outcomes = self.server.outcomes
+        outcome = outcomes.pop(0) if len(outcomes) > 1 else outcomes[0]
+        self.server.received.append((self.command, body))
+        if outcome is None:
+            self.close_connection = True
+            return
+
+        if outcome < 400:
+            content = {"outcome": outcome}
+        else:
+            content = {"errors": [{"status": outcome, "message": "Unavailable"}]}
+        content = json.dumps(content).encode("utf-8")
+        self.send_response(outcome)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    do_PUT = do_POST = do_GET
+
+    def log_message(self, format, *args):
+        """Don't log the requests."""
+        pass
+
+
+class TestsAio(RtpyTestMixin):
+    """AsyncRtpy class tests."""
+
+    @pytest.fixture
+    def instantiate_async_af_object(
+        self, instantiate_af_objects_credentials_and_api_key
+    ):
+        """Create an AsyncRtpy object with the same settings and close it."""
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.async_af = rtpy.AsyncRtpy(self.settings)
+        yield
+        self.loop.run_until_complete(self.async_af.close())
+        self.loop.close()
+        asyncio.set_event_loop(None)
+
+    def test_self_call(self, instantiate_async_af_object):
+        """Test the __call__ dunder (binding to System health ping)."""
+        assert self.loop.run_until_complete(self.async_af()) == "OK"
+
+    def test_concurrent_calls(self, instantiate_async_af_object):
+        """Concurrent calls on multiple categories."""
+        calls = [
+            self.async_af.system_and_configuration.system_health_ping(),
+            self.async_af.repositories.get_repositories(),
+            self.async_af.searches.artifactory_query_language(
+                'items.find({"repo":"none"})'
+            ),
+        ]
+        r = self.loop.run_until_complete(asyncio.gather(*calls))
+        assert r[0] == "OK"
+        RtpyTestMixin.assert_isinstance_list(r[1])
+        RtpyTestMixin.assert_isinstance_dict(r[2])
+
+    def test_deploy_and_retrieve_artifact(self, instantiate_async_af_object):
+        """Deploy Artifact and Retrieve Artifact tests."""
+        repo_name = RtpyTestMixin.generate_random_string()
+        params = {"key": repo_name, "rclass": "local", "packageType": "generic"}
+        self.af.repositories.create_repository(params)
+        try:
+            self.loop.run_until_complete(
+                self.async_af.artifacts_and_storage.deploy_artifact(
+                    repo_name, "tests/assets/python_logo.png", "python_logo.png"
+                )
+            )
+            r = self.loop.run_until_complete(
+                self.async_af.artifacts_and_storage.retrieve_artifact(
+                    repo_name, "python_logo.png"
+                )
+            )
+            with open("tests/assets/python_logo.png", "rb") as files:
+                assert r.content == files.read()
+
+            # Empty payloads, the checksum headers don't turn into a JSON body
+            for options in [{"checksums": True}, {}]:
+                self.loop.run_until_complete(
+                    self.async_af.artifacts_and_storage.deploy_artifact(
+                        repo_name, b"", "empty.bin", **options
+                    )
+                )
+                r = self.af.artifacts_and_storage.file_info(repo_name, "empty.bin")
+                assert str(r["size"]) == "0"
+        finally:
+            self.af.repositories.delete_repository(repo_name)
+
+    def test_iter_artifactory_query_language(self, instantiate_async_af_object):
+        """Iterate asynchronously over the Artifactory Query Language results."""
+        repo_name = RtpyTestMixin.generate_random_string()
+        params = {"key": repo_name, "rclass": "local", "packageType": "generic"}
+        self.af.repositories.create_repository(params)
+        try:
+            names = []
+            for index in range(3):
+                names.append("python_logo_" + str(index) + ".png")
+                self.af.artifacts_and_storage.deploy_artifact(
+                    repo_name, "tests/assets/python_logo.png", names[-1]
+                )
+            query = (
+                'items.find({"repo":{"$eq":"'
+                + repo_name
+                + '"},"type":"file"}).sort({"$asc":["name"]})'
+            )
+            # Decoded pages even with the raw_response setting
+            for raw_response in [False, True]:
+                iterator = self.async_af.searches.iter_artifactory_query_language(
+                    query, page_size=2, settings={"raw_response": raw_response}
+                )
+                items = []
+                while True:
+                    try:
+                        items.append(self.loop.run_until_complete(iterator.__anext__()))
+                    except StopAsyncIteration:
+                        break
+                assert sorted(item["name"] for item in items) == names
+        finally:
+            self.af.repositories.delete_repository(repo_name)
+
+    def test_stream_json(self, instantiate_async_af_object):
+        """stream_json setting of the client with asynchronous iterators."""
+        repo_name = RtpyTestMixin.generate_random_string()
+        params = {"key": repo_name, "rclass": "local", "packageType": "generic"}
+        self.af.repositories.create_repository(params)
+        async_af = rtpy.AsyncRtpy(dict(self.settings, stream_json="results"))
+
+        async def calls(query):
+            r = await async_af.searches.artifactory_query_language(query)
+            streamed = [item["name"] async for item in r]
+            whole = await async_af.searches.artifactory_query_language(
+                query, settings={"stream_json": True}
+            )
+            iterated = [
+                item["name"]
+                async for item in async_af.searches.iter_artifactory_query_language(
+                    query, page_size=1
+                )
+            ]
+            return streamed, whole, iterated
+
+        try:
+            self.af.artifacts_and_storage.deploy_artifact(
+                repo_name, "tests/assets/python_logo.png", "python_logo.png"
+            )
+            query = 'items.find({"repo":{"$eq":"' + repo_name + '"},"type":"file"})'
+            streamed, whole, iterated = self.loop.run_until_complete(calls(query))
+            assert streamed == iterated == ["python_logo.png"]
+            RtpyTestMixin.assert_isinstance_dict(whole)
+        finally:
+            self.loop.run_until_complete(async_af.close())
+            self.af.repositories.delete_repository(repo_name)
+
+    def test_retries(self, tmpdir):
+        """Retries of the failed attempts (status codes and connection errors)."""
+        server = ScriptedServer(("127.0.0.1", 0), ScriptedHandler)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        loop = asyncio.new_event_loop()
+        metrics = rtpy.Metrics()
+
+        def run(outcomes, call, **retry):
+            server.outcomes = list(outcomes)
+            server.received = []
+            settings = {
+                "af_url": "http://127.0.0.1:"
+                + str(server.server_address[1])
+                + "/artifactory",
+                "api_key": "key",
+                "retry": dict({"backoff_base": 0, "jitter": False}, **retry),
+                "metrics": metrics,
+            }
+
+            async def scenario():
+                async_af = rtpy.AsyncRtpy(settings)
+                try:
+                    return await call(async_af)
+                finally:
+                    await async_af.close()
+
+            return loop.run_until_complete(scenario())
+
+        def version(async_af):
+            return async_af.system_and_configuration.version_and_addons_information()
+
+        try:
+            # GET retried until it succeeds
+            assert run([503, None, 200], version) == {"outcome": 200}
+            assert len(server.received) == 3
+
+            # Upload bodies sent again from the start
+            path = os.path.join(str(tmpdir), "artifact.bin")
+            content = os.urandom(64)
+            with open(path, "wb") as files:
+                files.write(content)
+            for options in [{}, {"chunk_size": 16}]:
+                run(
+                    [None, 503, 201],
+                    lambda async_af: async_af.artifacts_and_storage.deploy_artifact(
+                        "repo", path, "a.bin", **options
+                    ),
+                )
+                assert [body for verb, body in server.received] == [content] * 3
+
+            # POST not retried by default
+            r = run(
+                [503, 200],
+                lambda async_af: async_af.searches.artifactory_query_language(
+                    "items.find()", settings={"raw_response": True}
+                ),
+            )
+            assert r.status_code == 503 and len(server.received) == 1
+
+            # Gives up after max_attempts with the last response or error
+            with pytest.raises(rtpy.Rtpy.AfApiError) as error_info:
+                run([503], version, max_attempts=3)
+            assert error_info.value.status_code == 503 and len(server.received) == 3
+            metrics.reset()
+            with pytest.raises(aiohttp.ClientConnectionError):
+                run([None], version, max_attempts=3)
+            # aiohttp may itself send again a request to a closed connection
+            summary = metrics.summary()
+            assert [values["retries"] for values in summary.values()] == [2]
+        finally:
+            loop.close()
+            server.shutdown()
+            server.server_close()
+
+    def test_walk_folder(self, instantiate_async_af_object):
+        """Walk a folder tree asynchronously."""
+        repo_name = RtpyTestMixin.generate_random_string()
+        params = {"key": repo_name, "rclass": "local", "packageType": "generic"}
+        self.af.repositories.create_repository(params)
+        try:
+            for index in range(3):
+                self.af.artifacts_and_storage.deploy_artifact(
+                    repo_name,
+                    "tests/assets/python_logo.png",
+                    "a/b" + str(index) + "/python_logo.png",
+                )
+            # Decoded infos even with the raw_response setting
+            for deep_list_threshold, raw_response in [(None, False), (0, True)]:
+                iterator = self.async_af.artifacts_and_storage.walk_folder(
+                    repo_name,
+                    deep_list_threshold=deep_list_threshold,
+                    settings={"raw_response": raw_response},
+                )
+                paths = []
+                while True:
+                    try:
+                        path, _ = self.loop.run_until_complete(iterator.__anext__())
+                    except StopAsyncIteration:
+                        break
+                    paths.append(path)
+                assert sorted(paths) == ["", "a", "a/b0", "a/b1", "a/b2"]
+        finally:
+            self.af.repositories.delete_repository(repo_name)
+
+    def test_raise_af_api_error(self, instantiate_async_af_object):
+        """Errors are raised as with rtpy.Rtpy."""
+        with pytest.raises(self.async_af.AfApiError):
+            self.loop.run_until_complete(
+                self.async_af.repositories.repository_configuration(
+                    RtpyTestMixin.generate_random_string()
+                )
+            )
+
+    def test_metrics(self, instantiate_async_af_object):
+        """API calls recorded with the metrics setting."""
+        metrics = rtpy.Metrics()
+        async_af = rtpy.AsyncRtpy(dict(self.settings, metrics=metrics))
+        try:
+            r = self.loop.run_until_complete(
+                async_af.system_and_configuration.system_health_ping()
+            )
+            assert r == "OK"
+        finally:
+            self.loop.run_until_complete(async_af.close())
+        ping = metrics.summary()["[SYSTEM & CONFIGURATION] : System Health Ping"]
+        assert ping["count"] == 1 and ping["response_bytes"] == 2
+
+    def test_tracer(self, instantiate_async_af_object):
+        """API calls traced with the tracer setting."""
+        exporter = rtpy.MemorySpanExporter()
+        async_af = rtpy.AsyncRtpy(dict(self.settings, tracer=rtpy.Tracer(exporter)))
+        try:
+            r = self.loop.run_until_complete(
+                async_af.system_and_configuration.system_health_ping()
+            )
+            assert r == "OK"
+        finally:
+            self.loop.run_until_complete(async_af.close())
+        spans = {span.name: span for span in exporter.spans}
+        ping = spans["[SYSTEM & CONFIGURATION] : System Health Ping"]
+        assert ping.attributes["url.template"] == "api/system/ping"
+        assert ping.attributes["http.response.status_code"] == 200
+        for phase in ["connect", "server", "transfer"]:
+            assert spans[phase].parent_span_id == ping.span_id
+
+    def test_optional_keys_in_settings(self, instantiate_async_af_object):
+        """Optional keys in settings tests."""
+        r = self.loop.run_until_complete(
+            self.async_af.system_and_configuration.system_health_ping(
+                settings={"raw_response": True}
+            )
+        )
+        assert r.status_code == 200
@@ -0,0 +1,120 @@
+# coding: utf-8
+
+# Copyright (C) 2018 Orange
+#
+# This software is distributed under the terms and conditions of the 'Apache-2.0'
+# license which can be found in the 'LICENSE.md' file
+# or at 'http://www.apache.org/licenses/LICENSE-2.0'.
+
+"""Definitions of the tests for the ArtifactCache class in rtpy/artifact_cache.py."""
+
+from __future__ import unicode_literals
+import hashlib
+import os
+import shutil
+import time
+
+import pytest
+
+import rtpy
+from .mixins import RtpyTestMixin
+
+
+class TestsArtifactCache(RtpyTestMixin):
+    """ArtifactCache class tests."""
+
+    @pytest.fixture
+    def cache_directory(self):
+        """Create then remove the directory of the artifact cache."""
+        self.cache_directory = RtpyTestMixin.generate_random_string()
+        yield
+        shutil.rmtree(self.cache_directory, ignore_errors=True)
+
+    def test_store_and_lookup(self, cache_directory):
+        """Store, lookup and eviction tests."""
+        artifact_cache = rtpy.ArtifactCache(self.cache_directory, max_size=2500)
+        content = b"a" * 1000
+        sha256 = hashlib.sha256(content).hexdigest()
+
+        if artifact_cache.store("url/repo/a", content, "0" * 64) is not None:
+            raise self.RtpyTestError("Content not matching shouldn't be stored !")
+        if artifact_cache.store("url/repo/a", content) != sha256:
+            raise self.RtpyTestError("Wrong stored checksum !")
+
+        # Same content for another path, stored once
+        with open(os.path.join(self.cache_directory, "b.txt"), "wb") as files:
+            files.write(content)
+        artifact_cache.store("url/repo/b", os.path.join(self.cache_directory, "b.txt"))
+        path = artifact_cache.lookup("url/repo/b")
+        with open(path, "rb") as files:
+            if files.read() != content:
+                raise self.RtpyTestError("Wrong cached content !")
+        if artifact_cache.lookup("url/repo/a", "1" * 64) is not None:
+            raise self.RtpyTestError("A different checksum should be a miss !")
+        if (artifact_cache.hits, artifact_cache.misses) != (1, 1):
+            raise self.RtpyTestError("Wrong hits and misses !")
+
+        # The least recently used content is evicted
+        os.utime(path, (time.time() - 60, time.time() - 60))
+        artifact_cache.store("url/repo/c", b"c" * 1000)
+        artifact_cache.store("url/repo/d", b"d" * 1000)
+        if artifact_cache.lookup("url/repo/a") is not None:
+            raise self.RtpyTestError("The least recently used should be evicted !")
+        if artifact_cache.lookup("url/repo/d") is None:
+            raise self.RtpyTestError("The last stored content should be kept !")
+
+        # The checksum computed while downloading isn't computed again
+        sha256 = artifact_cache.store("url/repo/e", content, "2" * 64, verified=True)
+        if sha256 != "2" * 64:
+            raise self.RtpyTestError("The verified checksum should be trusted !")
+
+        artifact_cache.clear()
+        if artifact_cache.lookup("url/repo/d") is not None:
+            raise self.RtpyTestError("The cache should be empty !")
+
+    def test_artifact_cache_setting(
+        self, instantiate_af_objects_credentials_and_api_key, cache_directory
+    ):
+        """Retrieve and download artifacts through the artifact cache tests."""
+        with pytest.raises(rtpy.UserSettingsError):
+            rtpy.Rtpy(dict(self.settings, artifact_cache=self.cache_directory))
+
+        repo_name = RtpyTestMixin.generate_random_string()
+        params = {"key": repo_name, "rclass": "local", "packageType": "generic"}
+        self.af.repositories.create_repository(params)
+        try:
+            self.af.artifacts_and_storage.deploy_artifact(
+                repo_name, "tests/assets/python_logo.png", "python_logo.png"
+            )
+            with open("tests/assets/python_logo.png", "rb") as files:
+                content = files.read()
+
+            artifact_cache = rtpy.ArtifactCache(self.cache_directory)
+            af = rtpy.Rtpy(dict(self.settings, artifact_cache=artifact_cache))
+            for _ in range(2):
+                r = af.artifacts_and_storage.retrieve_artifact(
+                    repo_name, "python_logo.png"
+                )
+                if r.content != content:
+                    raise self.RtpyTestError("Wrong retrieved content !")
+            if (artifact_cache.hits, artifact_cache.misses) != (1, 1):
+                raise self.RtpyTestError("The second retrieval should be a hit !")
+
+            destination = os.path.join(self.cache_directory, "python_logo.png")
+            r = af.artifacts_and_storage.download_artifact(
+                repo_name, "python_logo.png", destination
+            )
+            if r["sha256"] != hashlib.sha256(content).hexdigest():
+                raise self.RtpyTestError("Wrong downloaded checksum !")
+            if artifact_cache.hits != 2:
+                raise self.RtpyTestError("The download should be a hit !")
+
+            # Modified artifact
+            af.artifacts_and_storage.deploy_artifact(
+                repo_name, b"new content", "python_logo.png"
+            )
+            r = af.artifacts_and_storage.retrieve_artifact(repo_name, "python_logo.png")
+            if r.content != b"new content":
+                raise self.RtpyTestError("A modified artifact should be a miss !")
+        finally:
+            self.af.repositories.delete_repository(repo_name)
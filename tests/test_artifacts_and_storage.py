@@ -9,6 +9,9 @@
 """Definitions of the tests for the ARTIFACTS AND STORAGE REST API Methods category."""
 
 from __future__ import unicode_literals
+import array
+import hashlib
+import io
 import os
 
 import pytest
@@ -209,6 +212,68 @@ class TestsArtifactsAndStorage(RtpyTestMixin):
         # def test_retrieve_latest_artifact():
         # def test_retrieve_build_artifacts_archive():"""
 
+    def test_download_artifact(
+        self,
+        instantiate_af_objects_credentials_and_api_key,
+        setup_then_destroy_test_env,
+    ):
+        """Download Artifact tests."""
+        with open("tests/assets/python_logo.png", "rb") as original:
+            original_content = original.read()
+
+        r = self.af.artifacts_and_storage.download_artifact(
+            self.repo_name, self.artifact_path, "myartifact.png", chunk_size=1024
+        )
+        RtpyTestMixin.assert_isinstance_dict(r)
+        with open("myartifact.png", "rb") as artifact:
+            if artifact.read() != original_content:
+                raise self.RtpyTestError("Downloaded content doesn't match!")
+        os.remove("myartifact.png")
+
+        if r["sha256"] != hashlib.sha256(original_content).hexdigest():
+            raise self.RtpyTestError("Incorrect sha256 checksum!")
+
+        artifact = io.BytesIO()
+        r = self.af.artifacts_and_storage.download_artifact(
+            self.repo_name, self.artifact_path, artifact
+        )
+        if artifact.getvalue() != original_content:
+            raise self.RtpyTestError("Downloaded content doesn't match!")
+
+        # The error response is loaded and its connection released
+        r = self.af.artifacts_and_storage.download_artifact(
+            self.repo_name,
+            "missing.png",
+            io.BytesIO(),
+            settings={"raw_response": True},
+        )
+        if not r.raw.closed:
+            raise self.RtpyTestError("The connection of the 404 wasn't released!")
+        if r.status_code != 404 or "errors" not in r.json():
+            raise self.RtpyTestError("The 404 response should be returned!")
+
+    def test_download_folder_or_repository_archive(
+        self,
+        instantiate_af_objects_credentials_and_api_key,
+        setup_then_destroy_test_env,
+    ):
+        """
+        Download Folder or Repository Archive tests.
+
+        Folder download is not allowed by default
+        catching the HTTP 403 so the test can pass
+
+        """
+        try:
+            r = self.af.artifacts_and_storage.download_folder_or_repository_archive(
+                self.repo_name, "", "zip", "myarchive.zip"
+            )
+            RtpyTestMixin.assert_isinstance_dict(r)
+            os.remove("myarchive.zip")
+        except self.af.AfApiError as error:
+            if error.status_code != 403:
+                raise error
+
     def test_retrieve_folder_or_repository_archive(
         self,
         instantiate_af_objects_credentials_and_api_key,
@@ -284,6 +349,65 @@ class TestsArtifactsAndStorage(RtpyTestMixin):
         RtpyTestMixin.assert_isinstance_dict(r)
         self.af.artifacts_and_storage.file_info(self.repo_name, "python_logo.png")
 
+        # Memory-mapped and chunked upload with progress and checksums
+        progress = []
+        r = self.af.artifacts_and_storage.deploy_artifact(
+            self.repo_name,
+            "tests/assets/python_logo.png",
+            "python_logo_chunked.png",
+            chunk_size=1024,
+            progress=lambda sent, total, throughput: progress.append((sent, total)),
+            checksums=True,
+        )
+        RtpyTestMixin.assert_isinstance_dict(r)
+        size = os.path.getsize("tests/assets/python_logo.png")
+        if progress[-1] != (size, size):
+            raise self.RtpyTestError("Progress wasn't reported properly!")
+
+        # Buffer and byte range
+        with open("tests/assets/python_logo.png", "rb") as artifact:
+            content = artifact.read()
+        r = self.af.artifacts_and_storage.deploy_artifact(
+            self.repo_name,
+            bytearray(content),
+            "python_logo_part.png",
+            byte_range=(0, 100),
+        )
+        r = self.af.artifacts_and_storage.file_info(
+            self.repo_name, "python_logo_part.png"
+        )
+        if r["checksums"]["sha1"] != hashlib.sha1(content[:100]).hexdigest():
+            raise self.RtpyTestError("Incorrect content for the byte range!")
+
+        # Buffer of 2-byte items, streamed in bytes
+        self.af.artifacts_and_storage.deploy_artifact(
+            self.repo_name,
+            array.array(str("H"), range(100)),
+            "array.bin",
+            chunk_size=64,
+        )
+        r = self.af.artifacts_and_storage.file_info(self.repo_name, "array.bin")
+        if str(r["size"]) != "200":
+            raise self.RtpyTestError("The whole array should be uploaded!")
+
+        # The server rejects incorrect checksums
+        with pytest.raises((self.af.AfApiError, self.af.MalformedAfApiError)):
+            self.af.artifacts_and_storage.deploy_artifact(
+                self.repo_name,
+                content,
+                "python_logo_bad_checksum.png",
+                checksums={"sha1": "0" * 40},
+            )
+
+        # Empty payloads, the checksum headers don't turn into a JSON body
+        for options in [{"checksums": True}, {"chunk_size": 1024}, {}]:
+            self.af.artifacts_and_storage.deploy_artifact(
+                self.repo_name, b"", "empty.bin", **options
+            )
+            r = self.af.artifacts_and_storage.file_info(self.repo_name, "empty.bin")
+            if str(r["size"]) != "0":
+                raise self.RtpyTestError("The artifact should be empty!")
+
     def test_deploy_artifact_by_checksum(
         self,
         instantiate_af_objects_credentials_and_api_key,
@@ -417,6 +541,54 @@ class TestsArtifactsAndStorage(RtpyTestMixin):
         )
         RtpyTestMixin.assert_isinstance_dict(r)
 
+    def test_walk_folder(
+        self,
+        instantiate_af_objects_credentials_and_api_key,
+        setup_then_destroy_test_env,
+    ):
+        """Walk Folder tests."""
+        for i in range(3):
+            self.af.artifacts_and_storage.deploy_artifact(
+                self.repo_name,
+                "tests/assets/python_logo.png",
+                "a/b" + str(i) + "/c/python_logo.png",
+            )
+        expected = ["", "a", "a/b0", "a/b0/c", "a/b1", "a/b1/c", "a/b2", "a/b2/c"]
+        expected = sorted(expected + [self.folder_name])
+
+        # folder_info calls only, then with the deep file list fallback
+        for deep_list_threshold in [None, 3, 0]:
+            folders = dict(
+                self.af.artifacts_and_storage.walk_folder(
+                    self.repo_name, deep_list_threshold=deep_list_threshold
+                )
+            )
+            if sorted(folders) != expected:
+                raise self.RtpyTestError("Missing or unexpected folders!")
+            names = sorted(child["uri"] for child in folders["a/b1"]["children"])
+            if names != ["/c"]:
+                raise self.RtpyTestError("Wrong children!")
+
+        folders = list(
+            self.af.artifacts_and_storage.walk_folder(
+                self.repo_name, "a/b2", deep_list_threshold=0
+            )
+        )
+        if [path for path, _ in folders] != ["a/b2", "a/b2/c"]:
+            raise self.RtpyTestError("Wrong folders of a subfolder!")
+
+        # The folder infos are decoded even with the raw_response setting
+        for deep_list_threshold in [None, 0]:
+            folders = dict(
+                self.af.artifacts_and_storage.walk_folder(
+                    self.repo_name,
+                    deep_list_threshold=deep_list_threshold,
+                    settings={"raw_response": True},
+                )
+            )
+            if sorted(folders) != expected:
+                raise self.RtpyTestError("Raw responses shouldn't be walked!")
+
     def test_get_background_tasks(
         self,
         instantiate_af_objects_credentials_and_api_key,
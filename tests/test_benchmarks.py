@@ -0,0 +1,45 @@
+# coding: utf-8
+
+# Copyright (C) 2018 Orange
+#
+# This software is distributed under the terms and conditions of the 'Apache-2.0'
+# license which can be found in the 'LICENSE.md' file
+# or at 'http://www.apache.org/licenses/LICENSE-2.0'.
+
+"""Definitions of the tests for the benchmarks package."""
+
+from __future__ import unicode_literals
+import json
+import os
+
+import benchmarks
+from benchmarks.__main__ import main
+from .mixins import RtpyTestMixin
+
+
+class TestsBenchmarks(RtpyTestMixin):
+    """Benchmarks package tests."""
+
+    def test_run_and_compare(self, tmpdir):
+        """Run a few benchmarks and compare them to a baseline."""
+        output = os.path.join(str(tmpdir), "results.json")
+        names = ["request_overhead", "convert_response_small", "concurrent_calls_1"]
+        assert main(names + ["-o", output, "-r", "1", "-s", "0.01"]) == 0
+        with open(output) as results_file:
+            results = json.load(results_file)
+        assert list(results["benchmarks"]) == names
+        for result in results["benchmarks"].values():
+            assert result["operations"] >= 1 and result["per_operation"] > 0
+        # Limit of the stand-in server recorded with its benchmarks
+        assert "note" in results["benchmarks"]["concurrent_calls_1"]
+        assert "note" not in results["benchmarks"]["request_overhead"]
+
+        baseline = json.loads(json.dumps(results))
+        baseline["benchmarks"]["request_overhead"]["per_operation"] /= 10
+        comparisons = benchmarks.compare(results, baseline)
+        regressions = [name for name, _, _, _, regression in comparisons if regression]
+        assert regressions == ["request_overhead"]
+        baseline_path = os.path.join(str(tmpdir), "baseline.json")
+        benchmarks.write_results(baseline, baseline_path)
+        arguments = ["-o", output, "-r", "1", "-s", "0.01", "-c", baseline_path]
+        assert main(["request_overhead"] + arguments) == 1
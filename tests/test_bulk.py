@@ -0,0 +1,355 @@
+# coding: utf-8
+
+# Copyright (C) 2018 Orange
+#
+# This software is distributed under the terms and conditions of the 'Apache-2.0'
+# license which can be found in the 'LICENSE.md' file
+# or at 'http://www.apache.org/licenses/LICENSE-2.0'.
+
+"""Definitions of the tests for the bulk operations defined in rtpy/bulk.py."""
+
+from __future__ import unicode_literals
+import os
+import shutil
+
+import pytest
+
+import rtpy
+from .mixins import RtpyTestMixin
+
+
+class TestsBulk(RtpyTestMixin):
+    """Bulk operations tests."""
+
+    @pytest.fixture
+    def setup_then_destroy_test_env(self):
+        """Create the test environement for each specific test."""
+        # setup
+        self.repo_name = RtpyTestMixin.generate_random_string()
+        self.params = {}
+        self.params["key"] = self.repo_name
+        self.params["rclass"] = "local"
+        self.params["packageType"] = "generic"
+        self.af.repositories.create_repository(self.params)
+
+        self.artifact_paths = ["python_logo.png"] + [
+            "folder/sub_folder/python_logo_" + str(i) + ".png" for i in range(5)
+        ]
+        for artifact_path in self.artifact_paths:
+            self.af.artifacts_and_storage.deploy_artifact(
+                self.repo_name, "tests/assets/python_logo.png", artifact_path
+            )
+        self.local_directory = RtpyTestMixin.generate_random_string()
+
+        yield
+
+        # teardown
+        self.af.repositories.delete_repository(self.repo_name)
+        shutil.rmtree(self.local_directory, ignore_errors=True)
+
+    def test_download(
+        self,
+        instantiate_af_objects_credentials_and_api_key,
+        setup_then_destroy_test_env,
+    ):
+        """Bulk download tests."""
+        query = 'items.find({"repo":{"$eq":"' + self.repo_name + '"}})'
+        r = self.af.bulk.download(query, self.local_directory, max_workers=3)
+        RtpyTestMixin.assert_isinstance_list(r)
+        if sorted(result["path"] for result in r) != sorted(self.artifact_paths):
+            raise self.RtpyTestError("Missing or unexpected artifacts!")
+        for result in r:
+            if result["status"] != "downloaded":
+                raise self.RtpyTestError("Artifact not downloaded!")
+            if not os.path.isfile(result["local_path"]):
+                raise self.RtpyTestError("Local file is missing!")
+
+        # Files are already downloaded
+        r = self.af.bulk.download(query, self.local_directory)
+        if set(result["status"] for result in r) != set(["skipped"]):
+            raise self.RtpyTestError("Existing files were downloaded again!")
+
+        # The results of the query are decoded even with the raw_response setting
+        af = rtpy.Rtpy(dict(self.settings, raw_response=True))
+        r = af.bulk.download(query, self.local_directory)
+        if sorted(result["path"] for result in r) != sorted(self.artifact_paths):
+            raise self.RtpyTestError("The results of the query should be decoded!")
+
+        # List of (repo_key, artifact_path) and errors
+        sources = [
+            (self.repo_name, "python_logo.png"),
+            (self.repo_name, "missing.png"),
+            (self.repo_name, "../outside.png"),
+        ]
+        r = self.af.bulk.download(sources, self.local_directory, include_repo_key=True)
+        statuses = dict((result["path"], result["status"]) for result in r)
+        assert statuses["python_logo.png"] == "downloaded"
+        assert statuses["missing.png"] == "failed"
+        assert statuses["../outside.png"] == "failed"
+        assert os.path.isfile(
+            os.path.join(self.local_directory, self.repo_name, "python_logo.png")
+        )
+
+    def test_deploy(
+        self,
+        instantiate_af_objects_credentials_and_api_key,
+        setup_then_destroy_test_env,
+    ):
+        """Bulk deploy tests."""
+        os.makedirs(os.path.join(self.local_directory, "folder"))
+        shutil.copy(
+            "tests/assets/python_logo.png",
+            os.path.join(self.local_directory, "folder", "python_logo.png"),
+        )
+        with open(os.path.join(self.local_directory, "new_file.txt"), "w") as files:
+            files.write(RtpyTestMixin.generate_random_string())
+        # Empty file
+        open(os.path.join(self.local_directory, "folder", "__init__.py"), "w").close()
+
+        r = self.af.bulk.deploy(
+            self.local_directory, self.repo_name, "deployed", max_workers=2
+        )
+        RtpyTestMixin.assert_isinstance_list(r)
+        statuses = dict((result["path"], result["status"]) for result in r)
+        # The logo is already stored in Artifactory, the text file is new
+        assert statuses["deployed/folder/python_logo.png"] == "deployed_by_checksum"
+        assert statuses["deployed/new_file.txt"] == "deployed"
+        assert statuses["deployed/folder/__init__.py"] in [
+            "deployed",
+            "deployed_by_checksum",
+        ]
+        r = self.af.artifacts_and_storage.file_info(
+            self.repo_name, "deployed/folder/__init__.py"
+        )
+        assert str(r["size"]) == "0"
+
+        r = self.af.bulk.deploy(
+            self.local_directory, self.repo_name, sha_type="sha256", hash_workers=0
+        )
+        for result in r:
+            if result["status"] != "deployed_by_checksum":
+                raise self.RtpyTestError("Artifact not deployed by checksum!")
+            self.af.artifacts_and_storage.file_info(self.repo_name, result["path"])
+
+    def test_properties(
+        self,
+        instantiate_af_objects_credentials_and_api_key,
+        setup_then_destroy_test_env,
+    ):
+        """Bulk properties tests."""
+        items = [
+            (self.repo_name, artifact_path, {"release": "1.0", "tags": ["a", "b"]})
+            for artifact_path in self.artifact_paths
+        ]
+        r = self.af.bulk.set_properties(items, collapse_folders=True)
+        RtpyTestMixin.assert_isinstance_list(r)
+        if sorted(result["path"] for result in r) != sorted(self.artifact_paths):
+            raise self.RtpyTestError("Missing or unexpected items!")
+        folders = dict((result["path"], result["folder"]) for result in r)
+        # All the files of the folder are in the batch
+        assert folders["folder/sub_folder/python_logo_0.png"] == "folder/sub_folder"
+        assert folders["python_logo.png"] is None
+
+        r = self.af.bulk.item_properties(
+            [(self.repo_name, artifact_path) for artifact_path in self.artifact_paths]
+        )
+        for result in r:
+            if result["properties"].get("release") != ["1.0"]:
+                raise self.RtpyTestError("Properties not set!")
+
+        r = self.af.bulk.delete_properties(
+            [(self.repo_name, "python_logo.png", ["release", "tags"])]
+        )
+        assert r[0]["status"] == "deleted"
+        r = self.af.bulk.item_properties([(self.repo_name, "python_logo.png")])
+        assert r[0]["status"] == "missing"
+
+    def test_copy_and_move(
+        self,
+        instantiate_af_objects_credentials_and_api_key,
+        setup_then_destroy_test_env,
+    ):
+        """Bulk copy and move tests."""
+        target_repo_name = RtpyTestMixin.generate_random_string()
+        params = {"key": target_repo_name, "rclass": "local", "packageType": "generic"}
+        self.af.repositories.create_repository(params)
+        try:
+            sources = [
+                (self.repo_name, artifact_path) for artifact_path in self.artifact_paths
+            ]
+            calls = self.af.bulk.plan_transfer(sources, target_repo_name)
+            paths = sorted(call["path"] for call in calls)
+            if paths != ["folder/sub_folder", "python_logo.png"]:
+                raise self.RtpyTestError("The folder should be copied with one call!")
+
+            # The folders are listed even with the raw_response setting
+            af = rtpy.Rtpy(dict(self.settings, raw_response=True))
+            calls = af.bulk.plan_transfer(sources, target_repo_name)
+            if sorted(call["path"] for call in calls) != paths:
+                raise self.RtpyTestError("The folders should be listed!")
+
+            r = self.af.bulk.copy(sources, target_repo_name, dry_run=True)
+            if set(result["status"] for result in r) != set(["planned"]):
+                raise self.RtpyTestError("The dry run shouldn't find conflicts!")
+            with pytest.raises(self.af.AfApiError):
+                self.af.artifacts_and_storage.file_info(
+                    target_repo_name, "python_logo.png"
+                )
+
+            r = self.af.bulk.copy(sources, target_repo_name)
+            RtpyTestMixin.assert_isinstance_list(r)
+            for result in r:
+                if result["status"] != "copied":
+                    raise self.RtpyTestError("Artifact not copied!")
+                self.af.artifacts_and_storage.file_info(
+                    target_repo_name, result["target_path"]
+                )
+
+            # Copied again: Artifactory would nest the folder in the existing one
+            calls = self.af.bulk.plan_transfer(sources, target_repo_name)
+            targets = sorted(call["target_path"] for call in calls)
+            if targets != ["folder", "python_logo.png"]:
+                raise self.RtpyTestError("The parent folder should be targeted!")
+            r = self.af.bulk.copy(sources, target_repo_name)
+            for result in r:
+                if result["status"] != "copied":
+                    raise self.RtpyTestError("Artifact not copied again!")
+            with pytest.raises(self.af.AfApiError):
+                self.af.artifacts_and_storage.folder_info(
+                    target_repo_name, "folder/sub_folder/sub_folder"
+                )
+
+            # Renamed to an existing folder: copied one by one
+            r = self.af.bulk.copy(
+                sources,
+                lambda repo_key, path: (
+                    target_repo_name,
+                    path.replace("folder/sub_folder", "folder"),
+                ),
+            )
+            for result in r:
+                if result["status"] != "copied" or result["folder"] is not None:
+                    raise self.RtpyTestError("Artifact not copied one by one!")
+                self.af.artifacts_and_storage.file_info(
+                    target_repo_name, result["target_path"]
+                )
+
+            # Moved under another folder
+            r = self.af.bulk.move(
+                sources,
+                lambda repo_key, path: (target_repo_name, "moved/" + path),
+                collapse_folders=False,
+            )
+            for result in r:
+                if result["status"] != "moved" or result["folder"] is not None:
+                    raise self.RtpyTestError("Artifact not moved one by one!")
+                self.af.artifacts_and_storage.file_info(
+                    target_repo_name, "moved/" + result["path"]
+                )
+        finally:
+            self.af.repositories.delete_repository(target_repo_name)
+
+    def test_delete(
+        self,
+        instantiate_af_objects_credentials_and_api_key,
+        setup_then_destroy_test_env,
+    ):
+        """Bulk delete tests."""
+        with pytest.raises(self.af.RtpyError):
+            self.af.bulk.delete([], trash_can="purge")
+
+        sources = [
+            (self.repo_name, artifact_path) for artifact_path in self.artifact_paths
+        ]
+        sources.append((self.repo_name, "missing.png"))
+        r = self.af.bulk.delete(sources, trash_can="clean", max_workers=2)
+        RtpyTestMixin.assert_isinstance_list(r)
+        statuses = dict((result["path"], result["status"]) for result in r)
+        assert statuses.pop("missing.png") == "missing"
+        if set(statuses.values()) != set(["deleted"]):
+            raise self.RtpyTestError("Artifact not deleted!")
+        folders = dict((result["path"], result["folder"]) for result in r)
+        assert folders["folder/sub_folder/python_logo_4.png"] == "folder/sub_folder"
+        for artifact_path in self.artifact_paths:
+            with pytest.raises(self.af.AfApiError):
+                self.af.artifacts_and_storage.file_info(self.repo_name, artifact_path)
+
+    def test_sync(
+        self,
+        instantiate_af_objects_credentials_and_api_key,
+        setup_then_destroy_test_env,
+    ):
+        """Bulk sync tests."""
+        state_file = os.path.join(self.local_directory, "state.json")
+        source = os.path.join(self.local_directory, "site")
+        os.makedirs(os.path.join(source, "css"))
+        for name in ["index.html", "css/style.css"]:
+            with open(os.path.join(source, *name.split("/")), "wb") as files:
+                files.write(name.encode("utf-8"))
+
+        # Empty file
+        open(os.path.join(source, "css", ".keep"), "wb").close()
+
+        r = self.af.bulk.sync(
+            source, self.repo_name, "site", direction="upload", state_file=state_file
+        )
+        statuses = dict((result["path"], result["status"]) for result in r)
+        if statuses.pop("site/css/.keep") not in ["deployed", "deployed_by_checksum"]:
+            raise self.RtpyTestError("The empty file should be uploaded!")
+        if statuses != {
+            "site/css/style.css": "deployed",
+            "site/index.html": "deployed",
+        }:
+            raise self.RtpyTestError("Wrong uploads!")
+        r = self.af.artifacts_and_storage.file_info(self.repo_name, "site/css/.keep")
+        if str(r["size"]) != "0":
+            raise self.RtpyTestError("The uploaded file should be empty!")
+
+        # Nothing changed, nothing transferred
+        r = self.af.bulk.sync(source, self.repo_name, "site", state_file=state_file)
+        if set(result["status"] for result in r) != set(["unchanged"]):
+            raise self.RtpyTestError("The files should be unchanged!")
+
+        # Changes on each side, then on both sides
+        with open(os.path.join(source, "index.html"), "wb") as files:
+            files.write(b"new index")
+        self.af.artifacts_and_storage.deploy_artifact(
+            self.repo_name, b"new style", "site/css/style.css"
+        )
+        r = self.af.bulk.sync(source, self.repo_name, "site", state_file=state_file)
+        actions = dict((result["path"], result["action"]) for result in r)
+        if actions != {
+            "site/css/.keep": None,
+            "site/css/style.css": "download",
+            "site/index.html": "upload",
+        }:
+            raise self.RtpyTestError("Wrong two-way sync!")
+        with open(os.path.join(source, "css", "style.css"), "rb") as files:
+            if files.read() != b"new style":
+                raise self.RtpyTestError("Wrong downloaded content!")
+
+        with open(os.path.join(source, "index.html"), "wb") as files:
+            files.write(b"local index")
+        self.af.artifacts_and_storage.deploy_artifact(
+            self.repo_name, b"remote index", "site/index.html"
+        )
+        r = self.af.bulk.sync(source, self.repo_name, "site", state_file=state_file)
+        statuses = dict((result["path"], result["status"]) for result in r)
+        if statuses["site/index.html"] != "conflict":
+            raise self.RtpyTestError("The file changed on both sides is a conflict!")
+
+        # Deletions
+        os.remove(os.path.join(source, "css", "style.css"))
+        r = self.af.bulk.sync(
+            source, self.repo_name, "site", delete=True, state_file=state_file
+        )
+        actions = dict((result["path"], result["action"]) for result in r)
+        if actions["site/css/style.css"] != "delete_remote":
+            raise self.RtpyTestError("The deletion should be propagated!")
+        with pytest.raises(self.af.AfApiError):
+            self.af.artifacts_and_storage.file_info(
+                self.repo_name, "site/css/style.css"
+            )
+
+        with pytest.raises(self.af.RtpyError):
+            self.af.bulk.sync(source, self.repo_name, direction="push")
@@ -0,0 +1,132 @@
+# coding: utf-8
+
+# Copyright (C) 2018 Orange
+#
+# This software is distributed under the terms and conditions of the 'Apache-2.0'
+# license which can be found in the 'LICENSE.md' file
+# or at 'http://www.apache.org/licenses/LICENSE-2.0'.
+
+"""Definitions of the tests for the ResponseCache class defined in rtpy/cache.py."""
+
+from __future__ import unicode_literals
+
+import pytest
+import requests
+
+import rtpy
+from .mixins import RtpyTestMixin
+
+
+class TestsCache(RtpyTestMixin):
+    """ResponseCache class tests."""
+
+    def response(self, content=b"{}", status_code=200):
+        """Build a requests.Response with its content loaded."""
+        response = requests.Response()
+        response.status_code = status_code
+        response._content = content
+        return response
+
+    def test_ttl_and_lru(self):
+        """Time to live and LRU eviction tests."""
+        cache = rtpy.ResponseCache(
+            max_entries=2, ttl=60, ttls={"api/system*": 0, "api/system/version": 5}
+        )
+        if cache.ttl_for("api/system/version") != 5 or cache.ttl_for("api/x") != 60:
+            raise self.RtpyTestError("Wrong time to live !")
+
+        # Disabled by the time to live, errors aren't stored
+        cache.put("api/system", "user", self.response())
+        cache.put("api/repositories/a", "user", self.response(status_code=400))
+        if len(cache):
+            raise self.RtpyTestError("The responses shouldn't be stored !")
+
+        cache.put("api/repositories/a", "user", self.response(b"a"))
+        cache.put("api/repositories/b", "user", self.response(b"b"))
+        if cache.get("api/repositories/a", "other_user") is not None:
+            raise self.RtpyTestError("Responses must be cached per user !")
+        cache.get("api/repositories/a", "user")
+        cache.put("api/repositories/c", "user", self.response(b"c"))
+        if cache.get("api/repositories/b", "user") is not None:
+            raise self.RtpyTestError("The least recently used response is evicted !")
+        if cache.get("api/repositories/a", "user").content != b"a":
+            raise self.RtpyTestError("Wrong cached response !")
+
+    def test_revalidate(self):
+        """Conditional GET tests."""
+        cache = rtpy.ResponseCache(ttl=0)
+        response = self.response(b"content")
+        response.headers["ETag"] = "1234"
+        response.headers["Last-Modified"] = "Mon, 01 Jan 2018 00:00:00 GMT"
+        cache.put("repo/file.txt", "user", response)
+        if cache.get("repo/file.txt", "user") is not None:
+            raise self.RtpyTestError("The response should be expired !")
+
+        headers = cache.conditional_headers("repo/file.txt", "user")
+        expected_headers = {
+            "If-None-Match": "1234",
+            "If-Modified-Since": "Mon, 01 Jan 2018 00:00:00 GMT",
+        }
+        if headers != expected_headers:
+            raise self.RtpyTestError("Wrong conditional headers !")
+
+        not_modified = self.response(b"", 304)
+        not_modified.headers["ETag"] = "5678"
+        r = cache.refresh("repo/file.txt", "user", not_modified)
+        if r is not response or cache.revalidations != 1:
+            raise self.RtpyTestError("The cached response should be returned !")
+        headers = cache.conditional_headers("repo/file.txt", "user")
+        if headers["If-None-Match"] != "5678":
+            raise self.RtpyTestError("The validators should be updated !")
+
+        # Without validators nor revalidation
+        cache = rtpy.ResponseCache(ttl=0, revalidate=False)
+        cache.put("repo/file.txt", "user", response)
+        if len(cache) or cache.conditional_headers("repo/file.txt", "user"):
+            raise self.RtpyTestError("The response shouldn't be stored !")
+
+    def test_invalidate(self):
+        """Invalidation tests."""
+        cache = rtpy.ResponseCache()
+        paths = [
+            "api/repositories",
+            "api/repositories/a",
+            "api/storage/a/folder",
+            "api/storage/a/folder/file.txt",
+            "api/storage/b/file.txt?properties",
+            "a/folder/file.txt",
+        ]
+        for path in paths:
+            cache.put(path, "user", self.response())
+
+        # Parents and children of the resource
+        cache.invalidate("a/folder;prop=1")
+        remaining = [path for path in paths if cache.get(path, "user")]
+        if remaining != ["api/repositories", "api/repositories/a", paths[4]]:
+            raise self.RtpyTestError("Wrong invalidated responses !")
+
+        # Copy and move targets
+        cache.invalidate("api/copy/c/file.txt?to=/b/file.txt")
+        if cache.get(paths[4], "user") is not None:
+            raise self.RtpyTestError("The copy target should be invalidated !")
+
+        cache.invalidate("api/repositories/a")
+        if len(cache):
+            raise self.RtpyTestError("The repositories should be invalidated !")
+
+    def test_cache_setting(self, instantiate_af_objects_credentials_and_api_key):
+        """Cache setting tests."""
+        with pytest.raises(rtpy.UserSettingsError):
+            rtpy.Rtpy(dict(self.settings, cache={}))
+
+        cache = rtpy.ResponseCache()
+        af = rtpy.Rtpy(dict(self.settings, cache=cache))
+        r1 = af.system_and_configuration.version_and_addons_information()
+        r2 = af.system_and_configuration.version_and_addons_information()
+        if r1 != r2 or cache.hits != 1:
+            raise self.RtpyTestError("The second call should be cached !")
+        af.system_and_configuration.version_and_addons_information(
+            settings={"cache": None}
+        )
+        if cache.hits != 1:
+            raise self.RtpyTestError("The cache should be disabled !")
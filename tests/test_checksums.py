@@ -0,0 +1,92 @@
+# coding: utf-8
+
+# Copyright (C) 2018 Orange
+#
+# This software is distributed under the terms and conditions of the 'Apache-2.0'
+# license which can be found in the 'LICENSE.md' file
+# or at 'http://www.apache.org/licenses/LICENSE-2.0'.
+
+"""Definitions of the tests for the functions defined in rtpy/checksums.py."""
+
+from __future__ import unicode_literals
+import array
+import hashlib
+import os
+import struct
+
+from rtpy.checksums import file_checksums, map_file_checksums
+from .mixins import RtpyTestMixin
+
+
+class TestsChecksums(RtpyTestMixin):
+    """Checksums functions tests."""
+
+    content = os.urandom(3 * 1024 + 17)
+
+    def expected(self, content):
+        """Return the checksums of content computed with hashlib."""
+        return {
+            "md5": hashlib.md5(content).hexdigest(),
+            "sha1": hashlib.sha1(content).hexdigest(),
+            "sha256": hashlib.sha256(content).hexdigest(),
+        }
+
+    def test_file_checksums(self):
+        """file_checksums tests."""
+        with open("checksums.bin", "wb") as files:
+            files.write(self.content)
+        with open("empty.bin", "wb"):
+            pass
+        try:
+            # File, several chunks
+            r = file_checksums("checksums.bin", chunk_size=1000)
+            if r != self.expected(self.content):
+                raise self.RtpyTestError("Wrong file checksums !")
+
+            # Buffer
+            r = file_checksums(bytearray(self.content))
+            if r != self.expected(self.content):
+                raise self.RtpyTestError("Wrong buffer checksums !")
+
+            # Buffer of 2-byte items
+            r = file_checksums(array.array(str("H"), range(100)), chunk_size=64)
+            if r != self.expected(struct.pack(str("100H"), *range(100))):
+                raise self.RtpyTestError("Wrong array checksums !")
+
+            # Subset of the algorithms and byte range
+            r = file_checksums("checksums.bin", ["sha256"], 100, (10, 1010))
+            if r != {"sha256": hashlib.sha256(self.content[10:1010]).hexdigest()}:
+                raise self.RtpyTestError("Wrong byte range checksums !")
+
+            # Empty file
+            r = file_checksums("empty.bin")
+            if r != self.expected(b""):
+                raise self.RtpyTestError("Wrong empty file checksums !")
+        finally:
+            os.remove("checksums.bin")
+            os.remove("empty.bin")
+
+    def test_map_file_checksums(self):
+        """map_file_checksums tests."""
+        # More files than a batch sent to a process
+        paths = ["checksums_" + str(index) + ".bin" for index in range(20)]
+        for index, path in enumerate(paths):
+            with open(path, "wb") as files:
+                files.write(self.content[: index * 100])
+        try:
+            for processes in [False, True]:
+                r = list(
+                    map_file_checksums(
+                        paths + ["missing.bin"], max_workers=2, processes=processes
+                    )
+                )
+                if [path for path, _ in r] != paths + ["missing.bin"]:
+                    raise self.RtpyTestError("Results are not in order !")
+                for index, (path, checksums) in enumerate(r[:-1]):
+                    if checksums != self.expected(self.content[: index * 100]):
+                        raise self.RtpyTestError("Wrong checksums for " + path)
+                if not isinstance(r[-1][1], (IOError, OSError)):
+                    raise self.RtpyTestError("Missing file error not returned !")
+        finally:
+            for path in paths:
+                os.remove(path)
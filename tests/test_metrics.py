@@ -0,0 +1,98 @@
+# coding: utf-8
+
+# Copyright (C) 2018 Orange
+#
+# This software is distributed under the terms and conditions of the 'Apache-2.0'
+# license which can be found in the 'LICENSE.md' file
+# or at 'http://www.apache.org/licenses/LICENSE-2.0'.
+
+"""Definitions of the tests for the Metrics class defined in rtpy/metrics.py."""
+
+from __future__ import unicode_literals
+import io
+import os
+
+import pytest
+
+import rtpy
+from .mixins import RtpyTestMixin
+
+
+class TestsMetrics(RtpyTestMixin):
+    """Metrics class tests."""
+
+    def test_histograms_and_prometheus(self, tmpdir):
+        """Quantiles, summary and Prometheus text exposition tests."""
+        with pytest.raises(ValueError):
+            rtpy.Metrics(buckets=[0, 1])
+
+        metrics = rtpy.Metrics(buckets=[0.1, 1, 10])
+        for duration in [0.05] * 51 + [0.5] * 48 + [5]:
+            metrics.record("[SEARCHES] : Property Search", "GET", 200, duration)
+        metrics.record("[SEARCHES] : Property Search", "GET", 404, 0.5)
+        metrics.record(
+            '[X] : "Odd" \\ name', "PUT", None, 20, request_bytes=10, retries=3
+        )
+
+        if metrics.quantile(0.5, "[SEARCHES] : Property Search") > 0.1:
+            raise self.RtpyTestError("Wrong p50 !")
+        summary = metrics.summary()
+        search = summary["[SEARCHES] : Property Search"]
+        if search["count"] != 101 or search["errors"] != 1:
+            raise self.RtpyTestError("Wrong summary counts !")
+        if not 0.1 < search["p99"] <= 1 or summary['[X] : "Odd" \\ name']["p99"] != 10:
+            raise self.RtpyTestError("Wrong p99 !")
+
+        text = metrics.to_prometheus()
+        expected_lines = [
+            "# TYPE rtpy_request_duration_seconds histogram",
+            'rtpy_request_duration_seconds_bucket{api_method="[SEARCHES] : Property '
+            'Search",verb="GET",status="200",le="1.0"} 99',
+            'rtpy_request_duration_seconds_bucket{api_method="[SEARCHES] : Property '
+            'Search",verb="GET",status="200",le="+Inf"} 100',
+            'rtpy_request_duration_seconds_count{api_method="[SEARCHES] : Property '
+            'Search",verb="GET",status="404"} 1',
+            'rtpy_retries_total{api_method="[X] : \\"Odd\\" \\\\ name",verb="PUT",'
+            'status="error"} 3',
+            'rtpy_request_bytes_total{api_method="[X] : \\"Odd\\" \\\\ name",'
+            'verb="PUT",status="error"} 10',
+        ]
+        for line in expected_lines:
+            if line not in text.splitlines():
+                raise self.RtpyTestError("Missing line : " + line)
+
+        path = os.path.join(str(tmpdir), "rtpy.prom")
+        metrics.write_prometheus(path)
+        with io.open(path, encoding="utf-8") as metrics_file:
+            assert metrics_file.read() == text
+        received = []
+        metrics.write_prometheus(received.append)
+        assert received == [text]
+
+        metrics.reset()
+        assert metrics.snapshot() == [] and metrics.quantile(0.5) is None
+
+    def test_metrics_setting(self, instantiate_af_objects_credentials_and_api_key):
+        """API calls recorded with the metrics setting."""
+        with pytest.raises(rtpy.UserSettingsError):
+            rtpy.Rtpy(dict(self.settings, metrics={}))
+
+        metrics = rtpy.Metrics()
+        af = rtpy.Rtpy(dict(self.settings, metrics=metrics))
+        af.system_and_configuration.system_health_ping()
+        af.repositories.get_repositories()
+        with pytest.raises(af.AfApiError):
+            af.repositories.repository_configuration(
+                RtpyTestMixin.generate_random_string()
+            )
+        # Not recorded
+        af.system_and_configuration.system_health_ping(settings={"metrics": None})
+
+        summary = metrics.summary()
+        ping = summary["[SYSTEM & CONFIGURATION] : System Health Ping"]
+        if ping["count"] != 1 or ping["response_bytes"] != 2 or ping["errors"]:
+            raise self.RtpyTestError("Wrong ping metrics !")
+        if summary["[REPOSITORIES] : Repository Configuration"]["errors"] != 1:
+            raise self.RtpyTestError("The error should be recorded !")
+        if len(summary) != 3 or not all(values["p50"] for values in summary.values()):
+            raise self.RtpyTestError("Wrong summary !")
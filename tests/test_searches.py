@@ -9,9 +9,11 @@
 """Definitions of the test for the SEARCHES REST API Methods category."""
 
 from __future__ import unicode_literals
+import shutil
 
 import pytest
 
+import rtpy
 from .mixins import RtpyTestMixin
 
 
@@ -56,6 +58,107 @@ class TestsSearches(RtpyTestMixin):
         if not r["results"]:
             raise self.RtpyTestError("results shouldn't be an empty list!")
 
+    def test_artifactory_query_language_stream_json(
+        self,
+        instantiate_af_objects_credentials_and_api_key,
+        setup_then_destroy_test_env,
+    ):
+        """Artifactory Query Language with streamed JSON results tests."""
+        query = 'items.find({"repo":{"$eq":"' + self.repo_name + '"}})'
+        r = self.af.searches.artifactory_query_language(
+            query, settings={"stream_json": "results"}
+        )
+        if isinstance(r, dict):
+            raise self.RtpyTestError("An iterator should be returned!")
+        items = list(r)
+        if self.artifact_path not in [item["name"] for item in items]:
+            raise self.RtpyTestError("The artifact should be in the results!")
+
+    def test_stream_json_client_setting(
+        self,
+        instantiate_af_objects_credentials_and_api_key,
+        setup_then_destroy_test_env,
+    ):
+        """stream_json setting of the client tests."""
+        af = rtpy.Rtpy(dict(self.settings, stream_json="results"))
+        query = 'items.find({"repo":{"$eq":"' + self.repo_name + '"}})'
+        r = af.searches.artifactory_query_language(query)
+        if isinstance(r, dict):
+            raise self.RtpyTestError("An iterator should be returned!")
+        if self.artifact_path not in [item["name"] for item in r]:
+            raise self.RtpyTestError("The artifact should be in the results!")
+
+        # The documents without a "results" list are returned as a whole
+        r = af.artifacts_and_storage.file_info(self.repo_name, self.artifact_path)
+        RtpyTestMixin.assert_isinstance_dict(r)
+        r = af.searches.artifactory_query_language(
+            query, settings={"stream_json": True}
+        )
+        RtpyTestMixin.assert_isinstance_dict(r)
+
+        # The internal calls decode the whole document
+        r = af.searches.iter_artifactory_query_language(query, page_size=1)
+        if self.artifact_path not in [item["name"] for item in r]:
+            raise self.RtpyTestError("The artifact should be iterated!")
+        local_directory = RtpyTestMixin.generate_random_string()
+        try:
+            r = af.bulk.download(query, local_directory)
+            downloaded = [
+                result["path"] for result in r if result["status"] == "downloaded"
+            ]
+            if self.artifact_path not in downloaded:
+                raise self.RtpyTestError("The artifact should be downloaded!")
+        finally:
+            shutil.rmtree(local_directory, ignore_errors=True)
+
+        af = rtpy.Rtpy(dict(self.settings, stream_json="children"))
+        paths = [
+            path for path, info in af.artifacts_and_storage.walk_folder(self.repo_name)
+        ]
+        if sorted(paths) != sorted(["", self.folder_name]):
+            raise self.RtpyTestError("All the folders should be walked!")
+
+    def test_iter_artifactory_query_language(
+        self,
+        instantiate_af_objects_credentials_and_api_key,
+        setup_then_destroy_test_env,
+    ):
+        """Iterate over the Artifactory Query Language results tests."""
+        names = ["python_logo.png"]
+        for index in range(4):
+            names.append("python_logo_" + str(index) + ".png")
+            self.af.artifacts_and_storage.deploy_artifact(
+                self.repo_name, "tests/assets/python_logo.png", names[-1]
+            )
+        query = (
+            'items.find({"repo":{"$eq":"'
+            + self.repo_name
+            + '"},"name":{"$match":"python_logo*"}}).sort({"$asc":["name"]})'
+        )
+        for prefetch in [True, False]:
+            r = self.af.searches.iter_artifactory_query_language(
+                query, page_size=2, prefetch=prefetch
+            )
+            if sorted(item["name"] for item in r) != sorted(names):
+                raise self.RtpyTestError("All the results should be iterated!")
+
+        # Offset and limit in the query
+        r = self.af.searches.iter_artifactory_query_language(
+            query + ".offset(1).limit(3)", page_size=2
+        )
+        if len(list(r)) != 3:
+            raise self.RtpyTestError("The limit of the query should be respected!")
+
+        # The pages are decoded even with the raw_response setting
+        r = self.af.searches.iter_artifactory_query_language(
+            query, page_size=2, settings={"raw_response": True}
+        )
+        if sorted(item["name"] for item in r) != sorted(names):
+            raise self.RtpyTestError("Raw responses shouldn't be iterated!")
+
+        with pytest.raises(self.af.RtpyError):
+            list(self.af.searches.iter_artifactory_query_language(query, page_size=0))
+
     # Unsupported methods
     # def test_artifact_search_quick_search(self)
     # def test_archive_entries_search_class_search()
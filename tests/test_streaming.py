@@ -0,0 +1,138 @@
+# coding: utf-8
+
+# Copyright (C) 2018 Orange
+#
+# This software is distributed under the terms and conditions of the 'Apache-2.0'
+# license which can be found in the 'LICENSE.md' file
+# or at 'http://www.apache.org/licenses/LICENSE-2.0'.
+
+"""Definitions of the tests for the functions defined in rtpy/streaming.py."""
+
+from __future__ import unicode_literals
+import io
+import json
+
+import pytest
+import requests
+
+from rtpy.streaming import JsonItemsParser, stream_json_items
+from .mixins import RtpyTestMixin
+
+
+class TestsStreaming(RtpyTestMixin):
+    """Streaming functions tests."""
+
+    document = {
+        "uri": "http://localhost/api/storage/repo",
+        "files": [
+            {"uri": "/file_" + str(index), "size": index, "sha1": None, "x": [1.5]}
+            for index in range(50)
+        ],
+        "range": {"total": 50, "names": ["été", 'a"]}']},
+    }
+
+    def parse(self, content, key, chunk_size, streaming=True):
+        """Feed content to a parser in chunks and return all the items."""
+        parser = JsonItemsParser(key)
+        items = []
+        for index in range(0, len(content), chunk_size):
+            items.extend(parser.feed(content[index : index + chunk_size]))
+        items.extend(parser.close())
+        if parser.streaming is not streaming:
+            raise self.RtpyTestError("Wrong streaming decision !")
+        return items
+
+    def test_json_items_parser(self):
+        """JsonItemsParser tests."""
+        content = json.dumps(self.document, ensure_ascii=False).encode("utf-8")
+        for chunk_size in [1, 2, 7, 64, len(content)]:
+            items = self.parse(content, "files", chunk_size)
+            if items != self.document["files"]:
+                raise self.RtpyTestError("Wrong items parsed !")
+
+        # Top-level list, numbers split between chunks
+        if self.parse(b"[12, 3.5, true, null]", True, 1) != [12, 3.5, True, None]:
+            raise self.RtpyTestError("Wrong top-level list items parsed !")
+
+        # No list to stream : top-level object, missing member, member not a list,
+        # top-level list not named
+        for content, key in [
+            (content, True),
+            (b'{"results": []}', "files"),
+            (b'{"files": {"a": [1]}}', "files"),
+            (b"[1, 2]", "files"),
+            (b'"text"', True),
+        ]:
+            if self.parse(content, key, 3, streaming=False) != []:
+                raise self.RtpyTestError("No item should be parsed !")
+
+        # Empty list
+        if self.parse(b'{"a": [1], "results": []}', "results", 3) != []:
+            raise self.RtpyTestError("No item should be parsed !")
+
+        # Escapes and brackets inside strings split between chunks
+        items = ["a\\", 'b"c', {"k": ']}\\"', "l": [[], {}]}, -1e-3]
+        content = json.dumps({"results": items}).encode("utf-8")
+        for chunk_size in [1, 2, 3]:
+            if self.parse(content, "results", chunk_size) != items:
+                raise self.RtpyTestError("Wrong escaped items parsed !")
+
+    def test_json_items_parser_large_item(self):
+        """A large item split in many chunks is not decoded again with each chunk."""
+        item = {
+            "name": "x" * 200000,
+            "children": [{"a": index} for index in range(5000)],
+        }
+        content = json.dumps({"results": [item, 1]}).encode("utf-8")
+        parser = JsonItemsParser("results")
+        decoded = []
+        raw_decode = parser._decoder.raw_decode
+
+        def counting_raw_decode(text, position=0):
+            decoded.append(len(text) - position)
+            return raw_decode(text, position)
+
+        parser._decoder.raw_decode = counting_raw_decode
+        items = []
+        for index in range(0, len(content), 1024):
+            items.extend(parser.feed(content[index : index + 1024]))
+        items.extend(parser.close())
+        if items != [item, 1]:
+            raise self.RtpyTestError("Wrong large item parsed !")
+        # One attempt with the first chunk, one decoding once the item is complete
+        if len(decoded) > 4 or sum(decoded) > 2 * len(content):
+            raise self.RtpyTestError("The large item was decoded several times !")
+
+    def test_stream_json_items(self):
+        """stream_json_items tests."""
+
+        def streamed_response(content):
+            response = requests.Response()
+            response.status_code = 200
+            response.raw = io.BytesIO(content)
+            return response
+
+        content = json.dumps(self.document).encode("utf-8")
+        response = streamed_response(content)
+        items = stream_json_items(response, "files", chunk_size=16)
+        if list(items) != self.document["files"]:
+            raise self.RtpyTestError("Wrong items streamed !")
+
+        # No list to stream or invalid JSON, the content is loaded as a whole
+        for content, key in [(content, True), (content, "range"), (b"text", True)]:
+            response = streamed_response(content)
+            if stream_json_items(response, key, chunk_size=16) is not None:
+                raise self.RtpyTestError("The content should not be streamed !")
+            if response.content != content:
+                raise self.RtpyTestError("The whole content should be loaded !")
+
+    def test_json_items_parser_errors(self):
+        """JsonItemsParser errors tests."""
+        for content in [
+            b'{"results": [1',
+            b'{"results": [1,,2]}',
+            b'{"a" 1}',
+            b'{"results": [1 2]}',
+        ]:
+            with pytest.raises(ValueError):
+                self.parse(content, "results", 4)
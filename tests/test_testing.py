@@ -0,0 +1,105 @@
+# coding: utf-8
+
+# Copyright (C) 2018 Orange
+#
+# This software is distributed under the terms and conditions of the 'Apache-2.0'
+# license which can be found in the 'LICENSE.md' file
+# or at 'http://www.apache.org/licenses/LICENSE-2.0'.
+
+"""Definitions of the tests for the StandInServer class defined in rtpy/testing.py."""
+
+from __future__ import unicode_literals
+import time
+
+import pytest
+
+import rtpy
+from rtpy.testing import StandInServer
+from .mixins import RtpyTestMixin
+
+
+class TestsStandInServer(RtpyTestMixin):
+    """StandInServer class tests."""
+
+    def test_latency_and_bandwidth(self):
+        """Latency, bandwidth and counters tests."""
+        with pytest.raises(ValueError):
+            StandInServer(bandwidth=0)
+
+        with StandInServer(latency=0.05) as server:
+            af = rtpy.Rtpy(server.settings())
+            start = time.time()
+            for _ in range(3):
+                af.system_and_configuration.system_health_ping()
+            if time.time() - start < 0.15:
+                raise self.RtpyTestError("The latency wasn't applied !")
+
+            server.latency = 0
+            server.bandwidth = 200 * 1024
+            params = {"key": "stand-in", "rclass": "local", "packageType": "generic"}
+            af.repositories.create_repository(params)
+            start = time.time()
+            af.artifacts_and_storage.deploy_artifact(
+                "stand-in", "tests/assets/python_logo.png", "python_logo.png"
+            )
+            r = af.artifacts_and_storage.retrieve_artifact(
+                "stand-in", "python_logo.png"
+            )
+            with open("tests/assets/python_logo.png", "rb") as files:
+                content = files.read()
+            if r.content != content:
+                raise self.RtpyTestError("Wrong content !")
+            if time.time() - start < 2 * len(content) / server.bandwidth * 0.9:
+                raise self.RtpyTestError("The bandwidth wasn't applied !")
+            if server.requests != 6 or server.bytes_received < len(content):
+                raise self.RtpyTestError("Wrong counters !")
+
+            server.reset()
+            if server.requests != 0:
+                raise self.RtpyTestError("The counters weren't reset !")
+            with pytest.raises(af.AfApiError):
+                af.repositories.repository_configuration("stand-in")
+
+    def test_artifactory_query_language(self):
+        """AQL criteria, sort, offset and limit tests."""
+        with StandInServer() as server:
+            af = rtpy.Rtpy(server.settings())
+            params = {"key": "stand-in", "rclass": "local", "packageType": "generic"}
+            af.repositories.create_repository(params)
+            for name in ["a/1.png", "a/2.png", "b/3.txt"]:
+                af.artifacts_and_storage.deploy_artifact(
+                    "stand-in", "tests/assets/python_logo.png", name
+                )
+            af.artifacts_and_storage.set_item_properties("stand-in", "b", "kind=text")
+
+            r = af.searches.artifactory_query_language(
+                'items.find({"repo":"stand-in","name":{"$match":"*.png"}})'
+                '.include("name").sort({"$desc":["name"]}).offset(1).limit(5)'
+            )
+            assert r["results"] == [{"name": "1.png"}]
+            assert r["range"]["start_pos"] == 1
+
+            r = af.searches.artifactory_query_language(
+                'items.find({"$or":[{"@kind":"text"},{"path":"a"}],' '"type":"any"})'
+            )
+            paths = sorted(item["path"] + "/" + item["name"] for item in r["results"])
+            assert paths == ["./b", "a/1.png", "a/2.png", "b/3.txt"]
+
+    def test_copy_into_existing_folder(self):
+        """A folder copied to an existing folder is put inside it."""
+        with StandInServer() as server:
+            af = rtpy.Rtpy(server.settings())
+            params = {"key": "stand-in", "rclass": "local", "packageType": "generic"}
+            af.repositories.create_repository(params)
+            for name in ["a/b/1.png", "c/b/2.png"]:
+                af.artifacts_and_storage.deploy_artifact(
+                    "stand-in", "tests/assets/python_logo.png", name
+                )
+
+            af.artifacts_and_storage.copy_item("stand-in", "a/b", "stand-in", "c/b")
+            af.artifacts_and_storage.file_info("stand-in", "c/b/b/1.png")
+            with pytest.raises(af.AfApiError):
+                af.artifacts_and_storage.file_info("stand-in", "c/b/1.png")
+
+            af.artifacts_and_storage.copy_item("stand-in", "a/b", "stand-in", "d/b")
+            af.artifacts_and_storage.file_info("stand-in", "d/b/1.png")
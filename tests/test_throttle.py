@@ -0,0 +1,95 @@
+# coding: utf-8
+
+# Copyright (C) 2018 Orange
+#
+# This software is distributed under the terms and conditions of the 'Apache-2.0'
+# license which can be found in the 'LICENSE.md' file
+# or at 'http://www.apache.org/licenses/LICENSE-2.0'.
+
+"""Definitions of the tests for the Throttle class defined in rtpy/throttle.py."""
+
+from __future__ import unicode_literals
+import threading
+import time
+
+import pytest
+
+import rtpy
+from .mixins import RtpyTestMixin
+
+
+class TestsThrottle(RtpyTestMixin):
+    """Throttle class tests."""
+
+    def test_rate(self):
+        """Token bucket tests."""
+        throttle = rtpy.Throttle(rate=20, burst=2)
+        start = time.time()
+        for _ in range(6):
+            throttle.release(throttle.acquire("[SEARCHES] : Property Search"))
+        # 2 requests at once, then 4 requests at 20 per second
+        if not 0.15 <= time.time() - start < 1:
+            raise self.RtpyTestError("Wrong rate !")
+        if not 0.15 <= throttle.waited:
+            raise self.RtpyTestError("Wrong waited time !")
+
+        with pytest.raises(ValueError):
+            rtpy.Throttle(rate=0)
+
+    def test_max_in_flight(self):
+        """Requests in flight across threads and per API method tests."""
+        throttle = rtpy.Throttle(
+            max_in_flight=3, limits={"*: Calculate *": {"max_in_flight": 1}}
+        )
+        if len(throttle.limits_for("[REPOSITORIES] : Calculate Maven Index")) != 2:
+            raise self.RtpyTestError("The API method limits should apply !")
+
+        in_flight = {"current": 0, "calculate": 0, "max": 0, "max_calculate": 0}
+        lock = threading.Lock()
+
+        def request(api_method):
+            acquired = throttle.acquire(api_method)
+            try:
+                with lock:
+                    in_flight["current"] += 1
+                    in_flight["max"] = max(in_flight["max"], in_flight["current"])
+                    if "Calculate" in api_method:
+                        in_flight["calculate"] += 1
+                        in_flight["max_calculate"] = max(
+                            in_flight["max_calculate"], in_flight["calculate"]
+                        )
+                time.sleep(0.02)
+                with lock:
+                    in_flight["current"] -= 1
+                    if "Calculate" in api_method:
+                        in_flight["calculate"] -= 1
+            finally:
+                throttle.release(acquired)
+
+        api_methods = ["[REPOSITORIES] : Calculate Npm Repository Metadata"] * 5
+        api_methods += ["[SEARCHES] : Property Search"] * 10
+        threads = [
+            threading.Thread(target=request, args=(api_method,))
+            for api_method in api_methods
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if in_flight["max"] != 3 or in_flight["max_calculate"] != 1:
+            raise self.RtpyTestError("Wrong number of requests in flight !")
+
+    def test_throttle_setting(self, instantiate_af_objects_credentials_and_api_key):
+        """Throttle setting tests."""
+        with pytest.raises(rtpy.UserSettingsError):
+            rtpy.Rtpy(dict(self.settings, throttle={"rate": 1}))
+
+        throttle = rtpy.Throttle(rate=10, burst=1)
+        af = rtpy.Rtpy(dict(self.settings, throttle=throttle))
+        start = time.time()
+        af.system_and_configuration.system_health_ping()
+        af.repositories.get_repositories()
+        af.system_and_configuration.version_and_addons_information()
+        # Shared by the categories
+        if time.time() - start < 0.15:
+            raise self.RtpyTestError("The requests should be throttled !")
@@ -9,15 +9,66 @@
 """Definitions of the tests for the functions defined in rtpy/tools.py."""
 
 from __future__ import unicode_literals
+import io
+import json
 import os
+from concurrent.futures import ThreadPoolExecutor
 
 import pytest
 import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
 
 import rtpy
 from .mixins import RtpyTestMixin
 
 
+class ScriptedAdapter(BaseAdapter):
+    """
+    Transport adapter answering with scripted outcomes, recording the bodies.
+
+    Each outcome is a status code or an exception raised after reading the
+    first bytes of the body, the last outcome is repeated.
+
+    """
+
+    def __init__(self, outcomes):
+        """Object instantiation."""
+        super(ScriptedAdapter, self).__init__()
+        self.outcomes = list(outcomes)
+        self.requests = []
+
+    def send(self, request, **kwargs):
+        """Read the body and return (or raise) the next outcome."""
+        outcome = self.outcomes.pop(0) if len(self.outcomes) > 1 else self.outcomes[0]
+        body = request.body
+        if hasattr(body, "read"):
+            # Interrupted uploads only read the start of the body
+            body = body.read(4 if isinstance(outcome, Exception) else -1)
+        elif isinstance(body, rtpy.tools.UploadBuffer):
+            body = b"".join(bytes(chunk) for chunk in body)
+        self.requests.append((request.method, body))
+        if isinstance(outcome, Exception):
+            raise outcome
+
+        if outcome < 400:
+            content = {"outcome": outcome}
+        else:
+            content = {"errors": [{"status": outcome, "message": "Unavailable"}]}
+        response = requests.Response()
+        response.status_code = outcome
+        response.headers = CaseInsensitiveDict({"Content-Type": "application/json"})
+        response.raw = io.BytesIO(json.dumps(content).encode("utf-8"))
+        response.encoding = "utf-8"
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        """Nothing to release."""
+        pass
+
+
 class TestsTools(RtpyTestMixin):
     """Tools class tests."""
 
@@ -83,6 +134,100 @@ class TestsTools(RtpyTestMixin):
             my_settings["verbose_level"] = 5
             af = rtpy.Rtpy(my_settings)
 
+        # Incorrect pool settings values
+        del my_settings["verbose_level"]
+        with pytest.raises(rtpy.UserSettingsError):
+            af = rtpy.Rtpy(dict(my_settings, pool_maxsize=0))
+        with pytest.raises(rtpy.UserSettingsError):
+            af = rtpy.Rtpy(dict(my_settings, keep_alive="yes"))
+
+        # Incorrect stream_json value
+        with pytest.raises(rtpy.UserSettingsError):
+            af = rtpy.Rtpy(dict(my_settings, stream_json=1))
+        # True is only allowed for a call
+        with pytest.raises(rtpy.UserSettingsError):
+            af = rtpy.Rtpy(dict(my_settings, stream_json=True))
+
+        # Incorrect retry values
+        for retry in ["yes", {"attempts": 2}, {"max_attempts": 0}, {"jitter": None}]:
+            with pytest.raises(rtpy.UserSettingsError):
+                af = rtpy.Rtpy(dict(my_settings, retry=retry))
+
+    def test_retry_delay(self):
+        """Retry backoff and Retry-After tests."""
+        policy = rtpy.tools.retry_policy({"jitter": False, "backoff_cap": 3})
+        delays = [rtpy.tools.retry_delay(policy, attempt) for attempt in range(1, 5)]
+        if delays != [0.5, 1, 2, 3]:
+            raise self.RtpyTestError("Wrong exponential backoff !")
+
+        response = requests.Response()
+        response.headers["Retry-After"] = "2"
+        if rtpy.tools.retry_delay(policy, 1, response) != 2:
+            raise self.RtpyTestError("The Retry-After header should be honored !")
+        response.headers["Retry-After"] = "Mon, 01 Jan 2018 00:00:00 GMT"
+        if rtpy.tools.retry_delay(policy, 1, response) != 0:
+            raise self.RtpyTestError("A past Retry-After date means no delay !")
+        if rtpy.tools.retry_policy(None) is not None:
+            raise self.RtpyTestError("Retries should be disabled by default !")
+
+    def test_retries(self, tmpdir):
+        """Retries of the failed attempts (status codes and connection errors)."""
+
+        def scripted_af(outcomes, **retry):
+            adapter = ScriptedAdapter(outcomes)
+            session = requests.Session()
+            session.mount("http://", adapter)
+            retry = dict({"backoff_base": 0, "jitter": False}, **retry)
+            settings = {
+                "af_url": "http://stand-in/artifactory",
+                "api_key": "key",
+                "session": session,
+                "retry": retry,
+            }
+            return rtpy.Rtpy(settings), adapter
+
+        # GET retried until it succeeds
+        error = requests.exceptions.ConnectionError("Connection refused")
+        af, adapter = scripted_af([503, error, 200])
+        if af.system_and_configuration.version_and_addons_information() != {
+            "outcome": 200
+        }:
+            raise self.RtpyTestError("The last response should be returned !")
+        if len(adapter.requests) != 3:
+            raise self.RtpyTestError("The GET should be sent 3 times !")
+
+        # Upload bodies sent again from the start
+        path = os.path.join(str(tmpdir), "artifact.bin")
+        content = os.urandom(64)
+        with open(path, "wb") as files:
+            files.write(content)
+        for options in [{}, {"chunk_size": 16}]:
+            af, adapter = scripted_af([error, 503, 201])
+            af.artifacts_and_storage.deploy_artifact("repo", path, "a.bin", **options)
+            bodies = [body for verb, body in adapter.requests]
+            if bodies[1:] != [content, content] or not content.startswith(bodies[0]):
+                raise self.RtpyTestError("The upload should be sent from the start !")
+
+        # POST not retried by default
+        af, adapter = scripted_af([503, 200])
+        r = af.searches.artifactory_query_language(
+            "items.find()", settings={"raw_response": True}
+        )
+        if r.status_code != 503 or len(adapter.requests) != 1:
+            raise self.RtpyTestError("The POST should not be retried !")
+
+        # Gives up after max_attempts with the last response or error
+        af, adapter = scripted_af([503], max_attempts=3)
+        with pytest.raises(af.AfApiError) as error_info:
+            af.system_and_configuration.version_and_addons_information()
+        if error_info.value.status_code != 503 or len(adapter.requests) != 3:
+            raise self.RtpyTestError("The last response should be returned !")
+        af, adapter = scripted_af([error], max_attempts=3)
+        with pytest.raises(requests.exceptions.ConnectionError):
+            af.system_and_configuration.version_and_addons_information()
+        if len(adapter.requests) != 3:
+            raise self.RtpyTestError("The GET should be sent 3 times !")
+
     def test_raise_malformed_af_api_error(
         self, instantiate_af_objects_credentials_and_api_key
     ):
@@ -152,6 +297,70 @@ class TestsTools(RtpyTestMixin):
         my_settings = {"session": session}
         r = self.af.system_and_configuration.system_health_ping(settings=my_settings)
 
+    def test_shared_session(self, instantiate_af_objects_credentials_and_api_key):
+        """All the categories share the same session, even after an override."""
+        self.af.searches.artifactory_query_language('items.find({"repo":"none"})')
+        self.af.system_and_configuration.system_health_ping(
+            settings={"verbose_level": 1}
+        )
+        categories = [
+            self.af.artifacts_and_storage,
+            self.af.builds,
+            self.af.repositories,
+            self.af.searches,
+            self.af.security,
+            self.af.system_and_configuration,
+        ]
+        for category in categories:
+            if category._user_settings["session"] is not self.af.session:
+                message = "A category doesn't use the shared session!"
+                raise self.RtpyTestError(message)
+
+        settings = dict(self.settings, pool_maxsize=2, keep_alive=False)
+        af = rtpy.Rtpy(settings)
+        assert af() == "OK"
+        assert af.session.headers["Connection"] == "close"
+
+    def test_concurrent_settings_overrides(
+        self, instantiate_af_objects_credentials_and_api_key
+    ):
+        """Overridden settings don't leak to the concurrent calls."""
+        user_settings = self.af.system_and_configuration._user_settings
+        original_user_settings = dict(user_settings)
+
+        def ping(index):
+            if index % 2:
+                r = self.af.system_and_configuration.system_health_ping(
+                    settings={"raw_response": True}
+                )
+                return isinstance(r, requests.Response)
+            return self.af.system_and_configuration.system_health_ping() == "OK"
+
+        with ThreadPoolExecutor(8) as executor:
+            if not all(executor.map(ping, range(40))):
+                raise self.RtpyTestError("An overridden setting leaked !")
+        if user_settings != original_user_settings:
+            raise self.RtpyTestError("The user settings shouldn't be modified !")
+
+    def test_client_config(self, instantiate_af_objects_credentials_and_api_key):
+        """Precompiled configuration of the API calls tests."""
+        category = self.af.repositories
+        config = category._request_settings({})
+        if config is not category._config:
+            raise self.RtpyTestError("The precompiled configuration should be used !")
+        if config.api_endpoint != self.settings["af_url"] + "/api/":
+            raise self.RtpyTestError("Wrong API endpoint !")
+        with pytest.raises(AttributeError):
+            config.timeout = 10
+
+        overridden_config = category._request_settings(
+            {"settings": {"raw_response": True}}
+        )
+        if not overridden_config.raw_response or config.raw_response:
+            raise self.RtpyTestError("The override should build a new configuration !")
+        if overridden_config.session is not config.session:
+            raise self.RtpyTestError("The session should be shared !")
+
     def test_self_call(self, instantiate_af_objects_credentials_and_api_key):
         """Test the __call__ dunder (binding to System health ping)."""
         assert self.af() == "OK"
@@ -0,0 +1,160 @@
+# coding: utf-8
+
+# Copyright (C) 2018 Orange
+#
+# This software is distributed under the terms and conditions of the 'Apache-2.0'
+# license which can be found in the 'LICENSE.md' file
+# or at 'http://www.apache.org/licenses/LICENSE-2.0'.
+
+"""Definitions of the tests for the Tracer class defined in rtpy/tracing.py."""
+
+from __future__ import unicode_literals
+import io
+import json
+import os
+import shutil
+import threading
+
+import pytest
+
+import rtpy
+from rtpy.tracing import (
+    SPAN_KIND_CLIENT,
+    STATUS_CODE_ERROR,
+    current_span,
+    propagate,
+    url_template,
+)
+from .mixins import RtpyTestMixin
+
+
+class TestsTracing(RtpyTestMixin):
+    """Tracer class tests."""
+
+    def test_spans_and_exporters(self, tmpdir):
+        """Parent spans, propagation to threads and OTLP/JSON file tests."""
+        with pytest.raises(ValueError):
+            rtpy.Tracer(None)
+
+        path = os.path.join(str(tmpdir), "spans.jsonl")
+        exporter = rtpy.MemorySpanExporter()
+        tracer = rtpy.Tracer(exporter, service_name="tests")
+        file_tracer = rtpy.Tracer(rtpy.FileSpanExporter(path), service_name="tests")
+
+        with pytest.raises(KeyError):
+            with tracer.span("parent", attributes={"items": 2}) as parent:
+                assert current_span() is parent
+
+                def child():
+                    with tracer.span("child"):
+                        pass
+
+                thread = threading.Thread(target=propagate(child))
+                thread.start()
+                thread.join()
+                raise KeyError("missing")
+        assert current_span() is None
+
+        child, parent = exporter.spans
+        if child.parent_span_id != parent.span_id or child.trace_id != parent.trace_id:
+            raise self.RtpyTestError("The child span should be in the parent trace !")
+        if (
+            parent.status_code != STATUS_CODE_ERROR
+            or parent.events[0][0] != "exception"
+        ):
+            raise self.RtpyTestError("The exception should be recorded !")
+        assert len(parent.trace_id) == 32 and len(parent.span_id) == 16
+        assert parent.parent_span_id is None and parent.end_time >= parent.start_time
+
+        file_tracer.end_span(file_tracer.start_span("file", attributes={"size": 3}))
+        with io.open(path, encoding="utf-8") as spans_file:
+            request = json.loads(spans_file.read())
+        resource_spans = request["resourceSpans"][0]
+        assert resource_spans["resource"]["attributes"] == [
+            {"key": "service.name", "value": {"stringValue": "tests"}}
+        ]
+        span = resource_spans["scopeSpans"][0]["spans"][0]
+        assert span["name"] == "file" and span["parentSpanId"] == ""
+        assert span["attributes"] == [{"key": "size", "value": {"intValue": "3"}}]
+
+        exporter.clear()
+        assert exporter.spans == []
+
+    def test_url_template(self):
+        """URL templates of the API calls tests."""
+        assert (
+            url_template("storage/repo/a/b.txt?properties=a,b", False)
+            == "api/storage/{repo_key}/{path}?properties"
+        )
+        assert url_template("repo/a/b.txt;a=1;b=2", True) == "{repo_key}/{path}"
+        assert url_template("build/name/12", False) == "api/build/{name}/{number}"
+        assert url_template("system/ping", False) == "api/system/ping"
+        assert (
+            url_template("copy/repo/a?to=/other/a&dry=1", False)
+            == "api/copy/{repo_key}/{path}?to&dry"
+        )
+
+    def test_tracer_setting(self, instantiate_af_objects_credentials_and_api_key):
+        """API calls and bulk operations traced with the tracer setting."""
+        with pytest.raises(rtpy.UserSettingsError):
+            rtpy.Rtpy(dict(self.settings, tracer={}))
+
+        exporter = rtpy.MemorySpanExporter()
+        af = rtpy.Rtpy(dict(self.settings, tracer=rtpy.Tracer(exporter)))
+        repo_name = RtpyTestMixin.generate_random_string()
+        local_directory = RtpyTestMixin.generate_random_string()
+        af.repositories.create_repository(
+            {"key": repo_name, "rclass": "local", "packageType": "generic"}
+        )
+        try:
+            af.system_and_configuration.system_health_ping()
+            with pytest.raises(af.AfApiError):
+                af.artifacts_and_storage.file_info(repo_name, "missing.txt")
+            # Not traced
+            af.system_and_configuration.system_health_ping(settings={"tracer": None})
+            calls = [span for span in exporter.spans if span.kind == SPAN_KIND_CLIENT]
+            assert [span.attributes["http.response.status_code"] for span in calls] == [
+                200,
+                200,
+                404,
+            ]
+            if calls[2].status_code != STATUS_CODE_ERROR:
+                raise self.RtpyTestError("The 404 should be an error !")
+
+            exporter.clear()
+            paths = ["a.txt", "folder/b.txt", "folder/c.txt"]
+            for artifact_path in paths:
+                af.artifacts_and_storage.deploy_artifact(
+                    repo_name, b"content", artifact_path
+                )
+            r = af.bulk.download(
+                [(repo_name, path) for path in paths + ["missing.txt"]],
+                local_directory,
+                max_workers=2,
+            )
+            assert len(r) == 4
+        finally:
+            af.repositories.delete_repository(repo_name)
+            shutil.rmtree(local_directory, ignore_errors=True)
+
+        spans = dict((span.name, span) for span in exporter.spans)
+        bulk = spans["[BULK] : Download"]
+        if bulk.parent_span_id or bulk.attributes["rtpy.bulk.failed"] != 1:
+            raise self.RtpyTestError("Wrong bulk span !")
+        downloads = [
+            span for span in exporter.spans if span.parent_span_id == bulk.span_id
+        ]
+        if len(downloads) != 4 or any(
+            span.trace_id != bulk.trace_id for span in downloads
+        ):
+            raise self.RtpyTestError("The downloads should be children of the bulk !")
+        download = downloads[0]
+        assert download.attributes["url.template"] == "{repo_key}/{path}"
+        assert download.attributes["http.request.method"] == "GET"
+        phases = [
+            span.name
+            for span in exporter.spans
+            if span.parent_span_id == download.span_id
+        ]
+        # Streamed responses, the content is read after the call
+        assert "server" in phases and "transfer" not in phases